@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+# 每個串流的 in-flight 視窗與丟幀策略
+class StreamWindow:
+    """
+    - 同一個串流最多 max_in_flight 張 frame 同時在 pipeline 中
+    - 視窗已滿時新 frame 先放進 pending，且只保留最新的一張（latest-frame-wins），被取代的直接丟棄
+    - pipeline 處理完後呼叫 put(result)（與原本 per-frame result_q 相同介面），交給 results() 回傳
+    - 名額在結果真正交給 client 後才釋放，results() 同時送出 pending 的 frame，client 讀取太慢時自然停止送入新的 frame
+    submit(payload, window) 負責解碼並把 frame 放進 pipeline，只有真正送出的 frame 才會被解碼。
+    每個 offer 的 frame 依序編號（frame_id，包含被丟棄的），results() 一併回傳讓 client 對應。
+    """
+
+    def __init__(self, submit, max_in_flight=2, result_timeout=5):
+        self._submit = submit
+        self.max_in_flight = max_in_flight
+        self.result_timeout = result_timeout
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()  # 讓 frame 依決定送出的順序進入 pipeline（順序：_send_lock → _cond）
+        self._in_flight = 0
+        self._pending = None
+        self._results = deque()
+        self._sent_at = deque()
+        self._finished = False
+        self._next_frame_id = 0
+        self._stale = 0  # 因逾時放棄、之後才回來的結果數
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+
+    # ---------- 讀取 request 的執行緒 ----------
+
+    def offer(self, payload):
+        with self._send_lock:
+            with self._cond:
+                frame_id = self._next_frame_id
+                self._next_frame_id += 1
+                if self._pending is not None:
+                    # 已有更舊的 frame 在等待，直接以新的 frame 取代
+                    self.dropped += 1
+                    self._pending = None
+                if self._in_flight >= self.max_in_flight:
+                    self._pending = (frame_id, payload)
+                    self._cond.notify_all()
+                    return
+                self._in_flight += 1
+            self._send(frame_id, payload)
+
+    def finish(self):
+        """client 已送完所有 frame"""
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    # ---------- pipeline ----------
+
+    def put(self, result):
+        with self._cond:
+            if self._stale > 0:
+                # 已放棄的 frame 遲到的結果（pipeline 依序處理，最先回來的就是它們）
+                self._stale -= 1
+                return
+            if self._sent_at:
+                frame_id, sent_at = self._sent_at.popleft()
+                self._results.append((result, frame_id, time.perf_counter() - sent_at))
+            else:
+                self._results.append((result, None, None))
+            self.completed += 1
+            self._cond.notify_all()
+
+    # ---------- 回傳 response 的執行緒 ----------
+
+    def results(self):
+        """依序產生 (result, frame_id, latency)，client 送完且所有 frame 都處理完後結束"""
+        while True:
+            with self._cond:
+                while True:
+                    if self._results:
+                        item = self._results.popleft()
+                        self._in_flight = max(0, self._in_flight - 1)
+                        break
+                    if self._pending is not None and self._in_flight < self.max_in_flight:
+                        item = None
+                        break
+                    if self._finished and self._in_flight == 0 and self._pending is None:
+                        return
+                    if not self._cond.wait(self.result_timeout) and self._in_flight > 0:
+                        # pipeline 太久沒有回應，放棄目前 in-flight 的 frame，避免串流卡死
+                        print(f"Stream stalled, dropping {self._in_flight} in-flight frames")
+                        self.dropped += self._in_flight
+                        self._stale += len(self._sent_at)
+                        self._in_flight = 0
+                        self._sent_at.clear()
+            if item is not None:
+                yield item
+                continue
+            with self._send_lock:
+                with self._cond:
+                    # 取得 _send_lock 期間 reader 可能已經送出或取代 pending，重新確認
+                    if self._pending is None or self._in_flight >= self.max_in_flight:
+                        continue
+                    (frame_id, payload), self._pending = self._pending, None
+                    self._in_flight += 1
+                self._send(frame_id, payload)
+
+    def _send(self, frame_id, payload):
+        with self._cond:
+            self._sent_at.append((frame_id, time.perf_counter()))
+        try:
+            self._submit(payload, self)
+            self.submitted += 1
+        except Exception as e:
+            print(f"Frame submit error: {e}")
+            with self._cond:
+                self._in_flight = max(0, self._in_flight - 1)
+                if self._sent_at:
+                    self._sent_at.pop()
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "dropped": self.dropped,
+                "in_flight": self._in_flight,
+            }
+
+
+# asyncio 版本：同樣的視窗與丟幀策略，pipeline 結果透過 future 回到 event loop
+class AsyncStreamWindow:
+    """
+    與 StreamWindow 相同的 latest-frame-wins 策略，但所有狀態只在 event loop 中操作，不需要鎖。
+    每張送出的 frame 配一個 asyncio future，pipeline 執行緒呼叫 put(result) 時以 call_soon_threadsafe 設定結果，
+    不再為每張 frame 建立 queue.Queue 並佔用一條執行緒等待。
+    submit(payload, sink) 會在 executor 中執行（解碼 + 放進 pipeline），不阻塞 event loop。
+    """
+
+    def __init__(self, submit, max_in_flight=2, result_timeout=5, executor=None):
+        self._submit = submit
+        self.max_in_flight = max_in_flight
+        self.result_timeout = result_timeout
+        self._executor = executor
+        self._loop = asyncio.get_running_loop()
+        self._send_lock = asyncio.Lock()  # FIFO，讓 frame 依保留名額的順序進入 pipeline
+        self._changed = asyncio.Event()
+        self._in_flight = deque()  # (frame_id, 送出時間, future)，結果交給 client 後才移除
+        self._pending = None
+        self._finished = False
+        self._next_frame_id = 0
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+
+    async def offer(self, payload):
+        frame_id = self._next_frame_id
+        self._next_frame_id += 1
+        if self._pending is not None:
+            self.dropped += 1
+            self._pending = None
+        if len(self._in_flight) >= self.max_in_flight:
+            self._pending = (frame_id, payload)
+            self._changed.set()
+            return
+        await self._send(frame_id, payload)
+
+    def finish(self):
+        self._finished = True
+        self._changed.set()
+
+    async def _send(self, frame_id, payload):
+        future = self._loop.create_future()
+        entry = (frame_id, time.perf_counter(), future)
+        self._in_flight.append(entry)
+        async with self._send_lock:
+            try:
+                await self._loop.run_in_executor(self._executor, self._submit, payload, _FutureSink(self._loop, future))
+                self.submitted += 1
+            except Exception as e:
+                print(f"Frame submit error: {e}")
+                self._in_flight.remove(entry)
+                self._changed.set()
+
+    async def results(self):
+        """依序產生 (result, frame_id, latency)，client 送完且所有 frame 都處理完後結束"""
+        while True:
+            if self._in_flight and self._in_flight[0][2].done():
+                frame_id, sent_at, future = self._in_flight.popleft()
+                self.completed += 1
+                yield future.result(), frame_id, time.perf_counter() - sent_at
+                continue
+            if self._pending is not None and len(self._in_flight) < self.max_in_flight:
+                (frame_id, payload), self._pending = self._pending, None
+                await self._send(frame_id, payload)
+                continue
+            if self._finished and not self._in_flight and self._pending is None:
+                return
+
+            self._changed.clear()
+            waiters = [asyncio.ensure_future(self._changed.wait())]
+            if self._in_flight:
+                waiters.append(self._in_flight[0][2])
+            done, _ = await asyncio.wait(waiters, timeout=self.result_timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            waiters[0].cancel()
+            if not done and self._in_flight:
+                # pipeline 太久沒有回應，放棄目前 in-flight 的 frame，避免串流卡死
+                print(f"Stream stalled, dropping {len(self._in_flight)} in-flight frames")
+                self.dropped += len(self._in_flight)
+                self._in_flight.clear()
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "in_flight": len(self._in_flight),
+        }
+
+
+class _FutureSink:
+    """給 pipeline 使用的 result_q：put() 從任意執行緒把結果交回 event loop 上的 future"""
+
+    __slots__ = ("_loop", "_future")
+
+    def __init__(self, loop, future):
+        self._loop = loop
+        self._future = future
+
+    def put(self, result):
+        try:
+            self._loop.call_soon_threadsafe(self._set_result, result)
+        except RuntimeError:
+            pass  # event loop 已關閉（伺服器停止中），丟棄結果
+
+    def _set_result(self, result):
+        if not self._future.done():
+            self._future.set_result(result)
@@ -0,0 +1,56 @@
+# Attention 推論路徑比較：原本的手動注意力 vs. 合併 QKV + scaled_dot_product_attention
+# 會先確認兩者輸出一致，再比較延遲
+# 用法：python benchmarks/bench_attention.py --checkpoint models/best_mode_36l.pth
+import argparse
+import copy
+import os
+
+import torch
+
+from common import build_vivit, timeit
+from model_util import Attention
+
+
+@torch.no_grad()
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default="models/best_mode_36l.pth")
+    parser.add_argument("--num-classes", type=int, default=4)
+    parser.add_argument("--num-frames", type=int, default=36)
+    parser.add_argument("--img-size", type=int, default=224)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # 單一 Attention 模組（3529 tokens）
+    attn = Attention(96, 4).to(device).eval()
+    tokens = torch.randn(args.batch_size, (args.num_frames // 2) * (args.img_size // 16) ** 2 + 1, 96, device=device)
+    fast_attn = copy.deepcopy(attn)
+    fast_attn.enable_fast_inference(fuse_qkv=True)
+    diff = (attn(tokens) - fast_attn(tokens)).abs().max().item()
+    assert diff < args.atol, f"Attention parity failed: max abs diff {diff}"
+    print(f"Attention         max_abs_diff={diff:.2e} "
+          f"eager={timeit(lambda: attn(tokens), args.repeat):.1f} ms "
+          f"fused_sdpa={timeit(lambda: fast_attn(tokens), args.repeat):.1f} ms")
+
+    # 完整模型，載入既有 checkpoint 後於載入時合併權重
+    model = build_vivit(num_classes=args.num_classes, num_frames=args.num_frames, img_size=args.img_size).to(device)
+    if os.path.exists(args.checkpoint):
+        model.load_state_dict(torch.load(args.checkpoint, map_location=device))
+    model.eval()
+    fast_model = copy.deepcopy(model).optimize_for_inference(fuse_qkv=True)
+    clip = torch.rand(args.batch_size, 3, args.num_frames, args.img_size, args.img_size, device=device)
+    diff = (model(clip) - fast_model(clip)).abs().max().item()
+    assert diff < args.atol, f"ViViT parity failed: max abs diff {diff}"
+    assert fast_model.state_dict().keys() == model.state_dict().keys(), "state_dict keys changed"
+    print(f"ViViT_Factorized  max_abs_diff={diff:.2e} "
+          f"eager={timeit(lambda: model(clip), args.repeat):.1f} ms "
+          f"fused_sdpa={timeit(lambda: fast_model(clip), args.repeat):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# 推論後端比較（先執行 python export_models.py --yolo）：
+# ViViT：eager PyTorch vs. TorchScript vs. ONNX Runtime，檢查輸出一致（完整模型與 forward_embeddings 兩條路徑）
+# YOLO：eager .pt vs. 匯出的 .onnx，在同一批 frame 上檢查框（IoU）、類別與分數一致
+# 兩者都比較各 batch size 的延遲
+# 用法：python benchmarks/bench_backends.py --batch-sizes 1 4 8 --threads 4 [--frames data/cat.mp4]
+import argparse
+import os
+
+import cv2
+import numpy as np
+import torch
+
+from common import ROOT_DIR, build_vivit, timeit
+from inference_backends import create_vivit_backend, exported_model_paths, yolo_model_path
+from replay import load_frames
+
+ATOL = 1e-4
+YOLO_MIN_IOU = 0.9  # 配對到的框 IoU 至少要這麼高
+YOLO_SCORE_TOL = 0.02  # 配對到的框分數差的上限；分數在 conf 門檻 ± 此值內的框只出現在一邊也算一致
+
+
+@torch.no_grad()
+def bench_vivit(args):
+    model = build_vivit()
+    model.load_state_dict(torch.load(args.checkpoint, map_location="cpu"))
+    model.eval()
+    model.optimize_for_inference(fuse_qkv=True)
+
+    backends = {}
+    for name in args.backends:
+        if name != "torch" and not all(os.path.exists(p) for p in exported_model_paths(args.checkpoint, name)):
+            print(f"{name}: exported model not found, run python export_models.py --format {name}")
+            continue
+        backends[name] = create_vivit_backend(name, model, args.checkpoint, num_threads=args.threads)
+
+    # 與未最佳化的 eager 模型（訓練時的計算）比較
+    reference = build_vivit()
+    reference.load_state_dict(torch.load(args.checkpoint, map_location="cpu"))
+    reference.eval()
+    torch.manual_seed(0)
+    clips = torch.rand(max(args.batch_sizes), 3, 36, 224, 224)
+    tokens = model.tubelet_embedding(clips)
+    expected = reference(clips)
+    print(f"threads={torch.get_num_threads()} parity vs. eager reference (atol {ATOL}):")
+    for name, backend in backends.items():
+        full_diff = (backend(clips) - expected).abs().max().item()
+        encoder_diff = (backend.forward_embeddings(tokens) - expected).abs().max().item()
+        same_labels = torch.equal(backend(clips).argmax(1), expected.argmax(1))
+        print(f"  {name:>11}: full {full_diff:.2e}  forward_embeddings {encoder_diff:.2e}  same labels {same_labels}")
+        assert full_diff < ATOL and encoder_diff < ATOL, f"{name} output differs from the eager model"
+
+    header = "".join(f" {name + ' ms':>15}" for name in backends)
+    print(f"\n{'batch':>5}{header}   (full clip / forward_embeddings)")
+    for batch_size in args.batch_sizes:
+        row = f"{batch_size:>5}"
+        for backend in backends.values():
+            full_ms = timeit(lambda: backend(clips[:batch_size]), args.repeat)
+            encoder_ms = timeit(lambda: backend.forward_embeddings(tokens[:batch_size]), args.repeat)
+            row += f" {full_ms:>7.1f}/{encoder_ms:<7.1f}"
+        print(row)
+
+
+def detect(model, frames, conf):
+    results = model.predict(source=frames, conf=conf, verbose=False)
+    return [result.boxes.data.cpu().numpy() for result in results]
+
+
+def box_iou(a, b):
+    """(N, 4) 與 (M, 4) 的 xyxy 框兩兩 IoU"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2:4] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:4] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_detections(expected, actual):
+    """同類別的框依 IoU 由高到低貪婪配對，回傳 [(iou, 分數差)]、沒有配對到的 expected 與 actual 列"""
+    iou = box_iou(expected[:, :4], actual[:, :4])
+    iou[expected[:, None, 5] != actual[None, :, 5]] = 0.0
+    matches, used_expected, used_actual = [], set(), set()
+    for i, j in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+        if iou[i, j] < YOLO_MIN_IOU:
+            break
+        if i in used_expected or j in used_actual:
+            continue
+        used_expected.add(i)
+        used_actual.add(j)
+        matches.append((iou[i, j], abs(float(expected[i, 4]) - float(actual[j, 4]))))
+    unmatched_expected = [row for i, row in enumerate(expected) if i not in used_expected]
+    unmatched_actual = [row for j, row in enumerate(actual) if j not in used_actual]
+    return matches, unmatched_expected, unmatched_actual
+
+
+def bench_yolo(args):
+    from ultralytics import YOLO
+
+    onnx_path = yolo_model_path(args.yolo_model, "onnx")
+    if not os.path.exists(args.yolo_model) or not os.path.exists(onnx_path):
+        print(f"YOLO: {args.yolo_model} or {onnx_path} not found, run python export_models.py --yolo")
+        return
+    backends = {"torch": YOLO(args.yolo_model, task="detect"), "onnx": YOLO(onnx_path, task="detect")}
+    frames = [cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+              for jpeg in load_frames(args.frames, args.yolo_frames, (640, 480))]
+
+    # 同一批 frame 上逐框比較，分數在門檻附近的框可能只在一邊超過 conf，不算不一致
+    matches, mismatched = [], 0
+    batch_size = max(args.batch_sizes)
+    for start in range(0, len(frames), batch_size):
+        batch = frames[start:start + batch_size]
+        for expected, actual in zip(detect(backends["torch"], batch, args.yolo_conf),
+                                    detect(backends["onnx"], batch, args.yolo_conf)):
+            frame_matches, only_expected, only_actual = match_detections(expected, actual)
+            matches += frame_matches
+            mismatched += sum(1 for row in only_expected + only_actual if row[4] >= args.yolo_conf + YOLO_SCORE_TOL)
+    max_score_diff = max((diff for _, diff in matches), default=0.0)
+    min_iou = min((iou for iou, _ in matches), default=1.0)
+    print(f"\nYOLO onnx vs. torch on {len(frames)} frames (conf {args.yolo_conf}, IoU >= {YOLO_MIN_IOU}, "
+          f"score tol {YOLO_SCORE_TOL}): matched {len(matches)} boxes, min IoU {min_iou:.3f}, "
+          f"max score diff {max_score_diff:.3f}, mismatched {mismatched}")
+    if not matches:
+        print("  no detections on these frames, pass --frames with real footage for a meaningful parity check")
+    assert mismatched == 0 and max_score_diff <= YOLO_SCORE_TOL, "onnx YOLO detections differ from the .pt model"
+
+    print(f"\n{'batch':>5}" + "".join(f" {name + ' ms':>10}" for name in backends))
+    for batch_size in args.batch_sizes:
+        batch = [frames[i % len(frames)] for i in range(batch_size)]
+        row = f"{batch_size:>5}"
+        for model in backends.values():
+            row += f" {timeit(lambda: detect(model, batch, args.yolo_conf), args.repeat):>10.1f}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", choices=["vivit", "yolo"], default=["vivit", "yolo"])
+    parser.add_argument("--checkpoint", default=os.path.join(ROOT_DIR, "models", "best_mode_36l.pth"))
+    parser.add_argument("--backends", nargs="+", default=["torch", "torchscript", "onnx"], help="ViViT 的後端")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--yolo-model", default=os.path.join(ROOT_DIR, "models", "best.pt"))
+    parser.add_argument("--frames", default=None, help="YOLO 比較用的 JPEG 資料夾或影片檔，未指定時使用合成畫面")
+    parser.add_argument("--yolo-frames", type=int, default=32)
+    parser.add_argument("--yolo-conf", type=float, default=0.25, help="比較時的信心門檻（低於 server 的 0.6，配對更多框）")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if "vivit" in args.models:
+        bench_vivit(args)
+    if "yolo" in args.models:
+        bench_yolo(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# YOLO 輸出轉 DeepSort 偵測：原本逐列 Python 迴圈 + class_id == 15 過濾 vs. 向量化轉換
+# 有 YOLO 權重時另外比較 predict 不限類別 vs. classes=[15]（NMS 只處理貓）
+# 用法：python benchmarks/bench_detections.py --rows 10 100 300 [--model models/best.pt --image cat.jpg]
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+from common import ROOT_DIR, timeit
+from detections import to_deepsort_detections
+
+CAT_CLASS_ID = 15
+
+
+# 原本 tracker_worker 中的做法（與最初的版本完全相同）
+def legacy_detections(outputs):
+    detections = []
+    for output in outputs:
+        x1, y1, x2, y2 = list(map(int, output[:4]))
+        class_id = int(output[5])
+        if class_id == 15:
+            detections.append(([x1, y1, x2 - x1, y2 - y1], output[4], 'cat'))
+    return detections
+
+
+def without_degenerate(detections):
+    # to_deepsort_detections 另外捨棄寬或高 <= 0 的框（截斷成整數後面積為 0，DeepSort 的 embedder 無法裁切）
+    return [d for d in detections if d[0][2] > 0 and d[0][3] > 0]
+
+
+def check_degenerate_boxes():
+    """退化的框單獨檢查：只有寬高都 > 0（截斷後）的貓會被保留"""
+    outputs = np.array([
+        [10, 10, 50, 60, 0.9, CAT_CLASS_ID],     # 正常
+        [10, 10, 10, 60, 0.9, CAT_CLASS_ID],     # 寬 0
+        [10, 10, 50, 10.9, 0.9, CAT_CLASS_ID],   # 截斷後高 0
+        [30, 30, 20, 40, 0.9, CAT_CLASS_ID],     # x2 < x1
+        [10, 10, 50, 60, 0.9, 0],                # 不是貓
+    ], dtype=np.float32)
+    kept = to_deepsort_detections(outputs, CAT_CLASS_ID)
+    assert [box for box, _, _ in kept] == [[10, 10, 40, 50]], kept
+    print(f"degenerate boxes: {len(legacy_detections(outputs)) - len(kept)} of {len(legacy_detections(outputs))} "
+          f"cat rows dropped as expected")
+
+
+def make_outputs(rows, cat_fraction, rng):
+    """模擬擁擠畫面的 boxes.data：部分為貓，其餘為其他類別，另含少量退化的框"""
+    x1 = rng.uniform(0, 1800, rows)
+    y1 = rng.uniform(0, 1000, rows)
+    w = rng.uniform(-2, 200, rows)
+    h = rng.uniform(-2, 200, rows)
+    conf = rng.uniform(0.6, 1.0, rows)
+    cls = np.where(rng.random(rows) < cat_fraction, CAT_CLASS_ID, rng.integers(0, 80, rows))
+    return np.stack([x1, y1, x1 + w, y1 + h, conf, cls], axis=1).astype(np.float32)
+
+
+def same(a, b):
+    return len(a) == len(b) and all(
+        list(box_a) == list(box_b) and abs(float(conf_a) - float(conf_b)) < 1e-6 and label_a == label_b
+        for (box_a, conf_a, label_a), (box_b, conf_b, label_b) in zip(a, b))
+
+
+def bench_conversion(args):
+    rng = np.random.default_rng(0)
+    # same：與原本迴圈的結果扣掉退化的框後完全相同；dropped：被捨棄的退化框數
+    print(f"{'rows':>6} {'cats':>5} {'dropped':>8} {'loop us':>9} {'numpy us':>9} {'speedup':>8} {'same':>5}")
+    for rows in args.rows:
+        outputs = make_outputs(rows, args.cat_fraction, rng)
+        legacy = legacy_detections(outputs)
+        vectorized = to_deepsort_detections(outputs, CAT_CLASS_ID)
+        loop_ms = timeit(lambda: legacy_detections(outputs), args.repeat)
+        numpy_ms = timeit(lambda: to_deepsort_detections(outputs, CAT_CLASS_ID), args.repeat)
+        print(f"{rows:>6} {len(legacy):>5} {len(legacy) - len(vectorized):>8} {loop_ms * 1000:>9.1f} "
+              f"{numpy_ms * 1000:>9.1f} {loop_ms / numpy_ms:>7.2f}x {str(same(without_degenerate(legacy), vectorized)):>5}")
+
+
+def bench_predict(args):
+    from ultralytics import YOLO
+
+    model = YOLO(args.model)
+    frame = cv2.imread(args.image) if args.image else np.random.default_rng(0).integers(0, 256, (720, 1280, 3), np.uint8)
+    kwargs = dict(source=frame, conf=args.conf, verbose=False)
+
+    all_classes = timeit(lambda: model.predict(**kwargs), args.predict_repeat, warmup=2)
+    cats_only = timeit(lambda: model.predict(classes=[CAT_CLASS_ID], **kwargs), args.predict_repeat, warmup=2)
+    all_rows = model.predict(**kwargs)[0].boxes.data.cpu().numpy()
+    cat_rows = model.predict(classes=[CAT_CLASS_ID], **kwargs)[0].boxes.data.cpu().numpy()
+
+    def per_frame(outputs, class_id):
+        return timeit(lambda: to_deepsort_detections(outputs, class_id), args.repeat)
+
+    legacy_total = all_classes + timeit(lambda: legacy_detections(all_rows), args.repeat)
+    new_total = cats_only + per_frame(cat_rows, CAT_CLASS_ID)
+    print(f"predict all classes: {all_classes:.1f} ms ({len(all_rows)} rows) | "
+          f"classes=[{CAT_CLASS_ID}]: {cats_only:.1f} ms ({len(cat_rows)} rows)")
+    print(f"per frame (predict + conversion): legacy {legacy_total:.2f} ms -> {new_total:.2f} ms "
+          f"({legacy_total - new_total:+.2f} ms saved)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 50, 100, 300])
+    parser.add_argument("--cat-fraction", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--model", default=os.path.join(ROOT_DIR, "models", "best.pt"))
+    parser.add_argument("--image", default=None, help="擁擠畫面的測試影像，未指定時使用隨機影像")
+    parser.add_argument("--conf", type=float, default=0.6)
+    parser.add_argument("--predict-repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    check_degenerate_boxes()
+    bench_conversion(args)
+    if os.path.exists(args.model):
+        bench_predict(args)
+    else:
+        print(f"{args.model} not found, skipping predict benchmark")
+
+
+if __name__ == "__main__":
+    main()
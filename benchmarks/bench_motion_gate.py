@@ -0,0 +1,99 @@
+# 靜止 track 略過 ViViT（MotionGate）的離線評估：每個影片當成一個 track 依序送入 ClipRingBuffer，
+# 每次 clip ready 時同時以「每次都推論」與「MotionGate」兩種方式取得 label，統計略過比例與 label 不一致的次數
+# 影片應為單一隻貓的裁切畫面（與 vivit_worker 的 crop 相同）；未指定時使用合成的靜止 / 移動序列
+# 用法：python benchmarks/bench_motion_gate.py --videos data/sleep.mp4 data/play.mp4 --fps 15
+import argparse
+import os
+
+import cv2
+import numpy as np
+import torch
+
+from common import ROOT_DIR, build_vivit
+from clip_buffer import ClipRingBuffer
+from motion_gate import MotionGate
+from preprocess import ClipPreprocessor
+
+NUM_FRAMES, IMG_SIZE, PREDICT_STRIDE = 36, 224, 24  # 與 grpc_server.py 的 full 設定檔相同
+
+
+def read_video(path, max_frames):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def synthetic_tracks(num_frames):
+    """靜止（只有感測器雜訊）與持續移動的兩段序列"""
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), (7, 7), 0)
+    static = [np.clip(base + rng.normal(0, 2, base.shape), 0, 255).astype(np.uint8) for _ in range(num_frames)]
+    moving = [np.roll(base, shift=8 * i, axis=1) for i in range(num_frames)]
+    return {"synthetic-static": static, "synthetic-moving": moving}
+
+
+@torch.no_grad()
+def evaluate(name, frames, model, preprocessor, args):
+    buffer = ClipRingBuffer(NUM_FRAMES, PREDICT_STRIDE, (IMG_SIZE, IMG_SIZE))
+    clock = {"now": 0.0}
+    gate = MotionGate(args.threshold, args.max_staleness, clock=lambda: clock["now"])
+    gated_label = None
+    clips = disagreements = 0
+    for i, frame in enumerate(frames):
+        clock["now"] = i / args.fps
+        buffer.push(frame)
+        if not buffer.ready():
+            continue
+        snapshot = buffer.snapshot()
+        always_label = int(model(preprocessor([snapshot.frames])).argmax(dim=1))
+        if gate.should_infer(snapshot, None if gated_label is None else (gated_label, 1.0)):
+            gated_label = always_label
+        clips += 1
+        disagreements += gated_label != always_label
+    s = gate.stats()
+    print(f"{name:>24} {clips:>6} {s['skipped']:>8} {s['skip_fraction']:>7.0%} "
+          f"{s['stale_refreshes']:>6} {disagreements:>9}")
+    return clips, s["skipped"], disagreements
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=os.path.join(ROOT_DIR, "models", "best_mode_36l.pth"))
+    parser.add_argument("--videos", nargs="+", default=None)
+    parser.add_argument("--fps", type=float, default=15, help="影片時間，用來計算 max staleness")
+    parser.add_argument("--max-frames", type=int, default=600)
+    parser.add_argument("--threshold", type=float, default=0.02)
+    parser.add_argument("--max-staleness", type=float, default=10)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = build_vivit()
+    model.load_state_dict(torch.load(args.checkpoint, map_location="cpu"))
+    model.eval()
+    model.optimize_for_inference(fuse_qkv=True)
+    preprocessor = ClipPreprocessor(NUM_FRAMES, (IMG_SIZE, IMG_SIZE), 1)
+
+    if args.videos:
+        tracks = {os.path.basename(path): read_video(path, args.max_frames) for path in args.videos}
+    else:
+        tracks = synthetic_tracks(min(args.max_frames, 300))
+
+    print(f"threshold={args.threshold} max_staleness={args.max_staleness}s fps={args.fps}")
+    print(f"{'track':>24} {'clips':>6} {'skipped':>8} {'skip %':>7} {'stale':>6} {'disagree':>9}")
+    totals = np.zeros(3, dtype=int)
+    for name, frames in tracks.items():
+        totals += evaluate(name, frames, model, preprocessor, args)
+    clips, skipped, disagreements = totals
+    print(f"{'all':>24} {clips:>6} {skipped:>8} {skipped / max(clips, 1):>7.0%} {'':>6} {disagreements:>9}")
+
+
+if __name__ == "__main__":
+    main()
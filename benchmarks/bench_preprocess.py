@@ -0,0 +1,54 @@
+# ViViT 前處理微基準：舊版 preprocess_video vs. ClipPreprocessor
+# 用法：python benchmarks/bench_preprocess.py --batch-sizes 1 4 8
+import argparse
+
+import cv2
+import numpy as np
+import torch
+
+from common import timeit
+from preprocess import ClipPreprocessor
+
+
+# 原本 grpc_server.preprocess_video 的實作（list comprehension + 三次複製）
+def legacy_preprocess_video(frames, device, frame_size=(224, 224)):
+    frames = [cv2.resize(f, frame_size)[:, :, ::-1] for f in frames]
+    frames = np.array(frames, dtype=np.float32) / 255.0
+    frames_tensor = torch.tensor(frames).permute(3, 0, 1, 2)
+    return frames_tensor.unsqueeze(0).to(device)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-frames", type=int, default=36)
+    parser.add_argument("--img-size", type=int, default=224)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    size = (args.img_size, args.img_size)
+    rng = np.random.default_rng(0)
+    print(f"device={device} num_frames={args.num_frames} img_size={args.img_size}")
+    print(f"{'batch':>5} {'input':>8} {'legacy ms/clip':>15} {'fused ms/clip':>14} {'speedup':>8}")
+
+    for batch_size in args.batch_sizes:
+        # 已 resize 的 clip（ClipRingBuffer 的 snapshot）與原始大小的 crop 兩種輸入
+        resized = [rng.integers(0, 256, (args.num_frames, args.img_size, args.img_size, 3), dtype=np.uint8)
+                   for _ in range(batch_size)]
+        raw = [[rng.integers(0, 256, (300, 260, 3), dtype=np.uint8) for _ in range(args.num_frames)]
+               for _ in range(batch_size)]
+        preprocessor = ClipPreprocessor(args.num_frames, size, batch_size, device)
+
+        for name, clips in (("resized", resized), ("raw", raw)):
+            expected = torch.cat([legacy_preprocess_video(clip, device, size) for clip in clips])
+            assert torch.allclose(preprocessor(clips), expected), "ClipPreprocessor output differs from legacy"
+
+            legacy = timeit(lambda: torch.cat([legacy_preprocess_video(clip, device, size) for clip in clips]),
+                            args.repeat) / batch_size
+            fused = timeit(lambda: preprocessor(clips), args.repeat) / batch_size
+            print(f"{batch_size:>5} {name:>8} {legacy:>15.2f} {fused:>14.2f} {legacy / fused:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# ViViT 分類在多個執行緒 vs. 多個 worker process（共享記憶體傳遞 clip）下的吞吐量
+# 用法：python benchmarks/bench_process_workers.py --workers 1 2 4 --torch-threads 1
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+
+from common import ROOT_DIR, build_vivit
+from preprocess import ClipPreprocessor
+from shm_workers import ProcessWorkerPool, SharedSlots, fork_available
+
+NUM_FRAMES = 36
+IMG_SIZE = 224
+CLIP_SHAPE = (NUM_FRAMES, IMG_SIZE, IMG_SIZE, 3)
+
+
+def load_model(checkpoint):
+    torch.manual_seed(0)  # 沒有 checkpoint 時每個 worker 也要有相同的權重
+    model = build_vivit(num_frames=NUM_FRAMES, img_size=IMG_SIZE)
+    if os.path.exists(checkpoint):
+        model.load_state_dict(torch.load(checkpoint, map_location="cpu"))
+    model.eval()
+    model.optimize_for_inference()
+    return model
+
+
+def classify(model, preprocessor, clips):
+    with torch.no_grad():
+        probs = torch.softmax(model(preprocessor(clips)), dim=1)
+    top_prob, top_class = torch.max(probs, dim=1)
+    return top_class.tolist(), top_prob.tolist()
+
+
+def run_threads(args, clips, num_workers):
+    # 原本的做法：同一個 process 內多個執行緒共用模型
+    torch.set_num_threads(args.torch_threads * num_workers)
+    model = load_model(args.checkpoint)
+    preprocessors = [ClipPreprocessor(NUM_FRAMES, (IMG_SIZE, IMG_SIZE), args.batch_size) for _ in range(num_workers)]
+    batches = [clips[i:i + args.batch_size] for i in range(0, len(clips), args.batch_size)]
+    results = [None] * len(batches)
+
+    def worker(w):
+        for b in range(w, len(batches), num_workers):
+            results[b] = classify(model, preprocessors[w], batches[b])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(num_workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, results
+
+
+def run_processes(args, clips, num_workers):
+    batches = [list(range(i, min(i + args.batch_size, len(clips)))) for i in range(0, len(clips), args.batch_size)]
+    slots = SharedSlots(len(clips), int(np.prod(CLIP_SHAPE)))
+    for i, clip in enumerate(clips):
+        slots.write(i, clip)
+
+    def init():
+        return load_model(args.checkpoint), ClipPreprocessor(NUM_FRAMES, (IMG_SIZE, IMG_SIZE), args.batch_size)
+
+    def handle(state, task):
+        model, preprocessor = state
+        return classify(model, preprocessor, [slots.view(slot, CLIP_SHAPE) for slot in task])
+
+    pool = ProcessWorkerPool("bench", init, handle, num_workers, args.torch_threads)
+    pool.start()
+    # 先讓每個 process 完成模型載入與暖機
+    warmup = threading.Semaphore(0)
+    for w in range(num_workers):
+        pool.submit(w, batches[0], lambda ok, result: warmup.release())
+    for _ in range(num_workers):
+        warmup.acquire()
+
+    results = [None] * len(batches)
+    done = threading.Semaphore(0)
+    start = time.perf_counter()
+    for b, batch in enumerate(batches):
+        def on_result(ok, result, b=b):
+            results[b] = result
+            done.release()
+        pool.submit(b, batch, on_result)
+    for _ in batches:
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    pool.stop()
+    slots.close()
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=os.path.join(ROOT_DIR, "models", "best_mode_36l.pth"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--torch-threads", type=int, default=1, help="每個 worker 的 torch 執行緒數")
+    parser.add_argument("--clips", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    if not fork_available():
+        raise SystemExit("worker process 需要 fork start method")
+    rng = np.random.default_rng(0)
+    clips = [rng.integers(0, 256, CLIP_SHAPE, dtype=np.uint8) for _ in range(args.clips)]
+
+    print(f"cpus={os.cpu_count()} clips={args.clips} batch={args.batch_size} torch_threads/worker={args.torch_threads}")
+    print(f"{'workers':>7} {'threads clips/s':>16} {'processes clips/s':>18} {'speedup':>8} {'same labels':>12}")
+    # 主 process 執行過 torch 運算後再 fork 可能卡住，所有 process 版本先跑完
+    process_runs = {n: run_processes(args, clips, n) for n in args.workers}
+    for num_workers in args.workers:
+        process_time, process_results = process_runs[num_workers]
+        thread_time, thread_results = run_threads(args, clips, num_workers)
+        same = all(t[0] == p[0] for t, p in zip(thread_results, process_results))
+        print(f"{num_workers:>7} {args.clips / thread_time:>16.2f} {args.clips / process_time:>18.2f} "
+              f"{thread_time / process_time:>7.2f}x {str(same):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# ViViT 輸入設定檔比較：幀數 / 解析度越小推論越快，比較各設定檔的延遲與準確率
+# 每個保存的 clip 以 full 設定檔（36 幀 224px）讀入，其他設定檔取最新的幀並縮小（與 ClipRingBuffer 相同）
+# 用法：python benchmarks/bench_profiles.py --clips-dir data/clips --profiles full balanced fast
+import argparse
+import os
+
+import numpy as np
+import torch
+
+from common import ROOT_DIR, build_vivit, timeit
+from clip_dataset import load_labeled_clips, resize_clip
+from preprocess import ClipPreprocessor
+
+PROFILES = {"full": (36, 224), "balanced": (24, 192), "fast": (16, 160)}
+TRAINED_NUM_FRAMES, TRAINED_IMG_SIZE = PROFILES["full"]
+
+
+def load_profile_model(checkpoint, num_classes, num_frames, img_size):
+    model = build_vivit(num_classes=num_classes, num_frames=num_frames, img_size=img_size)
+    model.load_resized_state_dict(torch.load(checkpoint, map_location="cpu"), TRAINED_NUM_FRAMES, TRAINED_IMG_SIZE)
+    model.eval()
+    model.optimize_for_inference(fuse_qkv=True)
+    return model
+
+
+def evaluate_profile(model, clips, num_frames, img_size, repeat):
+    """逐一預測（batch 1），回傳預測類別與延遲（ms）"""
+    # ClipPreprocessor 每次呼叫都寫入同一個輸出 tensor，必須在每次 forward 前才前處理
+    preprocessor = ClipPreprocessor(num_frames, (img_size, img_size), 1)
+    predictions = []
+    for clip, _ in clips:
+        frames_tensor = preprocessor([resize_clip(clip[-num_frames:], img_size)])
+        predictions.append(int(model(frames_tensor).argmax(dim=1)))
+    frames_tensor = preprocessor([resize_clip(clips[0][0][-num_frames:], img_size)])
+    latency = timeit(lambda: model(frames_tensor), repeat)
+    return np.array(predictions), latency
+
+
+@torch.no_grad()
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=os.path.join(ROOT_DIR, "models", "best_mode_36l.pth"))
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), default=list(PROFILES))
+    parser.add_argument("--clips-dir", default=None, help="未指定時以隨機 clip 只比較與 full 的一致率與延遲")
+    parser.add_argument("--windows-per-video", type=int, default=4)
+    parser.add_argument("--random-clips", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    with open(os.path.join(ROOT_DIR, "models", "class.txt"), 'r', encoding='utf-8') as f:
+        class_names = [line.strip() for line in f if line.strip()]
+
+    if args.clips_dir:
+        clips = load_labeled_clips(args.clips_dir, class_names, TRAINED_NUM_FRAMES, TRAINED_IMG_SIZE,
+                                   args.windows_per_video)
+        if not clips:
+            raise SystemExit(f"no clips found under {args.clips_dir}/<class name>/")
+    else:
+        rng = np.random.default_rng(0)
+        clips = [(rng.integers(0, 256, (TRAINED_NUM_FRAMES, TRAINED_IMG_SIZE, TRAINED_IMG_SIZE, 3), dtype=np.uint8), -1)
+                 for _ in range(args.random_clips)]
+    labels = np.array([label for _, label in clips])
+
+    results = {}
+    for name in ["full"] + [p for p in args.profiles if p != "full"]:
+        num_frames, img_size = PROFILES[name]
+        model = load_profile_model(args.checkpoint, len(class_names), num_frames, img_size)
+        predictions, latency = evaluate_profile(model, clips, num_frames, img_size, args.repeat)
+        results[name] = (num_frames, img_size, model.num_tokens, predictions, latency)
+
+    full_pred, full_ms = results["full"][3], results["full"][4]
+    print(f"{len(clips)} clips, batch 1, {torch.get_num_threads()} threads")
+    print(f"{'profile':>9} {'frames':>6} {'size':>5} {'tokens':>6} {'ms':>8} {'speedup':>8} {'acc':>7} {'agree':>7}")
+    for name in args.profiles:
+        num_frames, img_size, num_tokens, predictions, latency = results[name]
+        acc = f"{(predictions == labels).mean():.1%}" if args.clips_dir else "-"
+        agree = (predictions == full_pred).mean()
+        print(f"{name:>9} {num_frames:>6} {img_size:>5} {num_tokens:>6} {latency:>8.1f} "
+              f"{full_ms / latency:>7.2f}x {acc:>7} {agree:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# http_api 統計資料寫入吞吐量：舊版每次重寫整個 user_stats.json vs. StatsStore（append-only log + snapshot）
+# 用法：python benchmarks/bench_stats_store.py --users 10 1000 10000
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from common import ROOT_DIR  # noqa: F401 讓 repo 根目錄可被 import
+from stats_store import StatsStore
+
+CATEGORIES = ["eating", "licking", "relex", "toilet"]
+
+
+def make_users(num_users):
+    now = datetime.now().isoformat()
+    return {f"user{i}": {"total_count": 0, "categories": {c: 0 for c in CATEGORIES}, "last_update": now}
+            for i in range(num_users)}
+
+
+# 原本 http_api.add_classification 的做法：更新後以 indent=2 重寫整個檔案
+def legacy_add(path, users, user_id, category):
+    users[user_id]["categories"][category] += 1
+    users[user_id]["total_count"] += 1
+    users[user_id]["last_update"] = datetime.now().isoformat()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(users, f, ensure_ascii=False, indent=2)
+
+
+def run(fn, events, duration):
+    start = time.perf_counter()
+    done = 0
+    while time.perf_counter() - start < duration:
+        for user_id, category in events:
+            fn(user_id, category)
+        done += len(events)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--http", action="store_true", help="同時測試經過 Flask test client 的 POST 吞吐量")
+    args = parser.parse_args()
+
+    print(f"{'users':>7} {'legacy ev/s':>12} {'log ev/s':>10} {'speedup':>8}" + (f" {'POST/s':>8}" if args.http else ""))
+    for num_users in args.users:
+        events = [(f"user{random.randrange(num_users)}", random.choice(CATEGORIES)) for _ in range(200)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "user_stats.json")
+            users = make_users(num_users)
+            legacy = run(lambda u, c: legacy_add(path, users, u, c), events, args.duration)
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(make_users(num_users), f)
+            store = StatsStore(path, CATEGORIES, snapshot_interval=1)
+            store.start()
+            log_rate = run(lambda u, c: store.add(u, c), events, args.duration)
+            store.close()
+
+            line = f"{num_users:>7} {legacy:>12.0f} {log_rate:>10.0f} {log_rate / legacy:>7.1f}x"
+            if args.http:
+                line += f" {http_rate(tmp, num_users, events, args.duration):>8.0f}"
+            print(line)
+
+
+def http_rate(tmp, num_users, events, duration):
+    import http_api
+    path = os.path.join(tmp, "http_stats.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(make_users(num_users), f)
+    http_api.stats_store.close()
+    http_api.stats_store = StatsStore(path, CATEGORIES, snapshot_interval=1)
+    http_api.stats_store.start()
+    client = http_api.app.test_client()
+    rate = run(lambda u, c: client.post("/api/classification", json={"user_id": u, "category": c}), events, duration)
+    http_api.stats_store.close()
+    return rate
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# ViViT_Factorized 各元件的微基準：TubeletEmbedding、TokenProcessor、Attention、MLP、TransformerEncoderBlock、
+# 空間 / 時間 Transformer 與完整模型，依 batch size、幀數、解析度與執行緒數分別計時（eager 與合併 QKV + SDPA）
+# 結果寫成 JSON，可用 --baseline 與其他 commit 的結果比較；--profile 以 torch profiler 輸出 trace 與 flame 風格的摘要
+# 用法：python benchmarks/bench_vivit_components.py --batch-sizes 1 4 --num-frames 16 36 --threads 1 4 --output vivit.json
+#       python benchmarks/bench_vivit_components.py --profile --trace-dir profiles/
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+import torch
+
+from common import ROOT_DIR, build_vivit, timeit
+from model_util import TokenProcessor
+
+PATCH_SIZE, TUBELET_SIZE = 16, 2
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_model(checkpoint, num_frames, img_size):
+    model = build_vivit(num_frames=num_frames, img_size=img_size)
+    if os.path.exists(checkpoint):
+        model.load_resized_state_dict(torch.load(checkpoint, map_location="cpu"), 36, 224)
+    return model.eval()
+
+
+def component_benchmarks(model, clip):
+    """回傳 [(元件名稱, 要計時的函數)]，每個元件的輸入都是模型中實際的形狀"""
+    tokens = model.tubelet_embedding(clip)  # (B, N, D)
+    with_cls = TokenProcessor.add_positional_embedding(TokenProcessor.add_cls_token(tokens, model.cls_token),
+                                                       model.pos_embedding)  # (B, N+1, D)
+    block = model.spatial_transformer.layers[0]
+    spatial_out = model.spatial_transformer(with_cls)
+    temporal_in = torch.cat((spatial_out[:, 0:1], TokenProcessor.temporal_embedding(spatial_out, method="gap")), dim=1)
+    return [
+        ("tubelet_embedding", lambda: model.tubelet_embedding(clip)),
+        ("add_cls_and_pos", lambda: TokenProcessor.add_positional_embedding(
+            TokenProcessor.add_cls_token(tokens, model.cls_token), model.pos_embedding)),
+        ("attention", lambda: block.attn(block.norm_attn(with_cls))),
+        ("mlp", lambda: block.mlp(block.norm_mlp(with_cls))),
+        ("encoder_block", lambda: block(with_cls)),
+        ("spatial_transformer", lambda: model.spatial_transformer(with_cls)),
+        ("temporal_embedding", lambda: TokenProcessor.temporal_embedding(spatial_out, method="gap")),
+        ("temporal_transformer", lambda: model.temporal_transformer(temporal_in)),
+        ("forward_embeddings", lambda: model.forward_embeddings(tokens)),
+        ("full_model", lambda: model(clip)),
+    ]
+
+
+@torch.no_grad()
+def run_benchmarks(args):
+    results = []
+    for num_frames in args.num_frames:
+        for img_size in args.img_sizes:
+            eager = load_model(args.checkpoint, num_frames, img_size)
+            models = {"eager": eager}
+            if not args.eager_only:
+                models["fast"] = copy.deepcopy(eager).optimize_for_inference(fuse_qkv=True)
+            for threads in args.threads:
+                torch.set_num_threads(threads)
+                for batch_size in args.batch_sizes:
+                    torch.manual_seed(0)
+                    clip = torch.rand(batch_size, 3, num_frames, img_size, img_size)
+                    for mode, model in models.items():
+                        for component, fn in component_benchmarks(model, clip):
+                            ms = timeit(fn, args.repeat)
+                            results.append({"component": component, "mode": mode, "batch_size": batch_size,
+                                            "num_frames": num_frames, "img_size": img_size, "threads": threads,
+                                            "ms": round(ms, 3)})
+                            print(f"frames={num_frames:<3} size={img_size:<4} threads={threads:<2} batch={batch_size:<2} "
+                                  f"{mode:>5} {component:>21} {ms:>9.2f} ms")
+            del eager, models
+    return results
+
+
+def result_key(r):
+    return r["component"], r["mode"], r["batch_size"], r["num_frames"], r["img_size"], r["threads"]
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {result_key(r): r["ms"] for r in baseline["results"]}
+    print(f"\nvs. {baseline_path} (commit {baseline['meta'].get('commit')}): ratio = new / old")
+    for r in results:
+        key = result_key(r)
+        if key in old and old[key] > 0:
+            ratio = r["ms"] / old[key]
+            flag = "  <-- slower" if ratio > 1.1 else ("  faster" if ratio < 0.9 else "")
+            print(f"{' '.join(str(k) for k in key[1:]):>22} {key[0]:>21} {old[key]:>9.2f} -> {r['ms']:>9.2f} ms "
+                  f"({ratio:.2f}x){flag}")
+
+
+# ---------- torch profiler ----------
+
+def label_modules(model):
+    """每個子模組的 forward 包在 record_function(模組名稱) 中，profiler 的 trace 與摘要才能對應到元件"""
+    handles = []
+    for name, module in model.named_modules():
+        name = name or "ViViT_Factorized"
+
+        def pre_hook(module, inputs, name=name):
+            module._profile_range = torch.profiler.record_function(name)
+            module._profile_range.__enter__()
+
+        def post_hook(module, inputs, output):
+            module._profile_range.__exit__(None, None, None)
+
+        handles.append(module.register_forward_pre_hook(pre_hook))
+        handles.append(module.register_forward_hook(post_hook))
+    return handles
+
+
+def module_totals(prof, iterations):
+    """每個模組 label 每次 forward 的累計 CPU 時間（ms，含子模組）"""
+    return {e.key: e.cpu_time_total / iterations / 1000 for e in prof.key_averages()}
+
+
+def flame_summary(totals, model):
+    """依模組階層印出每次 forward 的累計 CPU 時間（含子模組）與占整體的比例"""
+    root = totals.get("ViViT_Factorized", 0.0) or 1.0
+    print(f"\n{'module':<48} {'ms/iter':>9} {'share':>7}")
+    for name, module in model.named_modules():
+        label = name or "ViViT_Factorized"
+        if label not in totals:
+            continue
+        depth = name.count(".") + 1 if name else 0
+        print(f"{'  ' * depth + label.split('.')[-1] + f' ({type(module).__name__})':<48} "
+              f"{totals[label]:>9.2f} {totals[label] / root:>7.1%}")
+
+
+def write_folded_stacks(totals, model, path):
+    """輸出 flamegraph.pl / speedscope 可讀的 folded stacks（每個模組扣掉子模組後的時間，單位 us）"""
+    # ModuleList 等沒有呼叫 forward 的容器不會出現在 profiler 中，堆疊只包含實際執行的模組
+    profiled = [name for name, _ in model.named_modules() if (name or "ViViT_Factorized") in totals]
+
+    def parent(name):
+        parts = name.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            if ".".join(parts[:i]) in profiled:
+                return ".".join(parts[:i])
+        return ""
+
+    self_ms = {name: totals[name or "ViViT_Factorized"] for name in profiled}
+    for name in profiled:
+        if name:
+            self_ms[parent(name)] -= totals[name]
+    with open(path, "w", encoding="utf-8") as f:
+        for name in profiled:
+            stack, node = [], name
+            while node:
+                stack.append(node)
+                node = parent(node)
+            stack.append("ViViT_Factorized")
+            self_us = int(max(0.0, self_ms[name]) * 1000)
+            if self_us > 0:
+                f.write(f"{';'.join(reversed(stack))} {self_us}\n")
+
+
+@torch.no_grad()
+def run_profile(args):
+    num_frames, img_size, batch_size = args.num_frames[-1], args.img_sizes[-1], args.batch_sizes[0]
+    torch.set_num_threads(args.threads[0])
+    model = load_model(args.checkpoint, num_frames, img_size)
+    if not args.eager_only:
+        model.optimize_for_inference(fuse_qkv=True)
+    clip = torch.rand(batch_size, 3, num_frames, img_size, img_size)
+    model(clip)  # 暖機
+    handles = label_modules(model)
+    with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU]) as prof:
+        for _ in range(args.repeat):
+            model(clip)
+    for handle in handles:
+        handle.remove()
+
+    print(f"\nprofile: frames={num_frames} size={img_size} batch={batch_size} threads={args.threads[0]} "
+          f"{'eager' if args.eager_only else 'fast'} x{args.repeat}")
+    print(prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=15))
+    totals = module_totals(prof, args.repeat)
+    flame_summary(totals, model)
+    os.makedirs(args.trace_dir, exist_ok=True)
+    trace_path = os.path.join(args.trace_dir, "vivit_trace.json")
+    stacks_path = os.path.join(args.trace_dir, "vivit_stacks.txt")
+    prof.export_chrome_trace(trace_path)  # chrome://tracing 或 https://ui.perfetto.dev
+    write_folded_stacks(totals, model, stacks_path)  # flamegraph.pl vivit_stacks.txt > flame.svg
+    print(f"\ntrace written to {trace_path}, stacks to {stacks_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=os.path.join(ROOT_DIR, "models", "best_mode_36l.pth"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--num-frames", type=int, nargs="+", default=[16, 36])
+    parser.add_argument("--img-sizes", type=int, nargs="+", default=[224])
+    parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--eager-only", action="store_true", help="不比較合併 QKV + SDPA 的推論路徑")
+    parser.add_argument("--output", default=None, help="結果寫成 JSON")
+    parser.add_argument("--baseline", default=None, help="與之前的 JSON 結果比較")
+    parser.add_argument("--profile", action="store_true", help="以最後一組幀數 / 解析度、第一個 batch size 執行 profiler")
+    parser.add_argument("--trace-dir", default="profiles")
+    args = parser.parse_args()
+
+    for num_frames in args.num_frames:
+        if num_frames % TUBELET_SIZE:
+            parser.error(f"--num-frames must be multiples of {TUBELET_SIZE}")
+    for img_size in args.img_sizes:
+        if img_size % PATCH_SIZE:
+            parser.error(f"--img-sizes must be multiples of {PATCH_SIZE}")
+
+    if args.profile:
+        run_profile(args)
+        return
+    results = run_benchmarks(args)
+    if args.output:
+        meta = {
+            "commit": git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# ViViT 變體吞吐量比較：joint（原本的 ViViT_Factorized）vs. factorized（ViViT_FactorizedEncoder）
+# 用法：python benchmarks/bench_vivit_variants.py --batch-sizes 1 4 8
+import argparse
+import os
+
+import torch
+
+from common import build_vivit, timeit
+from model import ViViT_Factorized, ViViT_FactorizedEncoder
+
+VARIANTS = {"joint": ViViT_Factorized, "factorized": ViViT_FactorizedEncoder}
+
+
+@torch.no_grad()
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default="models/best_mode_36l.pth")
+    parser.add_argument("--num-frames", type=int, default=36)
+    parser.add_argument("--img-size", type=int, default=224)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-fast-attention", action="store_true")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    models = {}
+    for name, model_cls in VARIANTS.items():
+        model = build_vivit(model_cls, num_frames=args.num_frames, img_size=args.img_size).to(device)
+        if os.path.exists(args.checkpoint):
+            # 兩個變體的參數完全相同，可以載入同一份 checkpoint
+            model.load_state_dict(torch.load(args.checkpoint, map_location=device))
+        model.eval()
+        if not args.no_fast_attention:
+            model.optimize_for_inference()
+        models[name] = model
+
+    print(f"device={device} threads={torch.get_num_threads()} num_frames={args.num_frames} img_size={args.img_size}")
+    print(f"{'batch':>5} {'variant':>11} {'ms/batch':>9} {'clips/s':>8} {'speedup':>8}")
+    for batch_size in args.batch_sizes:
+        clip = torch.rand(batch_size, 3, args.num_frames, args.img_size, args.img_size, device=device)
+        baseline = None
+        for name, model in models.items():
+            ms = timeit(lambda: model(clip), args.repeat)
+            baseline = baseline or ms
+            print(f"{batch_size:>5} {name:>11} {ms:>9.1f} {batch_size / ms * 1000:>8.2f} {baseline / ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
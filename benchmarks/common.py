@@ -0,0 +1,34 @@
+# benchmarks 共用的工具函數
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# 與 grpc_server.py 相同的 ViViT 設定
+VIVIT_CONFIG = dict(
+    in_channels=3, embed_dim=96, patch_size=16, tubelet_size=2,
+    num_heads=4, mlp_dim=96 * 3, num_layers_spatial=2, num_layers_temporal=2, droplayer_p=0.1
+)
+
+
+def build_vivit(model_cls=None, num_classes=4, num_frames=36, img_size=224):
+    from model import ViViT_Factorized
+    model_cls = model_cls or ViViT_Factorized
+    return model_cls(num_classes=num_classes, num_frames=num_frames, img_size=img_size, **VIVIT_CONFIG)
+
+
+def timeit(fn, repeat, warmup=1):
+    """回傳 fn 執行時間的中位數（ms）"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
@@ -0,0 +1,93 @@
+# StreamImages 壓力測試：以合成影像模擬多個相機串流，統計每個並行數下的延遲與吞吐量
+# 先啟動 python grpc_server.py 或 python grpc_aio_server.py，再執行：
+# python benchmarks/load_test.py --concurrency 1 10 50 100 200 --duration 10
+import argparse
+import asyncio
+import time
+
+import cv2
+import grpc
+import numpy as np
+
+from common import ROOT_DIR  # noqa: F401 讓 repo 根目錄可被 import
+import image_stream_pb2
+import image_stream_pb2_grpc
+
+
+def make_jpeg(width, height, seed):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_NEAREST)
+    return cv2.imencode('.jpg', frame)[1].tobytes()
+
+
+async def run_client(stub, client_id, frames, fps, duration, mode, latencies, counters):
+    """frames 為 JPEG bytes 的 list，依序循環送出（benchmarks/replay.py 用來重播錄好的畫面）"""
+    sent_at = {}
+
+    async def requests():
+        interval = 1.0 / fps
+        start = time.perf_counter()
+        frame_id = 0
+        while time.perf_counter() - start < duration:
+            sent_at[frame_id] = time.perf_counter()
+            yield image_stream_pb2.ImageRequest(image=frames[frame_id % len(frames)])
+            frame_id += 1
+            # 依固定節奏送出，不因 server 較慢而放慢（與相機相同）
+            await asyncio.sleep(max(0.0, start + frame_id * interval - time.perf_counter()))
+        counters["sent"] += frame_id
+
+    metadata = (('user-id', f'load-test-{client_id}'), ('response-mode', mode))
+    try:
+        async for response in stub.StreamImages(requests(), metadata=metadata):
+            latencies.append(time.perf_counter() - sent_at[response.frame_id])
+            counters["received"] += 1
+            counters["bytes"] += response.ByteSize()
+    except grpc.aio.AioRpcError as e:
+        counters["errors"] += 1
+        print(f"client {client_id}: {e.code().name} {e.details()}")
+
+
+async def run_level(target, concurrency, args, jpeg):
+    latencies = []
+    counters = {"sent": 0, "received": 0, "bytes": 0, "errors": 0}
+    async with grpc.aio.insecure_channel(target) as channel:
+        stub = image_stream_pb2_grpc.ImageStreamServiceStub(channel)
+        start = time.perf_counter()
+        await asyncio.gather(*[run_client(stub, i, [jpeg], args.fps, args.duration, args.mode, latencies, counters)
+                               for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    lat_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+        "fps_out": counters["received"] / elapsed,
+        "drop": 1 - counters["received"] / counters["sent"] if counters["sent"] else 0.0,
+        "bytes_per_resp": counters["bytes"] / counters["received"] if counters["received"] else 0.0,
+        "errors": counters["errors"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", default="localhost:50051")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--duration", type=float, default=10.0, help="每個串流送出 frame 的秒數")
+    parser.add_argument("--fps", type=float, default=15.0, help="每個串流每秒送出的 frame 數")
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"))
+    parser.add_argument("--mode", choices=["tracks", "annotated"], default="tracks")
+    args = parser.parse_args()
+
+    jpeg = make_jpeg(args.size[0], args.size[1], seed=0)
+    print(f"target={args.target} fps/stream={args.fps} frame={args.size[0]}x{args.size[1]} "
+          f"({len(jpeg)} bytes) mode={args.mode}")
+    print(f"{'streams':>7} {'p50 ms':>8} {'p99 ms':>8} {'out fps':>8} {'drop':>6} {'B/resp':>8} {'errors':>6}")
+    for concurrency in args.concurrency:
+        r = await run_level(args.target, concurrency, args, jpeg)
+        print(f"{r['concurrency']:>7} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['fps_out']:>8.1f} "
+              f"{r['drop']:>6.1%} {r['bytes_per_resp']:>8.0f} {r['errors']:>6}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,292 @@
+# 離線重播整條 YOLO → DeepSort → ViViT pipeline：把錄好的畫面（JPEG 資料夾或影片）當成多個相機串流送入，
+# 統計端到端吞吐量、各階段延遲（grpc_server.metrics）與 peak RSS，結果可另存 JSON 追蹤效能回歸
+# --mode inprocess：與 StreamImages 相同的 StreamWindow + submit_frame 路徑，不經過網路
+# --mode grpc：透過 gRPC 連到 --target；加上 --spawn-server 時由此腳本以相同設定啟動 grpc_server.py
+# --standin 在沒有 GPU 與訓練權重的主機上改用小型替代模型（隨機權重的 yolo11n、mobilenet embedder、fast 設定檔），
+# 隨機權重的 YOLO 偵測不到貓，可加上 --synthetic-detections 在沒有偵測結果時放一個固定的框，讓 DeepSort 與 ViViT 也有工作
+# --reload 在 --reload-at 秒時 hot swap 成另一個 ViViT checkpoint，結果中的 model_versions 為新舊版本各自的推論延遲
+# 用法：python benchmarks/replay.py --source data/cat.mp4 --streams 4 --fps 15 --duration 30 --standin --synthetic-detections
+import argparse
+import asyncio
+import glob
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import cv2
+import numpy as np
+
+from common import ROOT_DIR
+from start_servers import wait_for_grpc_ready
+
+STANDIN_ENV = {
+    "CAT_YOLO_MODEL": "yolo11n.yaml",
+    "CAT_DEEPSORT_EMBEDDER": "mobilenet",
+    "CAT_VIVIT_PROFILE": "fast",
+}
+METRICS_URL = "http://127.0.0.1:9100/metrics.json"
+
+
+def load_frames(source, max_frames, size):
+    """回傳 JPEG bytes 的 list：JPEG 資料夾直接讀檔，影片逐幀重新編碼，未指定時產生移動色塊的合成畫面"""
+    if source and os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, "*.jpg")) + glob.glob(os.path.join(source, "*.jpeg")))
+        frames = []
+        for path in paths[:max_frames]:
+            with open(path, "rb") as f:
+                frames.append(f.read())
+        return frames
+    if source:
+        cap = cv2.VideoCapture(source)
+        frames = []
+        while len(frames) < max_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(cv2.imencode(".jpg", frame)[1].tobytes())
+        cap.release()
+        return frames
+    width, height = size
+    frames = []
+    for i in range(min(max_frames, 90)):
+        frame = np.full((height, width, 3), 60, dtype=np.uint8)
+        cx = int(width * (0.3 + 0.4 * (i % 45) / 45))
+        cv2.ellipse(frame, (cx, height // 2), (width // 8, height // 6), 0, 0, 360, (40, 120, 200), -1)
+        frames.append(cv2.imencode(".jpg", frame)[1].tobytes())
+    return frames
+
+
+def with_synthetic_detections(detect, class_id):
+    """YOLO 沒有偵測到任何東西時，在畫面中央放一個固定的框（仍執行真正的 YOLO，保留它的成本）"""
+    def wrapped(model, frames):
+        outputs = detect(model, frames)
+        for i, (frame, frame_outputs) in enumerate(zip(frames, outputs)):
+            if len(frame_outputs) == 0:
+                height, width = frame.shape[:2]
+                outputs[i] = np.array([[width / 4, height / 4, width * 3 / 4, height * 3 / 4, 0.9, class_id]],
+                                      dtype=np.float32)
+        return outputs
+    return wrapped
+
+
+def import_server(synthetic_detections):
+    import grpc_server
+
+    if synthetic_detections:
+        grpc_server.detect = with_synthetic_detections(grpc_server.detect, grpc_server.CAT_CLASS_ID)
+    return grpc_server
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1024  # Linux 的 ru_maxrss 單位為 KB
+
+
+def summarize(latencies, sent, received, elapsed):
+    lat_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "sent": sent,
+        "received": received,
+        "throughput_fps": received / elapsed,
+        "drop": 1 - received / sent if sent else 0.0,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+    }
+
+
+# ---------- in-process ----------
+
+def run_inprocess(args, frames):
+    from backpressure import StreamWindow
+
+    server = import_server(args.synthetic_detections)
+    server.start_workers()
+    # 等所有模型載入並完成 warm-up 再開始計時，結果才不包含啟動成本
+    if not server.wait_until_ready(args.startup_timeout):
+        raise SystemExit(f"pipeline not ready within {args.startup_timeout}s: {server.health_status()}")
+    latencies, counters, lock = [], {"sent": 0, "received": 0}, threading.Lock()
+
+    def run_stream(index):
+        # user_id 為 None，不回報分類結果到 HTTP API
+        session = server.session_manager.acquire(f"replay-{index}", None)
+        window = StreamWindow(lambda payload, result_q: server.submit_frame(payload, result_q, session),
+                              max_in_flight=server.MAX_IN_FLIGHT_FRAMES, result_timeout=server.RESULT_TIMEOUT)
+
+        def feed():
+            interval, start, frame_id = 1.0 / args.fps, time.perf_counter(), 0
+            while time.perf_counter() - start < args.duration:
+                window.offer(frames[(frame_id + index) % len(frames)])
+                frame_id += 1
+                time.sleep(max(0.0, start + frame_id * interval - time.perf_counter()))
+            window.finish()
+            with lock:
+                counters["sent"] += frame_id
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        for (frame, track_results), frame_id, latency in window.results():
+            server.build_response(frame, track_results, frame_id)
+            with lock:
+                counters["received"] += 1
+                if latency is not None:
+                    latencies.append(latency)
+            if latency is not None:
+                server.record_frame_latency(session, frame_id, latency)
+        feeder.join()
+        server.session_manager.release(session, close=True)
+
+    start = time.perf_counter()
+    streams = [threading.Thread(target=run_stream, args=(i,)) for i in range(args.streams)]
+    if args.reload:
+        timer = threading.Timer(args.reload_at, lambda: print(server.reload_model("vivit", args.reload, version="reloaded")))
+        timer.daemon = True
+        timer.start()
+    for t in streams:
+        t.start()
+    for t in streams:
+        t.join()
+    result = summarize(latencies, counters["sent"], counters["received"], time.perf_counter() - start)
+    snapshot = server.metrics.snapshot()
+    result["stages"] = snapshot["stages"]
+    result["model_versions"] = snapshot["model_versions"]
+    server.stop_workers()
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+# ---------- gRPC ----------
+
+def spawn_server(args):
+    command = [sys.executable, os.path.abspath(__file__), "--serve"]
+    if args.synthetic_detections:
+        command.append("--synthetic-detections")
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=os.environ.copy())
+    if not wait_for_grpc_ready(args.admin_target, args.startup_timeout):
+        process.kill()
+        raise SystemExit(f"server on {args.admin_target} not ready within {args.startup_timeout}s")
+    return process
+
+
+def run_grpc(args, frames):
+    import grpc
+
+    import image_stream_pb2
+    import image_stream_pb2_grpc
+    from load_test import run_client
+
+    process = spawn_server(args) if args.spawn_server else None
+    latencies = []
+    counters = {"sent": 0, "received": 0, "bytes": 0, "errors": 0}
+
+    async def reload():
+        await asyncio.sleep(args.reload_at)
+        # ReloadModel 只在 server 的本機管理 port 提供
+        async with grpc.aio.insecure_channel(args.admin_target) as admin_channel:
+            admin = image_stream_pb2_grpc.ImageStreamServiceStub(admin_channel)
+            print(await admin.ReloadModel(image_stream_pb2.ReloadRequest(model="vivit", path=args.reload,
+                                                                         version="reloaded")))
+
+    async def run():
+        async with grpc.aio.insecure_channel(args.target) as channel:
+            stub = image_stream_pb2_grpc.ImageStreamServiceStub(channel)
+            # 每個串流從不同的位置開始重播，避免所有串流送出完全相同的畫面
+            clients = [run_client(stub, i, frames[i % len(frames):] + frames[:i % len(frames)],
+                                  args.fps, args.duration, "tracks", latencies, counters)
+                       for i in range(args.streams)]
+            if args.reload:
+                clients.append(reload())
+            await asyncio.gather(*clients)
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    result = summarize(latencies, counters["sent"], counters["received"], time.perf_counter() - start)
+    result["errors"] = counters["errors"]
+    try:
+        with urllib.request.urlopen(METRICS_URL, timeout=5) as response:
+            snapshot = json.loads(response.read())
+        result["stages"] = snapshot["stages"]
+        result["model_versions"] = snapshot["model_versions"]
+    except OSError as e:
+        print(f"metrics endpoint unavailable: {e}")
+        result["stages"], result["model_versions"] = {}, {}
+    if process is not None:
+        process.send_signal(signal.SIGINT)
+        process.wait(timeout=60)
+        result["peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    return result
+
+
+def serve(args):
+    """--spawn-server 啟動的子 process：套用相同的替代設定後執行 grpc_server.serve()"""
+    server = import_server(args.synthetic_detections)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        server.stop_workers()
+
+
+def report(args, result, num_frames):
+    print(f"mode={args.mode} streams={args.streams} fps/stream={args.fps} duration={args.duration}s "
+          f"source={args.source or 'synthetic'} ({num_frames} frames)")
+    print(f"throughput {result['throughput_fps']:.1f} fps  sent {result['sent']}  received {result['received']}  "
+          f"drop {result['drop']:.1%}  e2e p50 {result['p50_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms")
+    if "peak_rss_mb" in result:
+        print(f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"{'stage':>12} {'count':>7} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, stage in sorted(result["stages"].items()):
+        print(f"{name:>12} {stage['count']:>7} {stage['mean_ms']:>8.1f} {stage['p50_ms']:>8.1f} {stage['p99_ms']:>8.1f}")
+    for model, versions in sorted(result["model_versions"].items()):
+        for version, stage in sorted(versions.items()):
+            print(f"{model + '@' + version:>24} {stage['count']:>7} {stage['mean_ms']:>8.1f} "
+                  f"{stage['p50_ms']:>8.1f} {stage['p99_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", default=None, help="JPEG 資料夾或影片檔，未指定時使用合成畫面")
+    parser.add_argument("--mode", choices=["inprocess", "grpc"], default="inprocess")
+    parser.add_argument("--streams", type=int, default=2)
+    parser.add_argument("--fps", type=float, default=15.0, help="每個串流每秒送出的 frame 數")
+    parser.add_argument("--duration", type=float, default=20.0, help="每個串流送出 frame 的秒數")
+    parser.add_argument("--max-frames", type=int, default=900)
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"), help="合成畫面的大小")
+    parser.add_argument("--standin", action="store_true", help="改用小型替代模型（已設定的環境變數優先）")
+    parser.add_argument("--synthetic-detections", action="store_true")
+    parser.add_argument("--target", default="localhost:50051")
+    parser.add_argument("--admin-target", default="127.0.0.1:50052", help="GetHealth / ReloadModel 用的本機管理 port")
+    parser.add_argument("--spawn-server", action="store_true")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--reload", default=None, help="執行中 hot swap 成這個 ViViT checkpoint（models/ 底下）")
+    parser.add_argument("--reload-at", type=float, default=10.0, help="開始送 frame 後幾秒執行 --reload")
+    parser.add_argument("--output", default=None, help="結果另存為 JSON")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.standin:
+        for key, value in STANDIN_ENV.items():
+            os.environ.setdefault(key, value)
+    # grpc_server 以相對路徑讀取 models/
+    os.chdir(ROOT_DIR)
+    if args.serve:
+        serve(args)
+        return
+
+    frames = load_frames(args.source, args.max_frames, tuple(args.size))
+    if not frames:
+        raise SystemExit(f"no frames found in {args.source}")
+    result = run_inprocess(args, frames) if args.mode == "inprocess" else run_grpc(args, frames)
+    report(args, result, len(frames))
+    if args.output:
+        result["config"] = {key: value for key, value in vars(args).items() if key != "serve"}
+        result["env"] = {key: os.environ[key] for key in STANDIN_ENV if key in os.environ}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import queue
+import threading
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# 非同步、批次回報分類結果到 HTTP API
+class ClassificationReporter:
+    """
+    - record() 只把事件放進有上限的佇列，不會阻塞 ViViT 推論
+    - 背景執行緒每 flush_interval 秒把累積的事件合併成一次批次 POST（相同 user/category 合併計數）
+    - 使用 keep-alive 的 requests.Session 連線池，不再每次建立新連線
+    - 失敗時以指數退避重試 max_retries 次，仍失敗或佇列已滿時丟棄並計數
+    """
+
+    def __init__(self, url, flush_interval=1.0, max_queue=10000, max_batch_events=1000,
+                 max_retries=3, backoff=0.5, timeout=2):
+        self.url = url
+        self.flush_interval = flush_interval
+        self.max_batch_events = max_batch_events
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._lock = threading.Lock()
+        self.counters = Counter()  # queued / sent / rejected / dropped_full / dropped_failed / posts / retries
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止背景執行緒，並盡量送出佇列中剩餘的事件"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._flush(self._drain())
+        self._session.close()
+
+    def record(self, user_id, category, confidence=None):
+        try:
+            self._queue.put_nowait((user_id, category))
+            self._count("queued")
+        except queue.Full:
+            self._count("dropped_full")
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    def _drain(self):
+        events = []
+        while len(events) < self.max_batch_events:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            events = self._drain()
+            while events:
+                self._flush(events)
+                # 佇列累積超過一批時繼續送，不等下一個週期
+                events = self._drain() if len(events) >= self.max_batch_events else []
+
+    def _flush(self, events):
+        if not events:
+            return
+        coalesced = Counter(events)
+        payload = {"events": [{"user_id": user_id, "category": category, "count": count}
+                              for (user_id, category), count in coalesced.items()]}
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                self._count("retries")
+                # 停止中時不再等待退避，直接重試
+                self._stop_event.wait(self.backoff * (2 ** (attempt - 1)))
+            try:
+                response = self._session.post(self.url, json=payload, timeout=self.timeout)
+                self._count("posts")
+                if response.status_code == 200:
+                    # server 已套用這批事件，不論回應內容為何都不重試，否則會重複計數
+                    self._count("sent", len(events))
+                    try:
+                        rejected = response.json().get("rejected", [])
+                    except (ValueError, AttributeError):
+                        print("Unexpected response body from classification API")
+                        return
+                    if rejected:
+                        # 例如不在 CATEGORIES 中的類別，計數但不重試
+                        self._count("rejected", len(rejected))
+                    return
+                print(f"Failed to record classifications: {response.status_code}")
+                if 400 <= response.status_code < 500:
+                    break  # 請求本身有問題，重試也不會成功
+            except requests.RequestException as e:
+                print(f"Error recording classifications: {e}")
+
+        self._count("dropped_failed", len(events))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats["pending"] = self._queue.qsize()
+        return stats
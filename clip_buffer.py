@@ -0,0 +1,216 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+_buffer_ids = itertools.count()
+
+
+# 單一 track 的固定大小 clip 環形緩衝區
+class ClipRingBuffer:
+    """
+    每個 crop 進來時就 resize 成 frame_size 並寫入預先配置的 uint8 slot，
+    不再保留原始 frame 的參考，整張 frame 可以立即釋放。
+
+    capacity = num_frames + reserve，且每個 slot 同時寫入 i 與 i + capacity 兩個位置，
+    因此最新 num_frames 張永遠是一段連續、依時間排序的 view（不需複製）。
+    snapshot 之後再寫入 reserve 張 frame（預設等於 stride）之內，snapshot 的資料都不會被覆蓋。
+    """
+
+    def __init__(self, num_frames=36, stride=24, frame_size=(224, 224), reserve=None):
+        self.num_frames = num_frames
+        self.stride = stride
+        self.frame_size = frame_size  # (W, H)，與 cv2.resize 相同
+        self.capacity = num_frames + (stride if reserve is None else reserve)
+        width, height = frame_size
+        self.frames = np.empty((2 * self.capacity, height, width, 3), dtype=np.uint8)
+        self.written = 0  # 已寫入的 frame 總數（邏輯序號）
+        self.last_snapshot_end = 0
+        self.uid = next(_buffer_ids)
+        self.gate_state = None  # MotionGate 的參考簽章與推論時間
+
+    def push(self, crop):
+        slot = self.written % self.capacity
+        # 先遞增序號再覆寫，讓讀取端可以用 is_valid 偵測資料是否被覆寫（seqlock）
+        self.written += 1
+        cv2.resize(crop, self.frame_size, dst=self.frames[slot])
+        self.frames[slot + self.capacity] = self.frames[slot]
+
+    def ready(self):
+        """第一次累積滿 num_frames 時預測，之後每 stride 張新 frame 預測一次"""
+        if self.written < self.num_frames:
+            return False
+        return self.last_snapshot_end == 0 or self.written - self.last_snapshot_end >= self.stride
+
+    def snapshot(self):
+        end = self.written
+        start = end - self.num_frames
+        offset = start % self.capacity
+        self.last_snapshot_end = end
+        return ClipSnapshot(self, start, end, self.frames[offset:offset + self.num_frames])
+
+    def is_valid(self, snapshot):
+        # 邏輯序號 start 的 slot 會在寫入第 start + capacity 張 frame 時被覆寫
+        return self.written <= snapshot.start + self.capacity
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes
+
+    @staticmethod
+    def bytes_for(num_frames=36, stride=24, frame_size=(224, 224), reserve=None):
+        """一個 track 的緩衝區大小（鏡像寫入，為 2 * capacity 張 frame），用來推算記憶體上限"""
+        width, height = frame_size
+        return 2 * (num_frames + (stride if reserve is None else reserve)) * height * width * 3
+
+
+class ClipSnapshot:
+    def __init__(self, buffer, start, end, frames):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.frames = frames  # (num_frames, H, W, 3) uint8，指向緩衝區的 view
+
+    def is_valid(self):
+        """讀取 frames 之後呼叫，確認讀取期間資料沒有被新 frame 覆寫"""
+        return self.buffer.is_valid(self)
+
+
+# 所有串流共用的 clip 緩衝區管理
+class ClipStore:
+    """
+    以 (session_key, track_id) 為 key 管理 ClipRingBuffer：
+    - tracker 刪除 track 或 session 結束時立即釋放；已釋放的 session 不再配置緩衝區
+      （佇列中還沒處理完的 frame 不會替已關閉的 session 重新配置），直到 open_session() 重新開啟或超過 ttl
+    - 超過 ttl 秒沒有新 crop 的 track 會被回收
+    - 超過 max_tracks / max_bytes 時依 LRU 回收最久沒更新的 track，
+      但 active_window 秒內還有新 crop 的 track 不回收（否則滿載時 track 互相回收，沒有一個能累積到 num_frames）；
+      所有 track 都還在使用時，新 track 不配置緩衝區（get_or_create 回傳 None，計入 rejected）
+    """
+
+    def __init__(self, num_frames=36, stride=24, frame_size=(224, 224), reserve=None,
+                 max_tracks=32, max_bytes=512 * 1024 * 1024, ttl=30, active_window=1.0):
+        self.num_frames = num_frames
+        self.stride = stride
+        self.frame_size = frame_size
+        self.reserve = reserve
+        self.max_tracks = max_tracks
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.active_window = active_window
+        self._buffers = OrderedDict()  # LRU 順序：最舊的在前面
+        self._last_seen = {}
+        self._by_session = {}
+        self._released = {}  # 已釋放的 session_key -> 釋放時間
+        self._bytes = 0
+        self._last_expire = time.monotonic()
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.evictions = {"deleted": 0, "session": 0, "ttl": 0, "lru": 0}
+        self.rejected = 0  # 容量已滿且沒有可回收的 track，新 track 沒有配置緩衝區的次數
+
+    def get(self, key):
+        with self._lock:
+            return self._buffers.get(key)
+
+    def get_or_create(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_expire >= 1.0:
+                self._expire_locked(now)
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                if key[0] in self._released:
+                    return None
+                nbytes = ClipRingBuffer.bytes_for(self.num_frames, self.stride, self.frame_size, self.reserve)
+                if not self._evict_for_locked(nbytes, now):
+                    self.rejected += 1
+                    return None
+                buffer = ClipRingBuffer(self.num_frames, self.stride, self.frame_size, self.reserve)
+                self._buffers[key] = buffer
+                self._by_session.setdefault(key[0], set()).add(key[1])
+                self._bytes += buffer.nbytes
+                self.allocations += 1
+            else:
+                self._buffers.move_to_end(key)
+            self._last_seen[key] = now
+            return buffer
+
+    def remove(self, key, reason="deleted"):
+        with self._lock:
+            return self._remove_locked(key, reason)
+
+    def retain_tracks(self, session_key, live_track_ids):
+        """釋放該 session 中已被 tracker 刪除的 track"""
+        with self._lock:
+            dead = self._by_session.get(session_key, set()) - set(live_track_ids)
+            for track_id in dead:
+                self._remove_locked((session_key, track_id), "deleted")
+            return dead
+
+    def remove_session(self, session_key):
+        with self._lock:
+            for track_id in list(self._by_session.get(session_key, ())):
+                self._remove_locked((session_key, track_id), "session")
+            self._released[session_key] = time.monotonic()
+
+    def open_session(self, session_key):
+        """以同一個 key 重新開啟 session（例如帶 session-id 重新連線）時，允許再配置緩衝區"""
+        with self._lock:
+            self._released.pop(session_key, None)
+
+    def _remove_locked(self, key, reason):
+        buffer = self._buffers.pop(key, None)
+        if buffer is None:
+            return False
+        self._last_seen.pop(key, None)
+        track_ids = self._by_session.get(key[0])
+        if track_ids is not None:
+            track_ids.discard(key[1])
+            if not track_ids:
+                del self._by_session[key[0]]
+        self._bytes -= buffer.nbytes
+        self.evictions[reason] += 1
+        return True
+
+    def _expire_locked(self, now):
+        self._last_expire = now
+        expired = [key for key, seen in self._last_seen.items() if now - seen > self.ttl]
+        for key in expired:
+            self._remove_locked(key, "ttl")
+        # 超過 ttl 後不會再有該 session 的 frame 在佇列中
+        for session_key in [k for k, released in self._released.items() if now - released > self.ttl]:
+            del self._released[session_key]
+
+    def _evict_for_locked(self, incoming_bytes, now):
+        """回收最久沒更新的 track 直到放得下；最舊的 track 也還在 active_window 內時回傳 False"""
+        while self._buffers and (len(self._buffers) >= self.max_tracks
+                                 or self._bytes + incoming_bytes > self.max_bytes):
+            key = next(iter(self._buffers))
+            if now - self._last_seen[key] < self.active_window:
+                return False
+            self._remove_locked(key, "lru")  # 由 evictions["lru"] 計數，不在持有鎖的熱路徑上輸出 log
+        return True
+
+    def session_bytes(self, session_key):
+        with self._lock:
+            return sum(self._buffers[(session_key, track_id)].nbytes
+                       for track_id in self._by_session.get(session_key, ()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "live_tracks": len(self._buffers),
+                "buffered_bytes": self._bytes,
+                "allocations": self.allocations,
+                "evictions": dict(self.evictions),
+                "rejected": self.rejected,
+            }
+
+    def summary(self):
+        s = self.stats()
+        return (f"[ClipStore] live_tracks={s['live_tracks']} buffered={s['buffered_bytes'] / 1e6:.1f} MB "
+                f"allocations={s['allocations']} evictions={s['evictions']} rejected={s['rejected']}")
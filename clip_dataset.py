@@ -0,0 +1,47 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+
+# 讀取依類別分資料夾保存的 clip：clips_dir/<類別名稱>/*.npy 或影片檔
+def load_labeled_clips(clips_dir, class_names, num_frames=36, img_size=224, windows_per_video=4):
+    """
+    .npy 為 (T, H, W, 3) BGR uint8（與 ClipRingBuffer 相同格式），取前 num_frames 幀；
+    影片取最多 windows_per_video 段連續 num_frames 幀。所有 frame 都 resize 成 img_size。
+    回傳 [(clip, 類別 index)]
+    """
+    clips = []
+    for label, name in enumerate(class_names):
+        for path in sorted(glob.glob(os.path.join(clips_dir, name, "*"))):
+            if path.endswith(".npy"):
+                clip = np.load(path)
+                if clip.shape[0] >= num_frames:
+                    clips.append((resize_clip(clip[:num_frames], img_size), label))
+            elif path.lower().endswith(VIDEO_EXTENSIONS):
+                clips.extend((clip, label) for clip in read_video_windows(path, num_frames, img_size, windows_per_video))
+    return clips
+
+
+def resize_clip(clip, img_size):
+    if clip.shape[1:3] == (img_size, img_size):
+        return clip
+    return np.stack([cv2.resize(frame, (img_size, img_size)) for frame in clip])
+
+
+def read_video_windows(path, num_frames, img_size, max_windows):
+    cap = cv2.VideoCapture(path)
+    windows, frames = [], []
+    while len(windows) < max_windows:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, (img_size, img_size)))
+        if len(frames) == num_frames:
+            windows.append(np.stack(frames))
+            frames = []
+    cap.release()
+    return windows
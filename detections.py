@@ -0,0 +1,18 @@
+import numpy as np
+
+
+# YOLO 的 boxes.data (N, 6) [x1, y1, x2, y2, conf, class_id] 轉成 DeepSort 需要的 ([left, top, w, h], conf, label)
+def to_deepsort_detections(outputs, class_id=None, label='cat'):
+    """
+    整個陣列一次計算座標轉換與過濾，只在最後組 DeepSort 需要的 list 時逐筆處理。
+    class_id 為 None 時不依類別過濾（predict 已經用 classes 限制類別）。
+    """
+    if len(outputs) == 0:
+        return []
+    boxes = outputs[:, :4].astype(np.int64)  # 與 int() 相同，往 0 截斷
+    keep = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    if class_id is not None:
+        keep &= outputs[:, 5].astype(np.int64) == class_id
+    boxes = boxes[keep]
+    boxes[:, 2:] -= boxes[:, :2]  # x2, y2 -> w, h
+    return [(box, conf, label) for box, conf in zip(boxes.tolist(), outputs[keep, 4].tolist())]
@@ -0,0 +1,104 @@
+#從訓練好的 checkpoint 匯出 CPU 推論用的 ViViT（TorchScript / ONNX）與 YOLO（ONNX）
+# 用法：python export_models.py --format onnx torchscript --yolo
+import argparse
+
+import torch
+
+from inference_backends import ViViTEncoder, exported_model_paths
+from model import ViViT_Factorized, ViViT_FactorizedEncoder
+
+# 與 grpc_server.py 相同的 ViViT 設定，匯出的模型固定為所選設定檔的 (幀數, 解析度)
+VIVIT_PROFILES = {"full": (36, 224), "balanced": (24, 192), "fast": (16, 160)}
+TRAINED_NUM_FRAMES = 36
+TRAINED_IMG_SIZE = 224
+EMBED_DIM = 96
+MLP_DIM = 96 * 3
+NUM_HEADS = 4
+NUM_LAYERS_SPATIAL = 2
+NUM_LAYERS_TEMPORAL = 2
+PATCH_SIZE = 16
+TUBELET_SIZE = 2
+MODEL_PATH = "models/best_mode_36l.pth"
+CLASSES_FILE = "models/class.txt"
+YOLO_MODEL_PATH = "models/best.pt"
+VIVIT_VARIANTS = {"joint": ViViT_Factorized, "factorized": ViViT_FactorizedEncoder}
+ONNX_OPSET = 17
+
+
+def load_vivit(checkpoint, variant, num_frames, img_size):
+    with open(CLASSES_FILE, 'r', encoding='utf-8') as f:
+        num_classes = len([line for line in f if line.strip()])
+    model = VIVIT_VARIANTS[variant](
+        in_channels=3, embed_dim=EMBED_DIM, patch_size=PATCH_SIZE, tubelet_size=TUBELET_SIZE,
+        num_heads=NUM_HEADS, mlp_dim=MLP_DIM, num_layers_spatial=NUM_LAYERS_SPATIAL, num_layers_temporal=NUM_LAYERS_TEMPORAL,
+        num_classes=num_classes, num_frames=num_frames, img_size=img_size, droplayer_p=0.1
+    )
+    model.load_resized_state_dict(torch.load(checkpoint, map_location="cpu"), TRAINED_NUM_FRAMES, TRAINED_IMG_SIZE)
+    model.eval()
+    # 匯出合併 QKV + SDPA 的推論路徑，與 grpc_server.py 執行的計算相同
+    model.optimize_for_inference(fuse_qkv=True)
+    return model
+
+
+def example_inputs(model, batch_size=2):
+    num_frames = model.token_grid[0] * TUBELET_SIZE
+    img_size = model.token_grid[1] * PATCH_SIZE
+    clips = torch.rand(batch_size, 3, num_frames, img_size, img_size)
+    with torch.no_grad():
+        tokens = model.tubelet_embedding(clips)
+    return clips, tokens
+
+
+@torch.no_grad()
+def export_torchscript(model, checkpoint, profile=None):
+    full_path, encoder_path = exported_model_paths(checkpoint, "torchscript", profile)
+    clips, tokens = example_inputs(model)
+    torch.jit.freeze(torch.jit.trace(model, clips)).save(full_path)
+    torch.jit.freeze(torch.jit.trace(ViViTEncoder(model).eval(), tokens)).save(encoder_path)
+    print(f"TorchScript ViViT exported to {full_path}, {encoder_path}")
+
+
+@torch.no_grad()
+def export_onnx(model, checkpoint, profile=None):
+    full_path, encoder_path = exported_model_paths(checkpoint, "onnx", profile)
+    clips, tokens = example_inputs(model)
+    # batch 維度為動態，predict_worker 每批的 clip 數不固定
+    torch.onnx.export(model, (clips,), full_path, input_names=["clips"], output_names=["logits"],
+                      dynamic_axes={"clips": {0: "batch"}, "logits": {0: "batch"}},
+                      opset_version=ONNX_OPSET, dynamo=False)
+    torch.onnx.export(ViViTEncoder(model).eval(), (tokens,), encoder_path, input_names=["tokens"],
+                      output_names=["logits"], dynamic_axes={"tokens": {0: "batch"}, "logits": {0: "batch"}},
+                      opset_version=ONNX_OPSET, dynamo=False)
+    print(f"ONNX ViViT exported to {full_path}, {encoder_path}")
+
+
+def export_yolo(path):
+    from ultralytics import YOLO
+
+    # dynamic=True 才能一次偵測多張 frame（跨串流批次）
+    exported = YOLO(path).export(format="onnx", dynamic=True)
+    print(f"YOLO exported to {exported}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=MODEL_PATH)
+    parser.add_argument("--variant", choices=list(VIVIT_VARIANTS), default="joint")
+    parser.add_argument("--profile", choices=list(VIVIT_PROFILES), default="full", help="與 grpc_server.py 的 VIVIT_PROFILE 相同")
+    parser.add_argument("--format", nargs="+", choices=["onnx", "torchscript"], default=["onnx", "torchscript"])
+    parser.add_argument("--yolo", action="store_true", help=f"同時把 {YOLO_MODEL_PATH} 匯出成 ONNX")
+    parser.add_argument("--yolo-path", default=YOLO_MODEL_PATH)
+    args = parser.parse_args()
+
+    model = load_vivit(args.checkpoint, args.variant, *VIVIT_PROFILES[args.profile])
+    profile = None if args.profile == "full" else args.profile
+    if "torchscript" in args.format:
+        export_torchscript(model, args.checkpoint, profile)
+    if "onnx" in args.format:
+        export_onnx(model, args.checkpoint, profile)
+    if args.yolo:
+        export_yolo(args.yolo_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -273,7 +273,11 @@ class _CameraGrpcStreamPageState extends State<CameraGrpcStreamPage> {
 
     // 建立 gRPC 呼叫時傳遞 user_id 到 metadata
     final callOptions = CallOptions(
-      metadata: {'user-id': ServerConfig.currentUser},
+      metadata: {
+        'user-id': ServerConfig.currentUser,
+        // 畫面直接顯示 server 標註好的影像
+        'response-mode': 'annotated',
+      },
     );
 
     _stub.streamImages(_imageRequestStream, options: callOptions).listen((
@@ -77,7 +77,9 @@ class _CameraGrpcStreamPageState extends State<CameraGrpcStreamPage> {
     _stub.streamImages(//gRPC 定義的串流方法,把 image stream 傳給 server
       _imageRequestStreamController.stream,
       options: CallOptions(metadata: {'user-id': 'test-user'}),// 傳使用者資訊給 server（例如 user-id）
-    );
+    ).listen((response) {
+      // server 每處理完一張 frame 就回傳一次，持續讀取才不會被 gRPC flow control 卡住
+    });
   }
 
   Future<void> _startStreaming() async {
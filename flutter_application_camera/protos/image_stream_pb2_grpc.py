@@ -5,7 +5,7 @@ import warnings
 
 import image_stream_pb2 as image__stream__pb2
 
-GRPC_GENERATED_VERSION = '1.74.0'
+GRPC_GENERATED_VERSION = '1.71.0'
 GRPC_VERSION = grpc.__version__
 _version_not_supported = False
 
@@ -34,11 +34,21 @@ class ImageStreamServiceStub(object):
         Args:
             channel: A grpc.Channel.
         """
-        self.StreamImages = channel.stream_unary(
+        self.StreamImages = channel.stream_stream(
                 '/ImageStreamService/StreamImages',
                 request_serializer=image__stream__pb2.ImageRequest.SerializeToString,
                 response_deserializer=image__stream__pb2.ImageResponse.FromString,
                 _registered_method=True)
+        self.GetHealth = channel.unary_unary(
+                '/ImageStreamService/GetHealth',
+                request_serializer=image__stream__pb2.HealthRequest.SerializeToString,
+                response_deserializer=image__stream__pb2.HealthResponse.FromString,
+                _registered_method=True)
+        self.ReloadModel = channel.unary_unary(
+                '/ImageStreamService/ReloadModel',
+                request_serializer=image__stream__pb2.ReloadRequest.SerializeToString,
+                response_deserializer=image__stream__pb2.ReloadResponse.FromString,
+                _registered_method=True)
 
 
 class ImageStreamServiceServicer(object):
@@ -50,14 +60,38 @@ class ImageStreamServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetHealth(self, request, context):
+        """各模型是否已載入並完成 warm-up，start_servers.py 與負載平衡器用來判斷能否開始送 frame
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReloadModel(self, request, context):
+        """在背景載入新的 ViViT / YOLO checkpoint 並 warm-up，完成後替換正在使用的模型，track 狀態保留
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ImageStreamServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
-            'StreamImages': grpc.stream_unary_rpc_method_handler(
+            'StreamImages': grpc.stream_stream_rpc_method_handler(
                     servicer.StreamImages,
                     request_deserializer=image__stream__pb2.ImageRequest.FromString,
                     response_serializer=image__stream__pb2.ImageResponse.SerializeToString,
             ),
+            'GetHealth': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetHealth,
+                    request_deserializer=image__stream__pb2.HealthRequest.FromString,
+                    response_serializer=image__stream__pb2.HealthResponse.SerializeToString,
+            ),
+            'ReloadModel': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReloadModel,
+                    request_deserializer=image__stream__pb2.ReloadRequest.FromString,
+                    response_serializer=image__stream__pb2.ReloadResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'ImageStreamService', rpc_method_handlers)
@@ -80,7 +114,7 @@ class ImageStreamService(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.stream_unary(
+        return grpc.experimental.stream_stream(
             request_iterator,
             target,
             '/ImageStreamService/StreamImages',
@@ -95,3 +129,57 @@ class ImageStreamService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetHealth(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ImageStreamService/GetHealth',
+            image__stream__pb2.HealthRequest.SerializeToString,
+            image__stream__pb2.HealthResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReloadModel(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ImageStreamService/ReloadModel',
+            image__stream__pb2.ReloadRequest.SerializeToString,
+            image__stream__pb2.ReloadResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
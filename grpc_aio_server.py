@@ -0,0 +1,99 @@
+#asyncio 版本的 gRPC server，與 grpc_server.py 共用同一條 YOLO / DeepSort / ViViT pipeline
+import asyncio
+from concurrent import futures
+
+import grpc
+
+import image_stream_pb2_grpc
+from backpressure import AsyncStreamWindow
+from session_manager import SessionManager
+from grpc_server import (ADMIN_GRPC_ADDRESS, DEFAULT_RESPONSE_MODE, GRPC_PORT, MAX_IN_FLIGHT_FRAMES, RESULT_TIMEOUT,
+                         build_response, health_response, record_frame_latency, reload_response,
+                         session_manager, start_metrics_server, start_workers, stop_workers, submit_frame)
+
+# asyncio server 設定（port 與 grpc_server.py 相同，ReloadModel / GetHealth 只在本機的 ADMIN_GRPC_ADDRESS 提供）
+MAX_CONCURRENT_STREAMS = 500  # 同時開啟的串流上限，超過時新的 call 直接被拒絕
+DECODE_WORKERS = 4  # JPEG 解碼 / 編碼用的執行緒數（cv2 會釋放 GIL）
+SHUTDOWN_GRACE = 5  # 停止時等待進行中串流結束的秒數
+
+# 解碼與標註影像編碼都在這裡執行，不阻塞 event loop
+codec_executor = futures.ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="codec")
+
+
+class AsyncImageStreamService(image_stream_pb2_grpc.ImageStreamServiceServicer):
+    async def StreamImages(self, request_iterator, context):
+        metadata = dict(context.invocation_metadata())
+        user_id = metadata.get('user-id', 'default_user')
+        session_key = metadata.get('session-id')
+        resumable = session_key is not None
+        annotated = metadata.get('response-mode', DEFAULT_RESPONSE_MODE) == 'annotated'
+        session = session_manager.acquire(session_key or SessionManager.new_key(), user_id)
+        window = AsyncStreamWindow(lambda payload, sink: submit_frame(payload, sink, session),
+                                   max_in_flight=MAX_IN_FLIGHT_FRAMES, result_timeout=RESULT_TIMEOUT,
+                                   executor=codec_executor)
+
+        async def read_requests():
+            try:
+                async for req in request_iterator:
+                    await window.offer(req.image)
+            except Exception as e:
+                print(f"gRPC request stream closed: {e}")
+            finally:
+                window.finish()
+
+        loop = asyncio.get_running_loop()
+        reader = asyncio.create_task(read_requests())
+        try:
+            async for (frame, track_results), frame_id, latency in window.results():
+                if latency is not None:
+                    record_frame_latency(session, frame_id, latency)
+                if annotated:
+                    # 畫框與 JPEG 編碼較耗時，交給 executor
+                    response = await loop.run_in_executor(codec_executor, build_response,
+                                                          frame, track_results, frame_id, True)
+                else:
+                    response = build_response(frame, track_results, frame_id)
+                yield response
+        finally:
+            reader.cancel()
+            session_manager.release(session, close=not resumable)
+            print(f"Stream {session.key} closed: {window.stats()}")
+
+
+class AsyncAdminService(image_stream_pb2_grpc.ImageStreamServiceServicer):
+    async def GetHealth(self, request, context):
+        return health_response()
+
+    async def ReloadModel(self, request, context):
+        # wait=True 時會等到新模型載入完成，不在 event loop 上執行
+        return await asyncio.get_running_loop().run_in_executor(None, reload_response, request)
+
+
+async def serve():
+    # 呼叫前必須先執行 start_workers()：worker process 要在 event loop 與 gRPC 的執行緒建立之前 fork
+    server = grpc.aio.server(maximum_concurrent_rpcs=MAX_CONCURRENT_STREAMS)
+    image_stream_pb2_grpc.add_ImageStreamServiceServicer_to_server(AsyncImageStreamService(), server)
+    server.add_insecure_port(f'[::]:{GRPC_PORT}')
+    admin_server = grpc.aio.server()
+    image_stream_pb2_grpc.add_ImageStreamServiceServicer_to_server(AsyncAdminService(), admin_server)
+    admin_server.add_insecure_port(ADMIN_GRPC_ADDRESS)
+    print(f"gRPC asyncio Server listening on port {GRPC_PORT} (admin on {ADMIN_GRPC_ADDRESS})")
+    start_metrics_server()
+    await admin_server.start()
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(SHUTDOWN_GRACE)
+        await admin_server.stop(None)
+
+
+if __name__ == '__main__':
+    start_workers()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers()
+        codec_executor.shutdown()
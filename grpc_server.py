@@ -8,18 +8,41 @@ import threading
 import queue
 import os
 import time
-import requests  
 import json
 
 from ultralytics import YOLO
 from deep_sort_realtime.deepsort_tracker import DeepSort
-from model import ViViT_Factorized
+from model import ViViT_Factorized, ViViT_FactorizedEncoder
+from inference_batcher import MicroBatcher, BatchStats
+from session_manager import SessionManager
+from clip_buffer import ClipRingBuffer, ClipStore
+from preprocess import ClipPreprocessor
+from tubelet_cache import TubeletEmbeddingCache
+from classification_reporter import ClassificationReporter
+from backpressure import StreamWindow
+from shm_workers import SharedSlots, ProcessWorkerPool, fork_available
+from detections import to_deepsort_detections
+from motion_gate import MotionGate
+from metrics import Metrics, MetricsServer, SampledLogger
+from model_registry import ModelRegistry
+from inference_backends import YOLO_BACKENDS, create_vivit_backend, exported_model_paths, yolo_model_path
+from quantization import load_quantized_vivit, quantized_model_path
 import image_stream_pb2
 import image_stream_pb2_grpc
 
 # 設定 
-NUM_FRAMES = 36
-IMG_SIZE = 224
+# ViViT 輸入設定檔：(幀數, 解析度, PREDICT_STRIDE)，checkpoint 以 36 幀 224px 訓練，
+# 其他設定檔載入時將 pos_embedding 插值到對應的 token 數，幀數與解析度越小推論越快但準確率可能下降
+# （各設定檔的延遲與準確率可用 benchmarks/bench_profiles.py 比較）
+VIVIT_PROFILES = {
+    "full": (36, 224, 24),
+    "balanced": (24, 192, 16),
+    "fast": (16, 160, 10),
+}
+VIVIT_PROFILE = os.environ.get("CAT_VIVIT_PROFILE", "full")
+TRAINED_NUM_FRAMES = 36  # checkpoint 訓練時的幀數
+TRAINED_IMG_SIZE = 224  # checkpoint 訓練時的解析度
+NUM_FRAMES, IMG_SIZE, PREDICT_STRIDE = VIVIT_PROFILES[VIVIT_PROFILE]
 EMBED_DIM = 96
 MLP_DIM = 96 * 3
 NUM_HEADS = 4
@@ -28,146 +51,548 @@ NUM_LAYERS_TEMPORAL = 2
 PATCH_SIZE = 16
 TUBELET_SIZE = 2
 DATASET_PATH = "models" #vivit分類類別資料夾
-MODEL_PATH = "models/best_mode_36l.pth" #vivit model
+MODEL_PATH = os.environ.get("CAT_VIVIT_MODEL", "models/best_mode_36l.pth") #vivit model
 CLASSES_FILE = os.path.join(DATASET_PATH, 'class.txt')
+VIVIT_FAST_ATTENTION = True  # 推論時使用合併 QKV + scaled_dot_product_attention
+# 推論後端："torch"（eager）、"torchscript"、"onnx"（ONNX Runtime，CPU），匯出的模型由 export_models.py 產生
+VIVIT_BACKEND = "torch"
+YOLO_BACKEND = "torch"  # "torch" 載入 models/best.pt，"onnx" 載入 models/best.onnx
+# 模型路徑可用環境變數覆寫，例如 benchmarks/replay.py 以小型替代模型（CAT_YOLO_MODEL=yolo11n.yaml、
+# CAT_DEEPSORT_EMBEDDER=mobilenet）在沒有 GPU 與訓練權重的主機上執行完整 pipeline
+YOLO_MODEL_PATH = os.environ.get("CAT_YOLO_MODEL", "models/best.pt") # YOLOv11 模型路徑
+DEEPSORT_EMBEDDER = os.environ.get("CAT_DEEPSORT_EMBEDDER", "clip_ViT-B/16")  # DeepSort 外觀特徵模型
+ONNX_THREADS = None  # ONNX Runtime 的執行緒數，None 使用預設值
+VIVIT_QUANTIZED = False  # 使用 quantize_vivit.py 產生的 int8 checkpoint（只支援 CPU 與 torch 後端）
+# "joint"：原本的模型（空間 Transformer 一次處理全部 token）
+# "factorized"：空間注意力逐時間片段計算、時間注意力只處理摘要 token（需使用此架構訓練的權重）
+VIVIT_VARIANT = "joint"
+VIVIT_VARIANTS = {"joint": ViViT_Factorized, "factorized": ViViT_FactorizedEncoder}
+
+# ViViT 動態批次設定
+PREDICT_MAX_BATCH = 8  # 每批最多幾個 clip
+PREDICT_MAX_WAIT_MS = 20  # 湊批次的最長等待時間
+CAT_CLASS_ID = 15  # YOLO 中貓的類別，偵測與 NMS 只處理這個類別
+# YOLO 跨串流批次設定
+YOLO_MAX_BATCH = 8  # 每批最多幾張 frame
+YOLO_MAX_WAIT_MS = 5  # 湊批次的最長等待時間，越長批次越滿但每張 frame 延遲越高
+# PREDICT_STRIDE（見 VIVIT_PROFILES）：第一次滿 NUM_FRAMES 後，每累積幾張新 frame 再預測一次（保留約 1/3 的舊幀），需為 TUBELET_SIZE 的倍數
+SNAPSHOT_RESERVE_FRAMES = PREDICT_STRIDE  # snapshot 送出後還能再寫入幾張 frame 而不被覆寫（預測延遲的容許範圍）
+VIVIT_INCREMENTAL = True  # 快取每個 track 的 tubelet embedding，只對新的 frame 執行 conv3d
+# 靜止 track 略過 ViViT：clip 幾乎沒有變化時沿用上次的預測結果
+MOTION_GATE = True
+MOTION_THRESHOLD = 0.02  # 變化分數（0~1，取樣灰階的平均差）低於此值視為靜止
+MOTION_MAX_STALENESS = 10  # 沿用的預測結果最多幾秒，超過時即使靜止也重新推論
+MOTION_GATE_AUDIT = False  # True 時不略過，只統計略過時的結果與實際預測不同的次數（用來調整 MOTION_THRESHOLD）
+
+# 串流 session 設定
+NUM_PIPELINE_WORKERS = 2  # tracker / vivit worker 組數，不同串流可平行處理
+SESSION_IDLE_TIMEOUT = 60  # 閒置多少秒後回收 session
+
+# clip 緩衝區回收設定
+EXPECTED_LIVE_TRACKS = 48  # 所有串流合計預期同時追蹤的貓數，記憶體上限依此與每個 track 的緩衝區大小推算
+# 每個 track 的緩衝區（full 設定檔約 18 MB，fast 約 4 MB）
+CLIP_BUFFER_BYTES_PER_TRACK = ClipRingBuffer.bytes_for(NUM_FRAMES, PREDICT_STRIDE, (IMG_SIZE, IMG_SIZE),
+                                                       SNAPSHOT_RESERVE_FRAMES)
+MAX_BUFFERED_TRACKS = EXPECTED_LIVE_TRACKS  # 所有串流合計最多保留幾個 track 的 clip
+MAX_CLIP_BUFFER_BYTES = MAX_BUFFERED_TRACKS * CLIP_BUFFER_BYTES_PER_TRACK  # 所有 clip 緩衝區合計的記憶體上限
+TRACK_BUFFER_TTL = 30  # 超過幾秒沒有新 crop 的 track 會被回收
+TRACK_ACTIVE_WINDOW = 1.0  # 最近幾秒內還有新 crop 的 track 不會被 LRU 回收，滿載時新 track 暫不分類
+
+# 串流背壓設定
+MAX_IN_FLIGHT_FRAMES = 2  # 每個串流同時在 pipeline 中的 frame 數，超過時只保留最新的一張
+RESULT_TIMEOUT = 5  # pipeline 超過幾秒沒有回應就放棄 in-flight 的 frame
+
+# 回傳格式：metadata response-mode=annotated 時回傳標註後的 JPEG，否則只回傳每個 track 的框與預測結果
+DEFAULT_RESPONSE_MODE = "tracks"
+
+# 多 process 推論設定：0 表示與原本相同，在主 process 的執行緒中執行
+YOLO_PROCESSES = 0  # YOLO 偵測的 worker process 數
+VIVIT_PROCESSES = 0  # ViViT 分類的 worker process 數
+TORCH_THREADS_PER_PROCESS = 2  # 每個 worker process 的 torch 執行緒數
+MAIN_TORCH_THREADS = None  # 主 process（DeepSort embedder 等）的 torch 執行緒數，None 使用 torch 預設值
+MAX_FRAME_SIZE = (1920, 1080)  # 共享記憶體中每個 frame slot 的大小 (W, H)，較大的 frame 會先縮小
+YOLO_SLOTS_PER_PROCESS = 4  # 每個 YOLO process 可同時排隊的 frame 數
+SLOT_ACQUIRE_TIMEOUT = 2  # 共享記憶體 slot 全部使用中超過幾秒就放棄該 frame / clip（worker process 卡住時不會永遠阻塞）
 
 # HTTP API 設定
-HTTP_API_URL = "http://localhost:5000/api/classification"  # HTTP API 基礎 URL
+HTTP_API_URL = os.environ.get("CAT_HTTP_API_URL", "http://localhost:5000/api/classification")  # HTTP API 基礎 URL
+HTTP_API_BATCH_URL = HTTP_API_URL + "/batch"  # 批次回報 URL（由基礎 URL 推得，兩者不會不一致）
+REPORT_FLUSH_INTERVAL = 1.0  # 每隔幾秒合併送出一次分類結果
+
+# 監控設定
+METRICS_PORT = 9100  # 本機 metrics endpoint（/metrics 為 Prometheus 格式、/metrics.json），None 表示不啟動
+LOG_SAMPLE_RATE = 0.01  # 每張 frame / 每次預測的結構化 log 取樣比例，錯誤一律輸出
+
+# 啟動設定：import 時不載入模型也不啟動執行緒，由 start_workers() 開始
+PRELOAD_MODELS = True  # True：start_workers() 時在背景平行載入並 warm-up 所有模型；False：第一次使用時才載入
+MODEL_RELOAD_DIR = "models"  # ReloadModel RPC 只接受這個資料夾底下的 checkpoint 與類別檔
+
+# gRPC 設定：公開的 port 只提供 StreamImages；ReloadModel（替換正式模型）與 GetHealth 只在本機的管理 port 提供
+GRPC_PORT = 50051
+ADMIN_GRPC_ADDRESS = "127.0.0.1:50052"
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 # 從 txt 讀取類別
-with open(CLASSES_FILE, 'r', encoding='utf-8') as f:
-  class_names = [line.strip() for line in f if line.strip()]
-# 模型載入
-yolo_model = YOLO("models/best.pt") # YOLOv11 模型路徑
-tracker = DeepSort(max_age=30, n_init=5, embedder="clip_ViT-B/16")
-vivit_model = ViViT_Factorized(
-    in_channels=3, embed_dim=EMBED_DIM, patch_size=PATCH_SIZE, tubelet_size=TUBELET_SIZE,
-    num_heads=NUM_HEADS, mlp_dim=MLP_DIM, num_layers_spatial=NUM_LAYERS_SPATIAL, num_layers_temporal=NUM_LAYERS_TEMPORAL,
-    num_classes=len(class_names), num_frames=NUM_FRAMES, img_size=IMG_SIZE, droplayer_p=0.1
-).to(device)
-vivit_model.load_state_dict(torch.load(MODEL_PATH))
-vivit_model.eval()
-
-
-# 狀態追蹤
-track_clips = {}
-track_labels = {}
-
-# 記錄分類次數到 HTTP API
-def record_classification(user_id, category, confidence):
-    try:
-            
-        data = {
-            "user_id": user_id,
-            "category": category
-        }
-        
-        response = requests.post(HTTP_API_URL, json=data, timeout=2)
-        if response.status_code == 200:
-            print(f"Successfully recorded {category} for user {user_id} (confidence: {confidence:.2f})")
+def read_class_names(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+class_names = read_class_names(CLASSES_FILE)
+
+# 模型載入（主 process 與 worker process 共用），ReloadModel 以其他 checkpoint 呼叫
+def load_yolo_model(path=YOLO_MODEL_PATH):
+    return YOLO(yolo_model_path(path, YOLO_BACKEND), task="detect")
+
+def load_vivit_model(model_device, path=MODEL_PATH, classes=None):
+    model = VIVIT_VARIANTS[VIVIT_VARIANT](
+        in_channels=3, embed_dim=EMBED_DIM, patch_size=PATCH_SIZE, tubelet_size=TUBELET_SIZE,
+        num_heads=NUM_HEADS, mlp_dim=MLP_DIM, num_layers_spatial=NUM_LAYERS_SPATIAL, num_layers_temporal=NUM_LAYERS_TEMPORAL,
+        num_classes=len(classes or class_names), num_frames=NUM_FRAMES, img_size=IMG_SIZE, droplayer_p=0.1
+    )
+    if VIVIT_QUANTIZED:
+        if model_device.type != "cpu" or VIVIT_BACKEND != "torch":
+            raise ValueError("VIVIT_QUANTIZED requires the torch backend on CPU")
+        quantized = load_quantized_vivit(model, quantized_model_path(path), TRAINED_NUM_FRAMES, TRAINED_IMG_SIZE)
+        return create_vivit_backend("torch", quantized, path)
+    model = model.to(model_device)
+    model.load_resized_state_dict(torch.load(path, map_location=model_device), TRAINED_NUM_FRAMES, TRAINED_IMG_SIZE)
+    model.eval()
+    if VIVIT_FAST_ATTENTION:
+        model.optimize_for_inference(fuse_qkv=True)
+    # 匯出的模型固定為匯出時的輸入大小，非 full 設定檔需以 export_models.py --profile 匯出對應的檔案
+    return create_vivit_backend(VIVIT_BACKEND, model, path, model_device, ONNX_THREADS,
+                                profile=None if VIVIT_PROFILE == "full" else VIVIT_PROFILE)
+
+def detect(model, frames):
+    """一次偵測多張 frame，回傳每張 frame 的 (N, 6) 偵測結果"""
+    # half precision 只有 GPU 支援，CPU 上不傳 half（新版 ultralytics 每次呼叫都會警告 half 已棄用）
+    options = {"half": True} if device.type == "cuda" else {}
+    results = model.predict(source=frames, conf=0.6, classes=[CAT_CLASS_ID], verbose=False, **options)
+    return [result.boxes.data.cpu().numpy() for result in results]
+
+def classify_clips(model, frames_tensor, cache=None, keys=None):
+    """回傳每個 clip 的類別 index 與信心值；有 cache 時只對新的 tubelet 執行 conv3d"""
+    with torch.no_grad():
+        if cache is not None:
+            outputs = model.forward_embeddings(cache.embed(keys, frames_tensor))
         else:
-            print(f"Failed to record classification: {response.status_code}")
-    except Exception as e:
-        print(f"Error recording classification: {e}")
+            outputs = model(frames_tensor)
+        probs = torch.nn.functional.softmax(outputs, dim=1)
+        top_prob, top_class = torch.max(probs, dim=1)
+    return top_class.tolist(), top_prob.tolist()
+
+# warm-up：以假輸入執行一次 forward，第一張真正的 frame 才不會負擔 lazy init 的成本
+def warmup_yolo(model):
+    detect(model, [np.zeros((480, 640, 3), dtype=np.uint8)])
+
+def warmup_embedder(tracker):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    tracker.generate_embeds(frame, [([160, 120, 320, 240], 0.9, "cat")])
+
+def warmup_vivit(model):
+    clip = np.zeros((NUM_FRAMES, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+    classify_clips(model, preprocess_video(clip, (IMG_SIZE, IMG_SIZE)))
+
+def load_embedder():
+    # 外觀特徵 embedder 只載入一次，由所有串流的 tracker 共用
+    return DeepSort(max_age=30, n_init=5, embedder=DEEPSORT_EMBEDDER)
+
+# worker process 端：frame / clip 從共享記憶體讀取，只回傳偵測框或分類結果
+def yolo_process_init():
+    model = load_yolo_model()
+    warmup_yolo(model)
+    return model
+
+def yolo_process_handle(model, task):
+    return detect(model, [yolo_slots.view(slot, shape) for slot, shape in task])
+
+def vivit_process_init():
+    model = load_vivit_model(device)
+    warmup_vivit(model)
+    preprocessor = ClipPreprocessor(NUM_FRAMES, (IMG_SIZE, IMG_SIZE), PREDICT_MAX_BATCH, device)
+    cache = TubeletEmbeddingCache(model.tubelet_embedding, max_tracks=MAX_BUFFERED_TRACKS) if VIVIT_INCREMENTAL else None
+    return model, preprocessor, cache
+
+def vivit_process_handle(state, task):
+    model, preprocessor, cache = state
+    slots, keys = task
+    clips = [vivit_slots.view(slot, (NUM_FRAMES, IMG_SIZE, IMG_SIZE, 3)) for slot in slots]
+    return classify_clips(model, preprocessor(clips), cache, keys)
+
+if MAIN_TORCH_THREADS:
+    torch.set_num_threads(MAIN_TORCH_THREADS)
+if (YOLO_PROCESSES or VIVIT_PROCESSES) and not fork_available():
+    print("Multi-process inference requires the fork start method, falling back to threads")
+    YOLO_PROCESSES = VIVIT_PROCESSES = 0
+# worker process 與共享記憶體在 start_workers() 中建立
+yolo_pool = vivit_pool = None
+yolo_slots = vivit_slots = None
+
+# 主 process 使用的模型：models.get(name) 第一次使用時才載入，或由 start_workers() 在背景預先載入
+# 版本名稱預設為檔名，ViViT 的類別名稱與模型一起替換（models.current("vivit").info）
+models = ModelRegistry()
+if YOLO_PROCESSES == 0:
+    models.register("yolo", load_yolo_model, warmup_yolo, version=os.path.basename(YOLO_MODEL_PATH))
+models.register("deepsort_embedder", load_embedder, warmup_embedder, version=DEEPSORT_EMBEDDER)
+if VIVIT_PROCESSES == 0:
+    models.register("vivit", lambda: load_vivit_model(device), warmup_vivit,
+                    version=os.path.basename(MODEL_PATH), info=class_names)
+
+def reload_model(name, path, classes_file="", version="", wait=False):
+    """
+    在背景載入新的 checkpoint 並 warm-up 後替換使用中的 ViViT / YOLO，track 與 clip 緩衝區不受影響；
+    替換前已開始的批次用舊模型完成。回傳該模型的狀態（格式同 health_status()）。
+    """
+    if name not in ("vivit", "yolo"):
+        raise ValueError(f"unknown model {name!r}, expected 'vivit' or 'yolo'")
+    if name not in models:
+        raise ValueError(f"{name} runs in worker processes, reload is only supported in the main process")
+    # 實際會讀取的檔案（依後端換成匯出的模型）在這裡同步檢查，不合格時直接拒絕，不進入背景載入
+    for file, extension in reload_files(name, path):
+        checked_model_path(file, extension)
+    path = os.path.realpath(path)
+    version = version or os.path.basename(path)
+    if name == "yolo":
+        models.reload("yolo", lambda: load_yolo_model(path), version, wait=wait)
+    else:
+        classes = read_class_names(checked_model_path(classes_file)) if classes_file else models.current("vivit").info
+        models.reload("vivit", lambda: load_vivit_model(device, path, classes), version, info=classes, wait=wait)
+    return models.entry_status(name)
+
+def reload_files(name, path):
+    """reload 時 load_yolo_model / load_vivit_model 會讀取的檔案與應有的副檔名"""
+    if name == "yolo":
+        return [(yolo_model_path(path, YOLO_BACKEND), YOLO_BACKENDS[YOLO_BACKEND])]
+    if VIVIT_QUANTIZED:
+        return [(quantized_model_path(path), ".pth")]
+    files = [(path, ".pth")]
+    if VIVIT_BACKEND != "torch":
+        # 匯出的後端仍需要原 checkpoint 的 tubelet_embedding
+        profile = None if VIVIT_PROFILE == "full" else VIVIT_PROFILE
+        files += [(exported, os.path.splitext(exported)[1]) for exported in exported_model_paths(path, VIVIT_BACKEND, profile)]
+    return files
+
+def checked_model_path(path, extension=None):
+    # 只允許讀取 MODEL_RELOAD_DIR 底下已存在（且副檔名正確）的檔案
+    root = os.path.realpath(MODEL_RELOAD_DIR)
+    full = os.path.realpath(path)
+    if os.path.commonpath([root, full]) != root:
+        raise ValueError(f"{path} is outside {MODEL_RELOAD_DIR}/")
+    if extension is not None and os.path.splitext(full)[1] != extension:
+        raise ValueError(f"{path} is not a {extension} file")
+    if not os.path.isfile(full):
+        raise ValueError(f"{path} does not exist")
+    return full
+
+
+# 所有串流共用的 clip 緩衝區，track 被刪除、逾時或超過上限時回收
+clip_store = ClipStore(NUM_FRAMES, PREDICT_STRIDE, (IMG_SIZE, IMG_SIZE), reserve=SNAPSHOT_RESERVE_FRAMES,
+                       max_tracks=MAX_BUFFERED_TRACKS, max_bytes=MAX_CLIP_BUFFER_BYTES, ttl=TRACK_BUFFER_TTL,
+                       active_window=TRACK_ACTIVE_WINDOW)
+
+# 每個串流各自擁有 tracker 與預測結果
+def create_tracker():
+    return DeepSort(max_age=30, n_init=5, embedder=None)
+
+def release_session_clips(session):
+    freed = clip_store.session_bytes(session.key)
+    clip_store.remove_session(session.key)
+    print(f"Session {session.key} released {freed / 1e6:.1f} MB of clip buffers")
+
+def reopen_session_clips(session):
+    # 帶 session-id 重新連線時，同一個 key 可能在釋放後重新開啟
+    clip_store.open_session(session.key)
+
+session_manager = SessionManager(create_tracker, num_shards=NUM_PIPELINE_WORKERS, idle_timeout=SESSION_IDLE_TIMEOUT,
+                                 on_open=reopen_session_clips, on_close=release_session_clips)
+
+# 記錄分類次數到 HTTP API（背景執行緒批次送出，不阻塞推論）
+classification_reporter = ClassificationReporter(HTTP_API_BATCH_URL, flush_interval=REPORT_FLUSH_INTERVAL)
+
+def record_classification(user_id, category, confidence):
+    classification_reporter.record(user_id, category, confidence)
 
 def preprocess_video(frames, frame_size=(224, 224)):
-    frames = [cv2.resize(f, frame_size)[:, :, ::-1] for f in frames]
-    frames = np.array(frames, dtype=np.float32) / 255.0
-    frames_tensor = torch.tensor(frames).permute(3, 0, 1, 2)
-    return frames_tensor.unsqueeze(0).to(device)
+    # 單一 clip 的前處理，批次預測請使用 predict_worker 內的 clip_preprocessor
+    return ClipPreprocessor(len(frames), frame_size, 1, device)([frames])
 
-def predict_action(track_id):
-    if len(track_clips.get(track_id, [])) < NUM_FRAMES:
+def predict_action(session, track_id):
+    clip_buffer = clip_store.get((session.key, track_id))
+    if clip_buffer is None or clip_buffer.written < NUM_FRAMES:
         return None, None
-    frames_tensor = preprocess_video(track_clips[track_id])
+    frames_tensor = preprocess_video(clip_buffer.snapshot().frames)
     with torch.no_grad():
-        outputs = vivit_model(frames_tensor)
+        current = models.current("vivit")
+        outputs = current.model(frames_tensor)
         probs = torch.nn.functional.softmax(outputs, dim=1)
         top_prob, top_class = torch.max(probs, dim=1)
-    # 更新 track_clips 只保留最新的 12 幀
-    track_clips[track_id] = track_clips[track_id][-12:]
-    return class_names[top_class.item()], top_prob.item()
+    return current.info[top_class.item()], top_prob.item()
 
 # 建立多階段處理
 yolo_queue = queue.Queue()
-tracker_queue = queue.Queue()
-vivit_queue = queue.Queue()
+tracker_queues = [queue.Queue() for _ in range(NUM_PIPELINE_WORKERS)]
+vivit_queues = [queue.Queue() for _ in range(NUM_PIPELINE_WORKERS)]
 predict_queue = queue.Queue()
 
+# 各階段延遲（decode / yolo / deepsort / crop_buffer / preprocess / vivit / frame）與佇列深度
+metrics = Metrics()
+metrics.gauge("queue_depth", yolo_queue.qsize, queue="yolo")
+for i, q in enumerate(tracker_queues):
+    metrics.gauge("queue_depth", q.qsize, queue=f"tracker_{i}")
+for i, q in enumerate(vivit_queues):
+    metrics.gauge("queue_depth", q.qsize, queue=f"vivit_{i}")
+metrics.gauge("queue_depth", predict_queue.qsize, queue="predict")
+metrics.gauge("active_sessions", lambda: len(session_manager))
+# clip 緩衝區：目前的 track 數與記憶體、各原因的累計回收次數，
+# 以及容量已滿而沒有配置緩衝區（該 track 暫時不分類，沒有回收任何緩衝區）的累計次數
+metrics.gauge("buffered_tracks", lambda: clip_store.stats()["live_tracks"])
+metrics.gauge("clip_buffer_bytes", lambda: clip_store.stats()["buffered_bytes"])
+for reason in clip_store.evictions:
+    metrics.counter("clip_buffer_evictions_total", lambda reason=reason: clip_store.evictions[reason], reason=reason)
+metrics.counter("clip_buffer_rejections_total", lambda: clip_store.rejected)
+log = SampledLogger(LOG_SAMPLE_RATE, {"clip_buffer_full": 0.05, "yolo_slots_timeout": 1.0, "vivit_slots_timeout": 1.0})
+
+predict_batcher = MicroBatcher(predict_queue, max_batch_size=PREDICT_MAX_BATCH, max_wait_ms=PREDICT_MAX_WAIT_MS)
+predict_stats = BatchStats("ViViT", max_batch_size=PREDICT_MAX_BATCH)
+yolo_batcher = MicroBatcher(yolo_queue, max_batch_size=YOLO_MAX_BATCH, max_wait_ms=YOLO_MAX_WAIT_MS)
+yolo_stats = BatchStats("YOLO", max_batch_size=YOLO_MAX_BATCH)
+# 批次數與批次中的工作數（平均批次大小 = 兩者相除），以及最近 1000 張 frame 因湊批次多等的時間
+for model_name, stats in (("vivit", predict_stats), ("yolo", yolo_stats)):
+    metrics.counter("batches_total", lambda stats=stats: stats.batches, model=model_name)
+    metrics.counter("batched_items_total", lambda stats=stats: stats.items, model=model_name)
+metrics.gauge("batching_wait_p99_ms", lambda: yolo_stats.snapshot().get("p99_wait_ms", 0.0), model="yolo")
+motion_gate = MotionGate(MOTION_THRESHOLD, MOTION_MAX_STALENESS, audit=MOTION_GATE_AUDIT) if MOTION_GATE else None
+if VIVIT_PROCESSES == 0:
+    clip_preprocessor = ClipPreprocessor(NUM_FRAMES, (IMG_SIZE, IMG_SIZE), PREDICT_MAX_BATCH, device)
+else:
+    clip_preprocessor = None  # 由 worker process 各自建立
+tubelet_cache = None  # ViViT 載入後由 predict_worker 建立（使用 worker process 時由各 process 建立）
+tubelet_cache_model = None
+
+def get_tubelet_cache(vivit_model):
+    # 快取的 embedding 只對產生它的模型有效，hot swap 後以新模型重新建立
+    global tubelet_cache, tubelet_cache_model
+    if VIVIT_INCREMENTAL and tubelet_cache_model is not vivit_model:
+        tubelet_cache = TubeletEmbeddingCache(vivit_model.tubelet_embedding, max_tracks=MAX_BUFFERED_TRACKS)
+        tubelet_cache_model = vivit_model
+    return tubelet_cache
+
+def apply_predictions(items, top_class, top_prob, labels):
+    # labels 為產生這批預測的模型版本的類別名稱
+    for (session, track_id, snapshot), class_idx, confidence in zip(items, top_class, top_prob):
+        label = labels[class_idx]
+        if motion_gate is not None:
+            motion_gate.observe(snapshot, label)
+
+        # 更新該 track 的預測結果
+        session.track_labels[track_id] = (label, confidence)
+        log.log("prediction", session=session.key, track_id=track_id, label=label, confidence=round(float(confidence), 3))
+
+        # 記錄分類結果到 HTTP API
+        if session.user_id:
+            record_classification(session.user_id, label, confidence)
+
 def predict_worker():
     while True:
-        item = predict_queue.get()
-        if item is None:
+        batch = predict_batcher.next_batch()
+        if batch is None:
             break
-        track_id, frames, user_id = item  # 新增 user_id 參數
-        # 將 frames 資料轉換成 tensor 並執行預測
-        frames_tensor = preprocess_video(frames)
-        with torch.no_grad():
-            outputs = vivit_model(frames_tensor)
-            probs = torch.nn.functional.softmax(outputs, dim=1)
-            top_prob, top_class = torch.max(probs, dim=1)
-        label = class_names[top_class.item()]
-        confidence = top_prob.item()
-        
-        # 更新該 track 的預測結果
-        track_labels[track_id] = (label, confidence)
-        print(f"Track {track_id} predicted as {label} with probability {confidence:.2f}")
-        
-        # 新增：記錄分類結果到 HTTP API
-        if user_id:
-            record_classification(user_id, label, confidence)
-        
-        # 完成預測後，從佇列中移除該工作
-        predict_queue.task_done()
-
-# YOLO 偵測執行緒
+        start_time = time.perf_counter()
+        try:
+            if vivit_pool is not None:
+                # 交給 worker process 非同步執行，結果由 collector 執行緒套用
+                submit_predictions(batch, start_time)
+                continue
+            # 將多個 clip 一次前處理成 (B, 3, T, H, W) 並執行預測
+            with metrics.stage("preprocess").time():
+                frames_tensor = clip_preprocessor([snapshot.frames for _, _, snapshot in batch])
+            # 讀取期間若已被新 frame 覆寫則捨棄，該 track 之後還會有更新的 snapshot
+            valid = []
+            for i, (session, track_id, snapshot) in enumerate(batch):
+                if snapshot.is_valid():
+                    valid.append(i)
+                else:
+                    log.log("snapshot_overwritten", session=session.key, track_id=track_id)
+            if not valid:
+                continue
+            if len(valid) < len(batch):
+                frames_tensor = frames_tensor[valid]
+            # 有 tubelet_cache 時只對新的 tubelet 執行 conv3d，其餘從快取組回 token 序列
+            keys = [(batch[i][2].buffer.uid, batch[i][2].start) for i in valid]
+            # 整批使用同一個版本：這時才 reload 完成的新模型從下一批開始使用
+            current = models.current("vivit")
+            vivit_start = time.perf_counter()
+            top_class, top_prob = classify_clips(current.model, frames_tensor, get_tubelet_cache(current.model), keys)
+            latency = time.perf_counter() - vivit_start
+            metrics.stage("vivit").observe(latency)
+            metrics.model_version("vivit", current.version).observe(latency)
+            apply_predictions([batch[i] for i in valid], top_class, top_prob, current.info)
+        except Exception as e:
+            print(f"Predict Error: {e}")
+        finally:
+            if vivit_pool is None:
+                predict_stats.record(len(batch), time.perf_counter() - start_time)
+            # 完成預測後，從佇列中移除該批工作
+            for _ in batch:
+                predict_queue.task_done()
+
+def submit_predictions(batch, start_time):
+    # clip 複製到共享記憶體後再檢查是否已被覆寫，worker 讀到的一定是完整的 clip
+    groups = {}
+    for item in batch:
+        session, track_id, snapshot = item
+        try:
+            slot = vivit_slots.acquire(timeout=SLOT_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            # 沒有預測結果時該 track 沿用目前的 label，之後的 snapshot 會再送出
+            log.log("vivit_slots_timeout", session=session.key, track_id=track_id)
+            continue
+        vivit_slots.write(slot, snapshot.frames)
+        if not snapshot.is_valid():
+            vivit_slots.release(slot)
+            log.log("snapshot_overwritten", session=session.key, track_id=track_id)
+            continue
+        # 同一個 track 固定送到同一個 process，tubelet embedding 快取才能重複使用
+        groups.setdefault(snapshot.buffer.uid % VIVIT_PROCESSES, []).append((slot, item))
+
+    for index, entries in groups.items():
+        slots = [slot for slot, _ in entries]
+        items = [item for _, item in entries]
+
+        def on_result(ok, result, slots=slots, items=items):
+            for slot in slots:
+                vivit_slots.release(slot)
+            if ok:
+                apply_predictions(items, *result, class_names)
+            else:
+                print(f"Predict Error: {result}")
+            # worker process 內的前處理與推論無法分開計時，記錄整個來回
+            latency = time.perf_counter() - start_time
+            metrics.stage("vivit").observe(latency)
+            predict_stats.record(len(items), latency)
+
+        keys = [(snapshot.buffer.uid, snapshot.start) for _, _, snapshot in items]
+        vivit_pool.submit(index, (slots, keys), on_result)
+
+# YOLO 偵測執行緒：多個串流的 frame 在 YOLO_MAX_WAIT_MS 內湊成一批一起偵測
 def yolo_worker():
     while True:
-        item = yolo_queue.get()
-        if item is None:
+        batch = yolo_batcher.next_batch()
+        if batch is None:
             break
-        frame, result_q, user_id = item  # 新增 user_id 參數
+        start_time = time.perf_counter()
+        # 每張 frame 因等待湊批次而增加的延遲（不含排在前一批之後的時間）
+        yolo_stats.record_waits([start_time - max(enqueued_at, yolo_batcher.collect_start)
+                                 for _, _, _, enqueued_at in batch])
         try:
-            results = yolo_model.predict(source=frame, conf=0.6, half=True, verbose=False)
-            outputs = results[0].boxes.data.cpu().numpy()
-            tracker_queue.put((frame, outputs, result_q, user_id))  # 傳遞 user_id
+            if yolo_pool is not None:
+                submit_detections(batch, start_time)
+                continue
+            current = models.current("yolo")
+            outputs = detect(current.model, [frame for frame, _, _, _ in batch])
+            metrics.model_version("yolo", current.version).observe(time.perf_counter() - start_time)
+            for (frame, result_q, session, _), frame_outputs in zip(batch, outputs):
+                # 依 session 分派到對應的 tracker worker
+                tracker_queues[session.shard].put((frame, frame_outputs, result_q, session))
         except Exception as e:
             print(f"YOLO Error: {e}")
-            result_q.put(frame)
+            for frame, result_q, _, _ in batch:
+                result_q.put((frame, []))
         finally:
-            yolo_queue.task_done()
+            if yolo_pool is None:
+                latency = time.perf_counter() - start_time
+                metrics.stage("yolo").observe(latency)
+                yolo_stats.record(len(batch), latency)
+            for _ in batch:
+                yolo_queue.task_done()
+
+def submit_detections(batch, start_time):
+    # frame 寫入共享記憶體，只把 slot 編號傳給 worker process；超過 slot 大小的 frame 先縮小，框再放大回原尺寸
+    groups = {}
+    for item in batch:
+        frame, result_q, session, _ = item
+        height, width = frame.shape[:2]
+        scale = min(1.0, MAX_FRAME_SIZE[0] / width, MAX_FRAME_SIZE[1] / height)
+        try:
+            slot = yolo_slots.acquire(timeout=SLOT_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            log.log("yolo_slots_timeout", session=session.key)
+            result_q.put((frame, []))
+            continue
+        try:
+            if scale < 1.0:
+                shape = (int(height * scale), int(width * scale), 3)
+                cv2.resize(frame, (shape[1], shape[0]), dst=yolo_slots.view(slot, shape))
+            else:
+                shape = yolo_slots.write(slot, frame)
+        except Exception as e:
+            yolo_slots.release(slot)
+            print(f"YOLO Error: {e}")
+            result_q.put((frame, []))
+            continue
+        # 同一個串流固定送到同一個 process，frame 的順序才不會亂掉
+        groups.setdefault(hash(session.key) % YOLO_PROCESSES, []).append((slot, shape, scale, item))
+
+    for index, entries in groups.items():
+        def on_result(ok, outputs, entries=entries):
+            for slot, _, _, _ in entries:
+                yolo_slots.release(slot)
+            if not ok:
+                print(f"YOLO Error: {outputs}")
+                outputs = [None] * len(entries)
+            for (_, _, scale, (frame, result_q, session, _)), frame_outputs in zip(entries, outputs):
+                if frame_outputs is None:
+                    result_q.put((frame, []))
+                    continue
+                if scale < 1.0:
+                    frame_outputs[:, :4] /= scale
+                tracker_queues[session.shard].put((frame, frame_outputs, result_q, session))
+            latency = time.perf_counter() - start_time
+            metrics.stage("yolo").observe(latency)
+            yolo_stats.record(len(entries), latency)
+
+        yolo_pool.submit(index, [(slot, shape) for slot, shape, _, _ in entries], on_result)
 
 # DeepSort 追蹤執行緒
-def tracker_worker():
+def tracker_worker(shard):
+    tracker_queue = tracker_queues[shard]
     while True:
         item = tracker_queue.get()
         if item is None:
             break
-        frame, outputs, result_q, user_id = item  # 新增 user_id 參數
+        frame, outputs, result_q, session = item
         try:
-            detections = []
-            for output in outputs:
-                x1, y1, x2, y2 = list(map(int, output[:4]))
-                class_id = int(output[5])
-                if class_id == 15:
-                    detections.append(([x1, y1, x2 - x1, y2 - y1], output[4], 'cat'))
-            tracks = tracker.update_tracks(detections, frame=frame)
-            vivit_queue.put((frame, tracks, result_q, user_id))  # 傳遞 user_id
+            with metrics.stage("deepsort").time():
+                detections = to_deepsort_detections(outputs, CAT_CLASS_ID)
+                # 用共用的 embedder 計算外觀特徵，再交給該串流自己的 tracker
+                embeds = models.get("deepsort_embedder").generate_embeds(frame, detections) if detections else []
+                tracks = session.tracker.update_tracks(detections, embeds=embeds, frame=frame)
+            vivit_queues[shard].put((frame, tracks, result_q, session))
         except Exception as e:
             print(f"Tracker Error: {e}")
-            result_q.put(frame)
+            result_q.put((frame, []))
         finally:
             tracker_queue.task_done()
 
-# ViViT 動作預測執行緒及影像標注
-def vivit_worker():
+# ViViT 動作預測執行緒
+def vivit_worker(shard):
+    vivit_queue = vivit_queues[shard]
     while True:
         item = vivit_queue.get()
         if item is None:
             break
-        frame, tracks, result_q, user_id = item  
+        frame, tracks, result_q, session = item
+        track_labels = session.track_labels
+        track_results = []
+        start_time = time.perf_counter()
         try:
+            # tracker 已刪除的 track（超過 max_age）立即釋放 clip 緩衝區與預測結果
+            live_track_ids = {track.track_id for track in tracks}
+            clip_store.retain_tracks(session.key, live_track_ids)
+            # predict 執行緒會同時寫入 track_labels，先複製 key 再遍歷
+            for track_id in [t for t in list(track_labels) if t not in live_track_ids]:
+                track_labels.pop(track_id, None)
+
             for track in tracks:
                 if not track.is_confirmed():
                     continue
@@ -176,41 +601,121 @@ def vivit_worker():
                 cropped = frame[y1:y2, x1:x2]
                 if cropped.size == 0:
                     continue
-                # 累積追蹤區塊影像
-                track_clips.setdefault(track_id, []).append(cropped)
+                # 累積追蹤區塊影像（寫入時即 resize，不保留整張 frame）；session 已關閉時不再配置緩衝區
+                clip_buffer = None if session.closed else clip_store.get_or_create((session.key, track_id))
+                if clip_buffer is not None:
+                    clip_buffer.push(cropped)
+                elif not session.closed:
+                    # 所有緩衝區都被仍在追蹤的 track 使用中，這個 track 先只回傳框（調整 EXPECTED_LIVE_TRACKS）
+                    log.log("clip_buffer_full", session=session.key, track_id=track_id,
+                            live_tracks=MAX_BUFFERED_TRACKS)
 
                 # 當累積 frame 達到設定值時，將預測任務丟到 predict_queue，但不阻塞等待結果
-                if len(track_clips[track_id]) >= NUM_FRAMES:
-                    predict_queue.put((track_id, list(track_clips[track_id]), user_id))  
-                    track_clips[track_id] = track_clips[track_id][-12:]
-                
-
-                # 畫框與顯示，若已有預測結果就顯示
-                label_text = f"Cat #{track_id}"
-                if track_id in track_labels:
-                    label_text += f" | {track_labels[track_id][0]} ({track_labels[track_id][1]:.2f})"
-
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, label_text, (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-            # 將標註後的 frame 傳至 result_q
-            result_q.put(frame)
+                if clip_buffer is not None and clip_buffer.ready():
+                    snapshot = clip_buffer.snapshot()
+                    if motion_gate is None or motion_gate.should_infer(snapshot, track_labels.get(track_id)):
+                        predict_queue.put((session, track_id, snapshot))
+
+                # 記錄框與目前的預測結果（尚未預測時 label 為空），畫框留到回傳時視需要再做
+                label, confidence = track_labels.get(track_id, ("", 0.0))
+                track_results.append((track_id, (x1, y1, x2, y2), label, confidence))
+
+            metrics.stage("crop_buffer").observe(time.perf_counter() - start_time)
+            result_q.put((frame, track_results))
         except Exception as e:
             print(f"ViViT Worker Error: {e}")
-            result_q.put(frame)
+            result_q.put((frame, track_results))
         finally:
             vivit_queue.task_done()
 
-# 啟動工作執行
-yolo_thread = threading.Thread(target=yolo_worker, daemon=True)
-tracker_thread = threading.Thread(target=tracker_worker, daemon=True)
-vivit_thread = threading.Thread(target=vivit_worker, daemon=True)
-predict_thread = threading.Thread(target=predict_worker, daemon=True)
-predict_thread.start()
-yolo_thread.start()
-tracker_thread.start()
-vivit_thread.start()
+# 啟動工作執行：serve() 或其他使用 pipeline 的程式（benchmarks/replay.py）呼叫，import 本模組不會啟動
+yolo_thread = predict_thread = None
+tracker_threads = vivit_threads = []
+workers_started = False
+startup_seconds = None  # 從 import 到模型與 worker process 都 ready 的秒數
+
+def start_workers():
+    global yolo_pool, vivit_pool, yolo_slots, vivit_slots
+    global yolo_thread, tracker_threads, vivit_threads, predict_thread, workers_started
+    if workers_started:
+        return
+    workers_started = True
+    # worker process 必須在主 process 載入模型與啟動執行緒之前 fork
+    if YOLO_PROCESSES > 0:
+        # 每個 process 可排隊 YOLO_SLOTS_PER_PROCESS 張，另外一批供 yolo_worker 填寫
+        yolo_slots = SharedSlots(YOLO_PROCESSES * YOLO_SLOTS_PER_PROCESS + YOLO_MAX_BATCH,
+                                 MAX_FRAME_SIZE[0] * MAX_FRAME_SIZE[1] * 3)
+        yolo_pool = ProcessWorkerPool("YOLO", yolo_process_init, yolo_process_handle,
+                                      YOLO_PROCESSES, TORCH_THREADS_PER_PROCESS)
+    if VIVIT_PROCESSES > 0:
+        # 每個 process 可排隊一整批，另外一批供 predict_worker 填寫
+        vivit_slots = SharedSlots(PREDICT_MAX_BATCH * (VIVIT_PROCESSES + 1), NUM_FRAMES * IMG_SIZE * IMG_SIZE * 3)
+        vivit_pool = ProcessWorkerPool("ViViT", vivit_process_init, vivit_process_handle,
+                                       VIVIT_PROCESSES, TORCH_THREADS_PER_PROCESS)
+    for pool in (yolo_pool, vivit_pool):
+        if pool is not None:
+            pool.start()
+    if PRELOAD_MODELS:
+        models.load_all_async()
+    threading.Thread(target=report_startup, daemon=True).start()
+
+    yolo_thread = threading.Thread(target=yolo_worker, daemon=True)
+    tracker_threads = [threading.Thread(target=tracker_worker, args=(i,), daemon=True) for i in range(NUM_PIPELINE_WORKERS)]
+    vivit_threads = [threading.Thread(target=vivit_worker, args=(i,), daemon=True) for i in range(NUM_PIPELINE_WORKERS)]
+    predict_thread = threading.Thread(target=predict_worker, daemon=True)
+    predict_thread.start()
+    yolo_thread.start()
+    for t in tracker_threads + vivit_threads:
+        t.start()
+    session_manager.start_reaper()
+    classification_reporter.start()
+
+# 健康檢查：每個模型（與 worker process）是否已載入並完成 warm-up
+def health_status():
+    return models.status() + [pool.status() for pool in (yolo_pool, vivit_pool) if pool is not None]
+
+def is_ready():
+    return workers_started and all(status["state"] == "ready" for status in health_status())
+
+def wait_until_ready(timeout=None):
+    """等待所有模型載入完成，全部 ready 時回傳 True（有模型載入失敗或逾時回傳 False）"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    if not PRELOAD_MODELS:
+        return is_ready()  # 第一次使用時才載入，不會自己變成 ready
+    if not models.wait(timeout):
+        return False
+    for pool in (yolo_pool, vivit_pool):
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if pool is not None and not pool.wait_ready(remaining):
+            return False
+    return is_ready()
+
+def report_startup():
+    # 印出啟動時間：各模型載入 / warm-up 秒數，以及從 import 到可以開始處理 frame 的總時間
+    global startup_seconds
+    if wait_until_ready():
+        startup_seconds = time.monotonic() - models.created_at
+        parts = [f"{s['name']}={s['load_seconds']:.1f}s+{s['warmup_seconds']:.1f}s" for s in health_status()]
+        print(f"[Startup] ready in {startup_seconds:.1f}s (load+warm-up: {' '.join(parts)})")
+    elif PRELOAD_MODELS:
+        print(f"[Startup] not ready: {[s for s in health_status() if s['state'] != 'ready']}")
+
+def reload_response(request):
+    try:
+        status = reload_model(request.model, request.path, request.classes_file, request.version, request.wait)
+    except (ValueError, RuntimeError) as e:
+        return image_stream_pb2.ReloadResponse(accepted=False, error=str(e))
+    return image_stream_pb2.ReloadResponse(accepted=True, status=image_stream_pb2.ModelStatus(**status))
+
+def health_response():
+    ready = is_ready()
+    # PRELOAD_MODELS 關閉時沒有 report_startup 的時間，改用最後一個模型載入完成的時間
+    startup = (startup_seconds or models.startup_seconds() or 0.0) if ready else 0.0
+    response = image_stream_pb2.HealthResponse(ready=ready, uptime_seconds=time.monotonic() - models.created_at,
+                                               startup_seconds=startup)
+    for status in health_status():
+        response.models.add(**status)
+    return response
 
 # gRPC 服務
 class ImageStreamService(image_stream_pb2_grpc.ImageStreamServiceServicer):
@@ -218,45 +723,143 @@ class ImageStreamService(image_stream_pb2_grpc.ImageStreamServiceServicer):
         # 嘗試從 metadata 中取得 user_id，如果沒有則使用預設值
         metadata = dict(context.invocation_metadata())
         user_id = metadata.get('user-id', 'default_user')  # 從 metadata 取得 user_id
-        
-        for req in request_iterator:
+        # 有 session-id 時可在重新連線後沿用同一組 tracker 狀態，否則每個 call 各自一個 session
+        session_key = metadata.get('session-id')
+        resumable = session_key is not None
+        annotated = metadata.get('response-mode', DEFAULT_RESPONSE_MODE) == 'annotated'
+        session = session_manager.acquire(session_key or SessionManager.new_key(), user_id)
+        window = StreamWindow(lambda payload, result_q: submit_frame(payload, result_q, session),
+                              max_in_flight=MAX_IN_FLIGHT_FRAMES, result_timeout=RESULT_TIMEOUT)
+
+        # 讀取 request 與回傳 response 分開進行，client 送得比 pipeline 快時直接丟掉舊的 frame
+        def read_requests():
             try:
-                
-                start_time = time.time()  # Start timer
-                frame_data = np.frombuffer(req.image, dtype=np.uint8)
-                frame = cv2.imdecode(frame_data, cv2.IMREAD_COLOR)
-                # 為此 frame 建立專屬的結果佇列
-                result_q = queue.Queue()
-                # 將 frame 放入 YOLO 佇列，並傳遞 result_q 和 user_id
-                yolo_queue.put((frame, result_q, user_id))
-                # 等待處理完成，設定 timeout 避免無限等待（例如 5 秒）
-                processed_frame = result_q.get(timeout=5)
-                #_, encoded_img = cv2.imencode('.jpg', processed_frame)
-                end_time = time.time()  # End timer
-                print(f"Frame processing time: {(end_time - start_time)*1000:.2f} ms")
-                
-                #yield image_stream_pb2.ImageResponse(image=encoded_img.tobytes())
+                for req in request_iterator:
+                    window.offer(req.image)
             except Exception as e:
-                print(f"gRPC Error: {e}")
-                continue
+                # client 取消或斷線
+                print(f"gRPC request stream closed: {e}")
+            finally:
+                window.finish()
+
+        reader = threading.Thread(target=read_requests, daemon=True)
+        reader.start()
+        try:
+            for (frame, track_results), frame_id, latency in window.results():
+                if latency is not None:
+                    record_frame_latency(session, frame_id, latency)
+                yield build_response(frame, track_results, frame_id, annotated)
+        finally:
+            session_manager.release(session, close=not resumable)
+            print(f"Stream {session.key} closed: {window.stats()}")
+
+
+# 管理用的 RPC，只在 ADMIN_GRPC_ADDRESS（本機）上提供；公開 port 上呼叫會得到 UNIMPLEMENTED
+class AdminService(image_stream_pb2_grpc.ImageStreamServiceServicer):
+    def GetHealth(self, request, context):
+        return health_response()
+
+    def ReloadModel(self, request, context):
+        return reload_response(request)
+
+
+def build_response(frame, track_results, frame_id, annotated=False):
+    height, width = frame.shape[:2]
+    response = image_stream_pb2.ImageResponse(frame_id=frame_id or 0, width=width, height=height)
+    for track_id, (x1, y1, x2, y2), label, confidence in track_results:
+        response.tracks.add(track_id=int(track_id), x1=x1, y1=y1, x2=x2, y2=y2,
+                            label=label, confidence=confidence)
+    if annotated:
+        draw_tracks(frame, track_results)
+        _, encoded_img = cv2.imencode('.jpg', frame)
+        response.image = encoded_img.tobytes()
+    return response
+
+
+def draw_tracks(frame, track_results):
+    # 畫框與顯示，若已有預測結果就顯示
+    for track_id, (x1, y1, x2, y2), label, confidence in track_results:
+        label_text = f"Cat #{track_id}"
+        if label:
+            label_text += f" | {label} ({confidence:.2f})"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, label_text, (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+
+def record_frame_latency(session, frame_id, latency):
+    metrics.stage("frame").observe(latency)
+    log.log("frame", session=session.key, frame_id=frame_id, latency_ms=round(latency * 1000, 2))
+
+
+def submit_frame(image_bytes, result_q, session):
+    """解碼 frame 並放入 YOLO 佇列，處理結果會放進 result_q"""
+    with metrics.stage("decode").time():
+        frame_data = np.frombuffer(image_bytes, dtype=np.uint8)
+        frame = cv2.imdecode(frame_data, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("無法解碼影像")
+    session.touch()
+    yolo_queue.put((frame, result_q, session, time.perf_counter()))
 
 # 啟動 gRPC Server
 def serve():
+    # worker process 在建立 gRPC server（及其執行緒）之前 fork，模型由各 process 自己載入
+    start_workers()
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
     image_stream_pb2_grpc.add_ImageStreamServiceServicer_to_server(ImageStreamService(), server)
-    server.add_insecure_port('[::]:50051')
-    print("gRPC Server listening on port 50051")
+    server.add_insecure_port(f'[::]:{GRPC_PORT}')
+    admin_server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    image_stream_pb2_grpc.add_ImageStreamServiceServicer_to_server(AdminService(), admin_server)
+    admin_server.add_insecure_port(ADMIN_GRPC_ADDRESS)
+    print(f"gRPC Server listening on port {GRPC_PORT} (admin on {ADMIN_GRPC_ADDRESS})")
+    start_metrics_server()
+    admin_server.start()
     server.start()
-    server.wait_for_termination()
+    try:
+        server.wait_for_termination()
+    finally:
+        admin_server.stop(None)
+
+metrics_server = None
+
+def start_metrics_server():
+    global metrics_server
+    if METRICS_PORT is not None and metrics_server is None:
+        metrics_server = MetricsServer(metrics, port=METRICS_PORT)
+        metrics_server.start()
 
 # 結束時停止所有工作執行緒
 def stop_workers():
+    if not workers_started:
+        return
+    session_manager.stop_reaper()
     yolo_queue.put(None)
-    tracker_queue.put(None)
-    vivit_queue.put(None)
+    for q in tracker_queues + vivit_queues:
+        q.put(None)
+    predict_queue.put(None)
     yolo_thread.join()
-    tracker_thread.join()
-    vivit_thread.join()
+    for t in tracker_threads + vivit_threads:
+        t.join()
+    predict_thread.join()
+    for pool in (yolo_pool, vivit_pool):
+        if pool is not None:
+            pool.stop()
+    for slots in (yolo_slots, vivit_slots):
+        if slots is not None:
+            slots.close()
+    classification_reporter.stop()
+    if metrics_server is not None:
+        metrics_server.stop()
+    print(metrics.summary())
+    print(yolo_stats.summary())
+    print(predict_stats.summary())
+    print(f"[Reporter] {classification_reporter.stats()}")
+    print(clip_store.summary())
+    if motion_gate is not None:
+        print(motion_gate.summary())
+    if tubelet_cache is not None:
+        print(f"[TubeletCache] {tubelet_cache.stats()}")
 
 if __name__ == '__main__':
     try:
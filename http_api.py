@@ -1,49 +1,26 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import json
-import os
-import threading
-from datetime import datetime
+import atexit
+
+from stats_store import StatsStore
 
 app = Flask(__name__)
 CORS(app)  # 允許跨域請求
 
 # 用於儲存分類次數的檔案
-STATS_FILE = "user_stats.json"
-
-# 加載或初始化用戶統計資料
-def load_user_stats():
-    if os.path.exists(STATS_FILE):
-        try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
-
-# 保存用戶統計資料
-def save_user_stats(stats):
-    try:
-        with open(STATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
-    except IOError as e:
-        print(f"Error saving stats: {e}")
-
-# 初始化用戶統計資料
-user_stats = load_user_stats()
-stats_lock = threading.Lock()
+STATS_FILE = "user_stats.json"  # snapshot
+STATS_LOG_FILE = "user_stats.log"  # append-only 事件 log
+STATS_SNAPSHOT_INTERVAL = 30  # 每隔幾秒寫一次 snapshot
+STATS_SNAPSHOT_LOG_BYTES = 1024 * 1024  # log 超過多少 bytes 時提早寫 snapshot
 
 # 預設分類類別
 CATEGORIES = ["eating", "licking", "relex", "toilet"]
 
-def ensure_user_stats(user_id):
-    #確保用戶統計資料結構存在
-    if user_id not in user_stats:
-        user_stats[user_id] = {
-            "total_count": 0,
-            "categories": {category: 0 for category in CATEGORIES},
-            "last_update": datetime.now().isoformat()
-        }
+# 初始化用戶統計資料（載入 snapshot 並重播 log）
+stats_store = StatsStore(STATS_FILE, CATEGORIES, log_path=STATS_LOG_FILE,
+                         snapshot_interval=STATS_SNAPSHOT_INTERVAL, snapshot_log_bytes=STATS_SNAPSHOT_LOG_BYTES)
+stats_store.start()
+atexit.register(stats_store.close)
 
 
 @app.route('/api/classification', methods=['POST'])
@@ -67,34 +44,64 @@ def add_classification():
                 "error": f"Invalid category. Must be one of: {CATEGORIES}"
             }), 400
         
-        # 更新統計資料
-        with stats_lock:
-            ensure_user_stats(user_id)
-            user_stats[user_id]["categories"][category] += 1
-            user_stats[user_id]["total_count"] += 1
-            user_stats[user_id]["last_update"] = datetime.now().isoformat()
-            save_user_stats(user_stats)
+        # 更新統計資料（只附加一筆事件到 log）
+        stats = stats_store.add(user_id, category)
         
         return jsonify({
             "message": "Classification added successfully",
             "user_id": user_id,
             "category": category,
-            "new_count": user_stats[user_id]["categories"][category],
-            "total_count": user_stats[user_id]["total_count"]
+            "new_count": stats["categories"][category],
+            "total_count": stats["total_count"]
         })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/classification/batch', methods=['POST'])
+def add_classifications_batch():
+    #批次新增分類記錄 API，events: [{"user_id", "category", "count"(選填，預設 1)}]
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('events'), list):
+            return jsonify({
+                "error": "Missing required parameter: events"
+            }), 400
+
+        # 先檢查全部事件，再一次附加到 log
+        valid_events = []
+        rejected = []
+        for i, event in enumerate(data['events']):
+            if not isinstance(event, dict) or 'user_id' not in event or event.get('category') not in CATEGORIES:
+                rejected.append(i)
+                continue
+            count = event.get('count', 1)
+            # bool 是 int 的子類別，{"count": true} 不可當成 1
+            if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+                rejected.append(i)
+                continue
+            valid_events.append((str(event['user_id']), event['category'], count))
+
+        if valid_events:
+            stats_store.add_many(valid_events)
+
+        return jsonify({
+            "message": "Classifications added successfully",
+            "accepted": len(valid_events),
+            "rejected": rejected
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/stats/<user_id>', methods=['GET'])
 def get_user_stats(user_id):
     #查詢特定用戶的統計資料 API
     try:
         user_id = str(user_id)
         
-        with stats_lock:
-            ensure_user_stats(user_id)
-            stats = user_stats[user_id].copy()
+        stats = stats_store.get(user_id)
         
         return jsonify({
             "user_id": user_id,
@@ -108,8 +115,7 @@ def get_user_stats(user_id):
 def get_all_stats():
     #查詢所有用戶的統計資料 API
     try:
-        with stats_lock:
-            stats = user_stats.copy()
+        stats = stats_store.all()
         
         return jsonify({
             "all_users": stats,
@@ -125,24 +131,16 @@ def reset_user_stats(user_id):
     try:
         user_id = str(user_id)
         
-        with stats_lock:
-            if user_id in user_stats:
-                user_stats[user_id] = {
-                    "total_count": 0,
-                    "categories": {category: 0 for category in CATEGORIES},
-                    "last_update": datetime.now().isoformat()
-                }
-                save_user_stats(user_stats)
-                message = f"Stats reset for user {user_id}"
-            else:
-                message = f"User {user_id} not found, but initialized with zero stats"
-                ensure_user_stats(user_id)
-                save_user_stats(user_stats)
+        existed, stats = stats_store.reset(user_id)
+        if existed:
+            message = f"Stats reset for user {user_id}"
+        else:
+            message = f"User {user_id} not found, but initialized with zero stats"
         
         return jsonify({
             "message": message,
             "user_id": user_id,
-            "stats": user_stats[user_id]
+            "stats": stats
         })
     
     except Exception as e:
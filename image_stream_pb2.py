@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12image_stream.proto\"\x1d\n\x0cImageRequest\x12\r\n\x05image\x18\x01 \x01(\x0c\"\x1e\n\rImageResponse\x12\r\n\x05image\x18\x01 \x01(\x0c\x32G\n\x12ImageStreamService\x12\x31\n\x0cStreamImages\x12\r.ImageRequest\x1a\x0e.ImageResponse(\x01\x30\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x12image_stream.proto\"\x1d\n\x0cImageRequest\x12\r\n\x05image\x18\x01 \x01(\x0c\"r\n\x0bTrackResult\x12\x10\n\x08track_id\x18\x01 \x01(\x05\x12\n\n\x02x1\x18\x02 \x01(\x05\x12\n\n\x02y1\x18\x03 \x01(\x05\x12\n\n\x02x2\x18\x04 \x01(\x05\x12\n\n\x02y2\x18\x05 \x01(\x05\x12\r\n\x05label\x18\x06 \x01(\t\x12\x12\n\nconfidence\x18\x07 \x01(\x02\"m\n\rImageResponse\x12\r\n\x05image\x18\x01 \x01(\x0c\x12\x10\n\x08\x66rame_id\x18\x02 \x01(\x03\x12\r\n\x05width\x18\x03 \x01(\x05\x12\x0e\n\x06height\x18\x04 \x01(\x05\x12\x1c\n\x06tracks\x18\x05 \x03(\x0b\x32\x0c.TrackResult\"\x0f\n\rHealthRequest\"\x8b\x01\n\x0bModelStatus\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05state\x18\x02 \x01(\t\x12\x14\n\x0cload_seconds\x18\x03 \x01(\x02\x12\x16\n\x0ewarmup_seconds\x18\x04 \x01(\x02\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x12\x0f\n\x07version\x18\x06 \x01(\t\x12\x11\n\treloading\x18\x07 \x01(\t\"n\n\x0eHealthResponse\x12\r\n\x05ready\x18\x01 \x01(\x08\x12\x16\n\x0euptime_seconds\x18\x02 \x01(\x02\x12\x17\n\x0fstartup_seconds\x18\x03 \x01(\x02\x12\x1c\n\x06models\x18\x04 \x03(\x0b\x32\x0c.ModelStatus\"a\n\rReloadRequest\x12\r\n\x05model\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12\x14\n\x0c\x63lasses_file\x18\x03 \x01(\t\x12\x0f\n\x07version\x18\x04 \x01(\t\x12\x0c\n\x04wait\x18\x05 \x01(\x08\"O\n\x0eReloadResponse\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x01 \x01(\x08\x12\r\n\x05\x65rror\x18\x02 \x01(\t\x12\x1c\n\x06status\x18\x03 \x01(\x0b\x32\x0c.ModelStatus2\xa5\x01\n\x12ImageStreamService\x12\x31\n\x0cStreamImages\x12\r.ImageRequest\x1a\x0e.ImageResponse(\x01\x30\x01\x12,\n\tGetHealth\x12\x0e.HealthRequest\x1a\x0f.HealthResponse\x12.\n\x0bReloadModel\x12\x0e.ReloadRequest\x1a\x0f.ReloadResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,8 +33,20 @@ if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_IMAGEREQUEST']._serialized_start=22
   _globals['_IMAGEREQUEST']._serialized_end=51
-  _globals['_IMAGERESPONSE']._serialized_start=53
-  _globals['_IMAGERESPONSE']._serialized_end=83
-  _globals['_IMAGESTREAMSERVICE']._serialized_start=85
-  _globals['_IMAGESTREAMSERVICE']._serialized_end=156
+  _globals['_TRACKRESULT']._serialized_start=53
+  _globals['_TRACKRESULT']._serialized_end=167
+  _globals['_IMAGERESPONSE']._serialized_start=169
+  _globals['_IMAGERESPONSE']._serialized_end=278
+  _globals['_HEALTHREQUEST']._serialized_start=280
+  _globals['_HEALTHREQUEST']._serialized_end=295
+  _globals['_MODELSTATUS']._serialized_start=298
+  _globals['_MODELSTATUS']._serialized_end=437
+  _globals['_HEALTHRESPONSE']._serialized_start=439
+  _globals['_HEALTHRESPONSE']._serialized_end=549
+  _globals['_RELOADREQUEST']._serialized_start=551
+  _globals['_RELOADREQUEST']._serialized_end=648
+  _globals['_RELOADRESPONSE']._serialized_start=650
+  _globals['_RELOADRESPONSE']._serialized_end=729
+  _globals['_IMAGESTREAMSERVICE']._serialized_start=732
+  _globals['_IMAGESTREAMSERVICE']._serialized_end=897
 # @@protoc_insertion_point(module_scope)
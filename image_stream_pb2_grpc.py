@@ -39,6 +39,16 @@ class ImageStreamServiceStub(object):
                 request_serializer=image__stream__pb2.ImageRequest.SerializeToString,
                 response_deserializer=image__stream__pb2.ImageResponse.FromString,
                 _registered_method=True)
+        self.GetHealth = channel.unary_unary(
+                '/ImageStreamService/GetHealth',
+                request_serializer=image__stream__pb2.HealthRequest.SerializeToString,
+                response_deserializer=image__stream__pb2.HealthResponse.FromString,
+                _registered_method=True)
+        self.ReloadModel = channel.unary_unary(
+                '/ImageStreamService/ReloadModel',
+                request_serializer=image__stream__pb2.ReloadRequest.SerializeToString,
+                response_deserializer=image__stream__pb2.ReloadResponse.FromString,
+                _registered_method=True)
 
 
 class ImageStreamServiceServicer(object):
@@ -50,6 +60,20 @@ class ImageStreamServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetHealth(self, request, context):
+        """各模型是否已載入並完成 warm-up，start_servers.py 與負載平衡器用來判斷能否開始送 frame
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReloadModel(self, request, context):
+        """在背景載入新的 ViViT / YOLO checkpoint 並 warm-up，完成後替換正在使用的模型，track 狀態保留
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ImageStreamServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +82,16 @@ def add_ImageStreamServiceServicer_to_server(servicer, server):
                     request_deserializer=image__stream__pb2.ImageRequest.FromString,
                     response_serializer=image__stream__pb2.ImageResponse.SerializeToString,
             ),
+            'GetHealth': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetHealth,
+                    request_deserializer=image__stream__pb2.HealthRequest.FromString,
+                    response_serializer=image__stream__pb2.HealthResponse.SerializeToString,
+            ),
+            'ReloadModel': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReloadModel,
+                    request_deserializer=image__stream__pb2.ReloadRequest.FromString,
+                    response_serializer=image__stream__pb2.ReloadResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'ImageStreamService', rpc_method_handlers)
@@ -95,3 +129,57 @@ class ImageStreamService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetHealth(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ImageStreamService/GetHealth',
+            image__stream__pb2.HealthRequest.SerializeToString,
+            image__stream__pb2.HealthResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReloadModel(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ImageStreamService/ReloadModel',
+            image__stream__pb2.ReloadRequest.SerializeToString,
+            image__stream__pb2.ReloadResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
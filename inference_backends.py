@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import torch
+
+# ViViT 推論後端：
+# "torch"：eager PyTorch（原本的做法）
+# "torchscript" / "onnx"：export_models.py 從 checkpoint 匯出的模型
+# 每個後端都提供 __call__(clips) 與 forward_embeddings(tokens)，以及 eager 的 tubelet_embedding，
+# 所以 TubeletEmbeddingCache 的增量推論在任何後端都能使用。
+VIVIT_BACKENDS = ("torch", "torchscript", "onnx")
+EXPORT_SUFFIXES = {"torchscript": ".ts", "onnx": ".onnx"}
+
+
+def exported_model_paths(checkpoint_path, backend, profile=None):
+    """
+    models/best_mode_36l.pth -> (models/best_mode_36l.onnx, models/best_mode_36l_encoder.onnx)
+    匯出的模型固定輸入大小，其他輸入設定檔加上後綴：profile="fast" -> models/best_mode_36l_fast.onnx
+    """
+    base = os.path.splitext(checkpoint_path)[0]
+    if profile:
+        base += "_" + profile
+    suffix = EXPORT_SUFFIXES[backend]
+    return base + suffix, base + "_encoder" + suffix
+
+
+# forward_embeddings 包成獨立的 module 才能各自 trace / export
+class ViViTEncoder(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, tokens):
+        return self.model.forward_embeddings(tokens)
+
+
+class TorchViViTBackend:
+    def __init__(self, model):
+        self.model = model
+        self.tubelet_embedding = model.tubelet_embedding
+
+    def __call__(self, clips):
+        return self.model(clips)
+
+    def forward_embeddings(self, tokens):
+        return self.model.forward_embeddings(tokens)
+
+
+class TorchScriptViViTBackend:
+    def __init__(self, model, checkpoint_path, device=torch.device("cpu"), profile=None):
+        full_path, encoder_path = exported_model_paths(checkpoint_path, "torchscript", profile)
+        self.full = torch.jit.load(full_path, map_location=device).eval()
+        self.encoder = torch.jit.load(encoder_path, map_location=device).eval()
+        self.tubelet_embedding = model.tubelet_embedding
+
+    def __call__(self, clips):
+        return self.full(clips)
+
+    def forward_embeddings(self, tokens):
+        return self.encoder(tokens)
+
+
+class OnnxViViTBackend:
+    def __init__(self, model, checkpoint_path, num_threads=None, profile=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        full_path, encoder_path = exported_model_paths(checkpoint_path, "onnx", profile)
+        self.full = ort.InferenceSession(full_path, options, providers=["CPUExecutionProvider"])
+        self.encoder = ort.InferenceSession(encoder_path, options, providers=["CPUExecutionProvider"])
+        self.tubelet_embedding = model.tubelet_embedding
+
+    @staticmethod
+    def _run(session, x):
+        inputs = {session.get_inputs()[0].name: np.ascontiguousarray(x.detach().cpu().numpy())}
+        return torch.from_numpy(session.run(None, inputs)[0])
+
+    def __call__(self, clips):
+        return self._run(self.full, clips)
+
+    def forward_embeddings(self, tokens):
+        return self._run(self.encoder, tokens)
+
+
+def create_vivit_backend(backend, model, checkpoint_path, device=torch.device("cpu"), num_threads=None, profile=None):
+    """model 為已載入 checkpoint 的 eager 模型，匯出的後端只使用它的 tubelet_embedding；profile 見 exported_model_paths"""
+    if backend == "torch":
+        return TorchViViTBackend(model)
+    if backend == "torchscript":
+        return TorchScriptViViTBackend(model, checkpoint_path, device, profile)
+    if backend == "onnx":
+        if device.type != "cpu":
+            raise ValueError("onnx backend only runs on CPU")
+        return OnnxViViTBackend(model, checkpoint_path, num_threads, profile)
+    raise ValueError(f"unknown ViViT backend {backend!r}, expected one of {VIVIT_BACKENDS}")
+
+
+# YOLO 後端：ultralytics 可直接載入匯出的 ONNX 模型，predict 介面不變
+YOLO_BACKENDS = {"torch": ".pt", "onnx": ".onnx"}
+
+
+def yolo_model_path(base_path, backend):
+    """models/best.pt + "onnx" -> models/best.onnx；torch 後端直接使用原路徑（也可以是 ultralytics 的 .yaml）"""
+    if backend not in YOLO_BACKENDS:
+        raise ValueError(f"unknown YOLO backend {backend!r}, expected one of {tuple(YOLO_BACKENDS)}")
+    if backend == "torch":
+        return base_path
+    return os.path.splitext(base_path)[0] + YOLO_BACKENDS[backend]
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from collections import deque
+
+
+# 動態微批次：從佇列收集工作，直到達到最大批次大小或等待截止時間
+class MicroBatcher:
+    def __init__(self, source_queue, max_batch_size=8, max_wait_ms=20):
+        self.source_queue = source_queue
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._stopped = False
+        self.collect_start = None  # 本批次第一筆工作取出的時間，用來計算湊批次增加的等待
+
+    def next_batch(self):
+        """
+        阻塞等待第一筆工作，之後在 max_wait 內盡量湊滿 max_batch_size。
+        收到 None（停止訊號）時回傳目前已收集的批次，下一次呼叫回傳 None。
+        """
+        if self._stopped:
+            return None
+
+        item = self.source_queue.get()
+        if item is None:
+            self.source_queue.task_done()
+            self._stopped = True
+            return None
+
+        batch = [item]
+        self.collect_start = time.perf_counter()
+        deadline = self.collect_start + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.source_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self.source_queue.task_done()
+                self._stopped = True
+                break
+            batch.append(item)
+        return batch
+
+
+# 批次統計：實際批次大小分布與每批延遲（由 metrics 匯出，結束時印出 summary()）
+class BatchStats:
+    def __init__(self, name, max_batch_size=None, wait_window=1000):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.size_counts = {}
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.waits = deque(maxlen=wait_window)  # 最近每筆工作因湊批次多等的時間
+
+    def record(self, batch_size, latency):
+        with self._lock:
+            self.batches += 1
+            self.items += batch_size
+            self.size_counts[batch_size] = self.size_counts.get(batch_size, 0) + 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def record_waits(self, waits):
+        with self._lock:
+            self.waits.extend(waits)
+
+    def snapshot(self):
+        with self._lock:
+            batches = self.batches
+            snapshot = {
+                "batches": batches,
+                "items": self.items,
+                "mean_batch_size": self.items / batches if batches else 0.0,
+                "batch_size_counts": dict(sorted(self.size_counts.items())),
+                "mean_latency_ms": self.total_latency / batches * 1000 if batches else 0.0,
+                "max_latency_ms": self.max_latency * 1000,
+            }
+            if self.max_batch_size:
+                snapshot["occupancy"] = snapshot["mean_batch_size"] / self.max_batch_size
+            if self.waits:
+                waits = sorted(self.waits)
+                snapshot["mean_wait_ms"] = sum(waits) / len(waits) * 1000
+                snapshot["p99_wait_ms"] = waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000
+            return snapshot
+
+    def summary(self):
+        s = self.snapshot()
+        summary = (f"[{self.name}] batches={s['batches']} mean_batch={s['mean_batch_size']:.2f} "
+                   f"sizes={s['batch_size_counts']} mean_latency={s['mean_latency_ms']:.1f} ms "
+                   f"max_latency={s['max_latency_ms']:.1f} ms")
+        if "occupancy" in s:
+            summary += f" occupancy={s['occupancy']:.0%}"
+        if "mean_wait_ms" in s:
+            summary += f" batching_wait={s['mean_wait_ms']:.1f} ms (p99 {s['p99_wait_ms']:.1f} ms)"
+        return summary
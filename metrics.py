@@ -0,0 +1,235 @@
+import bisect
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 延遲 histogram 的 bucket 上界（秒），約 1 ms ~ 10 s，每個區間約 1.5 倍，分位數在 bucket 內插值後誤差約在 20% 以內
+LATENCY_BUCKETS = (0.001, 0.0015, 0.002, 0.003, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.03, 0.05, 0.075,
+                   0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0)
+
+
+# 固定 bucket 的延遲 histogram，observe 只做一次二分搜尋與計數，可以放在熱路徑
+class Histogram:
+    def __init__(self, name, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後一格為 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        """with histogram.time(): ... 記錄區塊的執行時間"""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """估計分位數（秒）：在落入的 bucket 內線性插值（與 Prometheus 的 histogram_quantile 相同）"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+        target, seen, lower = q * total, 0, 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= target:
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]  # 落在 +Inf bucket，只知道大於最後一個上界
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        return {
+            "count": total,
+            "mean_ms": value_sum / total * 1000 if total else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], counts)),
+        }
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+# pipeline 的 metrics：各階段延遲 histogram、各模型版本的推論延遲，
+# 以及讀取時才呼叫的 gauge（例如佇列深度）與 counter（其他元件已在累計的次數）
+class Metrics:
+    def __init__(self, prefix="cat_pipeline"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._versions = {}
+        self._gauges = {}
+        self._counters = {}
+
+    def stage(self, name):
+        """取得（或建立）階段 name 的延遲 histogram"""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(name))
+        return histogram
+
+    def model_version(self, model, version):
+        """取得（或建立）模型 model 的版本 version 的推論延遲 histogram，hot swap 後可在實際負載下比較新舊版本"""
+        key = (model, version)
+        histogram = self._versions.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._versions.setdefault(key, Histogram(f"{model}@{version}"))
+        return histogram
+
+    def gauge(self, name, fn, **labels):
+        """註冊 gauge，fn 在匯出時才呼叫（例如 queue.qsize）"""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = fn
+
+    def counter(self, name, fn, **labels):
+        """註冊只會增加的累計值（例如回收次數），fn 在匯出時才呼叫"""
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] = fn
+
+    def snapshot(self):
+        with self._lock:
+            histograms = dict(self._histograms)
+            versions = dict(self._versions)
+            gauges = dict(self._gauges)
+            counters = dict(self._counters)
+        by_model = {}
+        for (model, version), h in versions.items():
+            by_model.setdefault(model, {})[version] = h.snapshot()
+        return {
+            "stages": {name: h.snapshot() for name, h in histograms.items()},
+            "model_versions": by_model,
+            "gauges": [{"name": name, "labels": dict(labels), "value": fn()} for (name, labels), fn in gauges.items()],
+            "counters": [{"name": name, "labels": dict(labels), "value": fn()} for (name, labels), fn in counters.items()],
+        }
+
+    def prometheus(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            versions = dict(self._versions)
+            gauges = dict(self._gauges)
+            counters = dict(self._counters)
+        metric = f"{self.prefix}_stage_latency_seconds"
+        lines = [f"# TYPE {metric} histogram"]
+        for name, h in histograms.items():
+            lines.extend(_histogram_lines(metric, _label_text(stage=name), h))
+        if versions:
+            metric = f"{self.prefix}_model_latency_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for (model, version), h in sorted(versions.items()):
+                lines.extend(_histogram_lines(metric, _label_text(model=model, version=version), h))
+        for kind, values in (("gauge", gauges), ("counter", counters)):
+            typed = set()
+            for (name, labels), fn in sorted(values.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+                lines.append(f"{self.prefix}_{name}{{{_label_text(**dict(labels))}}} {fn()}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        parts = [f"{name}={h.snapshot()['mean_ms']:.1f}ms(p99~{h.quantile(0.99) * 1000:.0f})"
+                 for name, h in sorted(dict(self._histograms).items())]
+        parts += [f"{h.name}={h.snapshot()['mean_ms']:.1f}ms(n={h.count})"
+                  for _, h in sorted(dict(self._versions).items())]
+        return "[Metrics] " + " ".join(parts)
+
+
+def _label_text(**labels):
+    # label 值可能來自檔名（例如 ReloadModel 的 version），依 exposition format 跳脫 \、" 與換行
+    return ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(metric, label_text, h):
+    with h._lock:
+        counts, total, value_sum = list(h.counts), h.count, h.sum
+    lines, cumulative = [], 0
+    for bound, count in zip([str(b) for b in h.buckets] + ["+Inf"], counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_sum{{{label_text}}} {value_sum}')
+    lines.append(f'{metric}_count{{{label_text}}} {total}')
+    return lines
+
+
+# 本機的 metrics HTTP endpoint：GET /metrics（Prometheus）、GET /metrics.json
+class MetricsServer:
+    def __init__(self, metrics, host="127.0.0.1", port=9100):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不在每次抓取時輸出 access log
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="metrics-http").start()
+        print(f"Metrics endpoint listening on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+# 取樣的結構化 log：每筆為一行 JSON，熱路徑的事件只輸出 sample_rate 比例，避免 print 拖慢吞吐量
+class SampledLogger:
+    def __init__(self, sample_rate=0.01, sample_rates=None):
+        self.sample_rate = sample_rate
+        self.sample_rates = dict(sample_rates or {})  # 個別事件的取樣率，例如錯誤事件設為 1.0
+        self._random = random.Random()
+
+    def log(self, event, **fields):
+        rate = self.sample_rates.get(event, self.sample_rate)
+        if rate < 1.0 and self._random.random() >= rate:
+            return
+        record = {"ts": round(time.time(), 3), "event": event}
+        record.update(fields)
+        if rate < 1.0:
+            record["sample_rate"] = rate
+        print(json.dumps(record, ensure_ascii=False, default=str))
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 import torch
 import torch.nn as nn
 from model_util import (TubeletEmbedding, Attention, TransformerEncoder, TokenProcessor)
@@ -14,6 +16,8 @@ class ViViT_Factorized(nn.Module):
         # **計算影片的 Token 數量**
         num_patches = (img_size // patch_size) * (img_size // patch_size)
         effective_num_frames = num_frames // tubelet_size  # 下採樣後的幀數
+        self.num_patches = num_patches  # 每個時間片段的 patch 數
+        self.token_grid = (effective_num_frames, img_size // patch_size, img_size // patch_size)  # (T', H', W')
         self.num_tokens = effective_num_frames * num_patches  # 正確的 token 數量
 
         # **CLS Token & 位置編碼**
@@ -36,6 +40,10 @@ class ViViT_Factorized(nn.Module):
         # Step 1: 影片 Token 化
         x = self.tubelet_embedding(x)  # (B, N, embed_dim)
 
+        return self.forward_embeddings(x)
+
+    def forward_embeddings(self, x):
+        """從 tubelet embedding 之後開始計算（x: (B, N, embed_dim)），供增量推論重複使用已算過的 tubelet"""
         # Step 2: 加入 CLS Token & 位置編碼
         x = TokenProcessor.add_cls_token(x, self.cls_token)  # (B, N+1, embed_dim)
         x = TokenProcessor.add_positional_embedding(x, self.pos_embedding)  # (B, N+1, embed_dim)
@@ -56,3 +64,66 @@ class ViViT_Factorized(nn.Module):
         x = self.mlp_head(x)  # (B, num_classes)
 
         return x
+
+    def load_resized_state_dict(self, state_dict, num_frames, img_size, strict=True):
+        """
+        載入以 num_frames 幀、img_size 解析度訓練的 checkpoint。
+        模型的輸入大小不同時（例如 16 幀 160px），pos_embedding 依時間與空間做三線性插值，其餘參數與大小無關可直接載入。
+        """
+        tubelet_size, patch_size, _ = self.tubelet_embedding.conv3d.kernel_size
+        src_grid = (num_frames // tubelet_size, img_size // patch_size, img_size // patch_size)
+        # 複製時保留 _metadata（量化 Linear 依其中的版本號解析 int8 權重）
+        metadata = getattr(state_dict, "_metadata", None)
+        state_dict = OrderedDict(state_dict)
+        if metadata is not None:
+            state_dict._metadata = metadata
+        state_dict["pos_embedding"] = TokenProcessor.interpolate_positional_embedding(
+            state_dict["pos_embedding"], src_grid, self.token_grid)
+        return self.load_state_dict(state_dict, strict=strict)
+
+    def optimize_for_inference(self, fuse_qkv=True):
+        """載入權重後呼叫：所有 Attention 改用 SDPA，並可合併 QKV 權重"""
+        self.eval()
+        for module in self.modules():
+            if isinstance(module, Attention):
+                module.enable_fast_inference(fuse_qkv)
+        return self
+
+
+#MODEL 2（真正的 factorised encoder）
+class ViViT_FactorizedEncoder(ViViT_Factorized):
+    """
+    與 ViViT_Factorized 參數完全相同（可直接 load 同一份 checkpoint），但注意力真正分開計算：
+    - 空間 Transformer 對每個時間片段各自計算（P+1 個 token，時間維度併入 batch）
+    - 時間 Transformer 只處理每個時間片段的摘要 token（T'+1 個 token）
+    注意力計算量約為原本的 1 / T'。架構不同，需用此架構訓練（或微調）的權重才有相同準確率。
+    """
+
+    def forward_embeddings(self, x):
+        # x: tubelet embedding 的輸出 (B, T'*P, embed_dim)
+        B = x.shape[0]
+        P = self.num_patches
+        T = x.shape[1] // P
+        D = x.shape[2]
+
+        # Step 2: 位置編碼沿用原模型每個 token 的位置，CLS Token 加在每個時間片段前面
+        x = x + self.pos_embedding[:, 1:T * P + 1]
+        x = x.reshape(B * T, P, D)  # (B*T', P, embed_dim)
+        cls_tokens = (self.cls_token + self.pos_embedding[:, :1]).expand(B * T, -1, -1)
+        x = torch.cat((cls_tokens, x), dim=1)  # (B*T', P+1, embed_dim)
+
+        # Step 3: **空間 Transformer**（每個時間片段各自計算）
+        x = self.spatial_transformer(x)  # (B*T', P+1, embed_dim)
+
+        # Step 4: 每個時間片段壓縮成一個摘要 token
+        frame_tokens = TokenProcessor.temporal_embedding(x, method="gap").reshape(B, T, D)  # (B, T', embed_dim)
+        x = TokenProcessor.add_cls_token(frame_tokens, self.cls_token)  # (B, T'+1, embed_dim)
+
+        # Step 5: **時間 Transformer**
+        x = self.temporal_transformer(x)  # (B, T'+1, embed_dim)
+
+        # Step 6: **分類**
+        x = self.norm(x[:, 0])  # (B, embed_dim)
+        x = self.mlp_head(x)  # (B, num_classes)
+
+        return x
@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import namedtuple
+
+# 模型狀態
+PENDING = "pending"  # 尚未載入
+LOADING = "loading"
+WARMING = "warming"  # 已載入，正在以假輸入執行 warm-up forward
+READY = "ready"
+FAILED = "failed"
+
+# 使用中的模型與版本，替換時整個換掉，讀取端拿到的 model / version / info 一定屬於同一個版本
+ModelVersion = namedtuple("ModelVersion", ["model", "version", "info"])
+
+
+class _Entry:
+    def __init__(self, name, loader, warmup, version, info):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.version = version
+        self.info = info
+        self.state = PENDING
+        self.current = None  # ModelVersion
+        self.reloading = ""  # 正在背景載入的版本
+        self.error = ""
+        self.load_seconds = 0.0
+        self.warmup_seconds = 0.0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+
+# 延遲載入的模型登錄表：import 時只登記載入方式，第一次使用或呼叫 load_all_async() 時才載入
+class ModelRegistry:
+    """
+    - register(name, loader, warmup=None)：loader() 回傳模型，warmup(model) 以假輸入執行一次 forward，
+      讓第一張真正的 frame 不必負擔 lazy init、cuDNN / oneDNN 選擇演算法等一次性成本
+    - get(name) 第一次使用時在呼叫端的執行緒載入，同一個模型只載入一次，其他執行緒等待載入完成
+    - load_all_async() 在背景執行緒平行載入並 warm-up 全部模型
+    - status() / ready() 供 health check 回報每個模型的狀態與載入 / warm-up 秒數
+    - reload(name, loader, version) 在背景載入並 warm-up 新版本後才替換，替換前已用 get() 取得舊模型的批次照常用舊模型完成
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.created_at = time.monotonic()
+        self.ready_at = None
+
+    def register(self, name, loader, warmup=None, version="", info=None):
+        """info 是與模型一起替換的附加資料（例如 ViViT 的類別名稱）"""
+        self._entries[name] = _Entry(name, loader, warmup, version, info)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def get(self, name):
+        return self.current(name).model
+
+    def current(self, name):
+        """回傳使用中的 ModelVersion，尚未載入時先載入"""
+        entry = self._entries[name]
+        current = entry.current
+        if current is None:
+            self._load(entry)
+            current = entry.current
+            if current is None:
+                raise RuntimeError(f"model {name} failed to load: {entry.error}")
+        return current
+
+    def _load(self, entry):
+        with entry.lock:
+            if entry.state in (READY, FAILED):
+                return
+            try:
+                entry.state = LOADING
+                start = time.perf_counter()
+                model = entry.loader()
+                entry.load_seconds = time.perf_counter() - start
+                if entry.warmup is not None:
+                    entry.state = WARMING
+                    start = time.perf_counter()
+                    entry.warmup(model)
+                    entry.warmup_seconds = time.perf_counter() - start
+                if entry.current is None:  # 載入期間已被 reload 的版本取代時不覆寫
+                    entry.current = ModelVersion(model, entry.version, entry.info)
+                entry.state = READY
+                print(f"[Models] {entry.name} ready (load {entry.load_seconds:.1f}s, warm-up {entry.warmup_seconds:.1f}s)")
+            except Exception as e:
+                entry.state = FAILED
+                entry.error = f"{type(e).__name__}: {e}"
+                print(f"[Models] {entry.name} failed to load: {entry.error}")
+            finally:
+                entry.done.set()
+            if self.ready_at is None and self.ready():
+                self.ready_at = time.monotonic()
+
+    def reload(self, name, loader, version, info=None, wait=False):
+        """
+        在背景執行緒載入 loader() 回傳的新版本並 warm-up，成功後替換使用中的版本；
+        失敗時保留舊版本並記錄在 status() 的 error。同一個模型同時只能有一個 reload。
+        """
+        entry = self._entries[name]
+        with self._lock:
+            if entry.reloading:
+                raise RuntimeError(f"model {name} is already reloading {entry.reloading}")
+            entry.reloading = version
+
+        def run():
+            try:
+                start = time.perf_counter()
+                model = loader()
+                load_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                if entry.warmup is not None:
+                    entry.warmup(model)
+                warmup_seconds = time.perf_counter() - start
+            except Exception as e:
+                entry.error = f"reload {version} failed: {type(e).__name__}: {e}"
+                print(f"[Models] {name} {entry.error}")
+                return
+            finally:
+                with self._lock:
+                    entry.reloading = ""
+            with entry.lock:
+                previous = entry.current
+                entry.current = ModelVersion(model, version, entry.info if info is None else info)
+                entry.loader, entry.version, entry.info = loader, version, entry.current.info
+                entry.load_seconds, entry.warmup_seconds, entry.error = load_seconds, warmup_seconds, ""
+                entry.state = READY
+                entry.done.set()
+            if self.ready_at is None and self.ready():
+                self.ready_at = time.monotonic()
+            print(f"[Models] {name} swapped {previous.version if previous else '(not loaded)'} -> {version} "
+                  f"(load {load_seconds:.1f}s, warm-up {warmup_seconds:.1f}s)")
+
+        thread = threading.Thread(target=run, daemon=True, name=f"reload-{name}")
+        thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def load_all_async(self):
+        """每個模型各一個背景執行緒，載入（多半是 I/O 與釋放 GIL 的 torch 運算）可以重疊"""
+        threads = [threading.Thread(target=self._load, args=(entry,), daemon=True, name=f"load-{entry.name}")
+                   for entry in self._entries.values()]
+        for t in threads:
+            t.start()
+        return threads
+
+    def ready(self):
+        return all(entry.state == READY for entry in self._entries.values())
+
+    def wait(self, timeout=None):
+        """等待所有模型載入完成（或失敗），逾時回傳 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for entry in self._entries.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not entry.done.wait(remaining):
+                return False
+        return True
+
+    def status(self):
+        statuses = []
+        for entry in self._entries.values():
+            current = entry.current
+            statuses.append({"name": entry.name, "state": entry.state, "load_seconds": entry.load_seconds,
+                             "warmup_seconds": entry.warmup_seconds, "error": entry.error,
+                             "version": current.version if current else "", "reloading": entry.reloading})
+        return statuses
+
+    def entry_status(self, name):
+        return next(status for status in self.status() if status["name"] == name)
+
+    def startup_seconds(self):
+        """從建立登錄表到所有模型 ready 的秒數，尚未 ready 時為 None"""
+        return None if self.ready_at is None else self.ready_at - self.created_at
@@ -1,5 +1,6 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 
 class TubeletEmbedding(nn.Module):
     # RGB、小立方體經過特徵提取後的壓縮表示、立方體長寬、立方體的時間
@@ -76,6 +77,22 @@ class TokenProcessor:
         """加入 Positional Embedding"""
         return x + pos_embedding[:, :x.shape[1], :]
 
+    @staticmethod
+    def interpolate_positional_embedding(pos_embedding, src_grid, dst_grid):
+        """
+        將 (1, 1 + T*H*W, embed_dim) 的位置編碼從 src_grid (T, H, W) 三線性插值到 dst_grid，
+        token 順序與 TubeletEmbedding 的輸出相同（時間、列、行），CLS 的位置編碼保持不變
+        """
+        if tuple(src_grid) == tuple(dst_grid):
+            return pos_embedding
+        cls_pos, grid = pos_embedding[:, :1], pos_embedding[:, 1:]
+        T, H, W = src_grid
+        embed_dim = grid.shape[-1]
+        grid = grid.reshape(1, T, H, W, embed_dim).permute(0, 4, 1, 2, 3)  # (1, embed_dim, T, H, W)
+        grid = F.interpolate(grid, size=tuple(dst_grid), mode="trilinear", align_corners=False)
+        grid = grid.permute(0, 2, 3, 4, 1).reshape(1, -1, embed_dim)
+        return torch.cat((cls_pos, grid), dim=1)
+
     @staticmethod
     def temporal_embedding(x, method="cls"):
         """
@@ -117,7 +134,51 @@ class Attention(nn.Module):
         self.out = nn.Linear(embed_dim, embed_dim)
         self.dropout = nn.Dropout(dropout)
 
+        # 推論模式：合併後的 QKV 權重（不存進 state_dict，checkpoint 格式不變）
+        self.use_sdpa = False
+        self.register_buffer("qkv_weight", None, persistent=False)
+        self.register_buffer("qkv_bias", None, persistent=False)
+
+    @torch.no_grad()
+    def enable_fast_inference(self, fuse_qkv=True):
+        """
+        推論專用：改用 scaled_dot_product_attention（不建立完整的 N x N 注意力矩陣），
+        fuse_qkv 時把 Q、K、V 三個 Linear 合併成一次矩陣乘法。
+        需在 load_state_dict 之後呼叫，權重更新後要重新呼叫一次。
+        """
+        self.use_sdpa = True
+        if fuse_qkv:
+            self.qkv_weight = torch.cat([self.query.weight, self.key.weight, self.value.weight], dim=0)
+            self.qkv_bias = torch.cat([self.query.bias, self.key.bias, self.value.bias], dim=0)
+        else:
+            self.qkv_weight = None
+            self.qkv_bias = None
+
+    def disable_fast_inference(self):
+        self.use_sdpa = False
+        self.qkv_weight = None
+        self.qkv_bias = None
+
+    def _fast_forward(self, x):
+        B, N, C = x.shape
+        if self.qkv_weight is not None:
+            # (B, N, 3C) -> (3, B, heads, N, head_dim)
+            qkv = F.linear(x, self.qkv_weight, self.qkv_bias)
+            qkv = qkv.view(B, N, 3, self.num_heads, self.head_dim).permute(2, 0, 3, 1, 4)
+            Q, K, V = qkv[0], qkv[1], qkv[2]
+        else:
+            Q = self.query(x).view(B, N, self.num_heads, self.head_dim).transpose(1, 2)
+            K = self.key(x).view(B, N, self.num_heads, self.head_dim).transpose(1, 2)
+            V = self.value(x).view(B, N, self.num_heads, self.head_dim).transpose(1, 2)
+
+        out = F.scaled_dot_product_attention(Q, K, V)
+        out = out.transpose(1, 2).reshape(B, N, C)
+        return self.out(out)
+
     def forward(self, x):
+        if self.use_sdpa and not self.training:
+            return self._fast_forward(x)
+
         B, N, C = x.shape
 
         # Q, K, V 計算並 reshape
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import numpy as np
+
+
+# 靜止 track 的 ViViT 推論略過策略
+class MotionGate:
+    """
+    睡覺（relex）的貓每次送出的 clip 幾乎相同，重複執行 ViViT 只會得到相同的結果。
+    每個 snapshot 先計算低解析度的灰階簽章（每 frame_step 幀取一張、每 pixel_step 個像素取一點），
+    變化分數 = max(clip 內相鄰取樣幀的平均差, 與上次推論的 clip 簽章的平均差)，以 0~1 表示。
+    分數低於 threshold 且上次推論距今不超過 max_staleness 秒時，沿用該 track 目前的預測結果。
+
+    audit=True 時不略過任何推論，只記錄「若略過則沿用的結果」與實際預測是否不同，用來調整 threshold。
+    狀態存在 ClipRingBuffer.gate_state，track 被回收時一起釋放。
+    """
+
+    def __init__(self, threshold=0.02, max_staleness=10.0, frame_step=4, pixel_step=8, audit=False,
+                 clock=time.monotonic):
+        self.threshold = threshold
+        self.max_staleness = max_staleness
+        self.frame_step = frame_step
+        self.pixel_step = pixel_step
+        self.audit = audit
+        self.clock = clock  # 離線重播時可改用影片時間
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.skipped = 0
+        self.stale = 0  # 變化小但超過 max_staleness 而重新推論的次數
+        self.audited = 0
+        self.disagreements = 0
+
+    def signature(self, frames):
+        """(T, H, W, 3) uint8 -> (T', H', W') float32 灰階簽章"""
+        sampled = frames[::self.frame_step, ::self.pixel_step, ::self.pixel_step]
+        return sampled.mean(axis=3, dtype=np.float32)
+
+    def score(self, signature, reference):
+        intra = np.abs(np.diff(signature, axis=0)).mean() if len(signature) > 1 else 0.0
+        inter = np.abs(signature - reference).mean() if reference is not None else 255.0
+        return float(max(intra, inter)) / 255.0
+
+    def should_infer(self, snapshot, current_label):
+        """
+        在寫入 clip 的執行緒（vivit_worker）中、送出 snapshot 前呼叫。
+        current_label 為該 track 目前的 (label, confidence)，尚未有預測結果時為 None。
+        """
+        buffer = snapshot.buffer
+        signature = self.signature(snapshot.frames)
+        now = self.clock()
+        state = buffer.gate_state
+        reference = state["signature"] if state else None
+        static = current_label is not None and self.score(signature, reference) < self.threshold
+        fresh = state is not None and now - state["inferred_at"] <= self.max_staleness
+        skip = static and fresh
+        with self._lock:
+            self.evaluated += 1
+            if skip and not self.audit:
+                self.skipped += 1
+            elif static and not fresh:
+                self.stale += 1
+        if skip and not self.audit:
+            return False
+        if skip:
+            # 稽核模式：照常推論，預測完成後與沿用的結果比較（不更新參考簽章，與實際略過時相同）
+            # 清掉已被丟棄（例如 snapshot 被覆寫）而不會再有結果的舊紀錄
+            with self._lock:
+                audit = state["audit"]
+                for end in [end for end in audit if end <= snapshot.start]:
+                    del audit[end]
+                audit[snapshot.end] = current_label[0]
+            return True
+        buffer.gate_state = {"signature": signature, "inferred_at": now,
+                             "audit": state["audit"] if state else {}}
+        return True
+
+    def observe(self, snapshot, label):
+        """預測完成後呼叫，稽核模式下比較略過時會沿用的 label"""
+        state = snapshot.buffer.gate_state
+        if not state:
+            return
+        with self._lock:
+            reused = state["audit"].pop(snapshot.end, None)
+            if reused is None:
+                return
+            self.skipped += 1
+            self.audited += 1
+            if reused != label:
+                self.disagreements += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "evaluated": self.evaluated,
+                "skipped": self.skipped,
+                "skip_fraction": self.skipped / self.evaluated if self.evaluated else 0.0,
+                "stale_refreshes": self.stale,
+                "audited": self.audited,
+                "disagreements": self.disagreements,
+            }
+
+    def summary(self):
+        s = self.stats()
+        summary = (f"[MotionGate] evaluated={s['evaluated']} skipped={s['skipped']} "
+                   f"({s['skip_fraction']:.0%}) stale_refreshes={s['stale_refreshes']}")
+        if self.audit:
+            summary += f" audit: disagreements={s['disagreements']}/{s['audited']}"
+        return summary
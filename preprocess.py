@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+import torch
+
+
+# 將一批 BGR uint8 clip 轉成 ViViT 輸入 (B, 3, T, H, W) 的 RGB float32 [0, 1]
+class ClipPreprocessor:
+    """
+    - uint8 clip 直接複製到預先配置好的 staging tensor（CUDA 時使用 pinned memory），每個 clip 只有一次 uint8 複製
+    - 上傳到裝置後，BGR→RGB、轉置與 /255 正規化在同一次向量化運算中寫進預先配置好的輸出 tensor
+    回傳的 tensor 會在下一次呼叫時被覆寫，同一個 preprocessor 只能給一個執行緒使用。
+    """
+
+    def __init__(self, num_frames=36, frame_size=(224, 224), max_batch_size=8, device=torch.device("cpu")):
+        self.num_frames = num_frames
+        self.frame_size = frame_size  # (W, H)，與 cv2.resize 相同
+        self.device = device
+        self._allocate(max_batch_size)
+
+    def _allocate(self, max_batch_size):
+        width, height = self.frame_size
+        self.max_batch_size = max_batch_size
+        self.staging = torch.empty((max_batch_size, self.num_frames, height, width, 3), dtype=torch.uint8,
+                                   pin_memory=self.device.type == "cuda")
+        self.output = torch.empty((max_batch_size, 3, self.num_frames, height, width), dtype=torch.float32,
+                                  device=self.device)
+
+    def __call__(self, clips):
+        batch_size = len(clips)
+        if batch_size > self.max_batch_size:
+            self._allocate(batch_size)
+
+        width, height = self.frame_size
+        staging = self.staging[:batch_size]
+        staging_np = staging.numpy()
+        for i, clip in enumerate(clips):
+            if isinstance(clip, np.ndarray) and clip.shape[1:3] == (height, width):
+                staging_np[i] = clip
+            else:
+                # 尚未 resize 的 crop 直接 resize 進 staging，不產生中間陣列
+                for t, frame in enumerate(clip):
+                    cv2.resize(frame, self.frame_size, dst=staging_np[i, t])
+
+        frames = staging.to(self.device, non_blocking=True)  # (B, T, H, W, 3) BGR
+        output = self.output[:batch_size]
+        for c in range(3):
+            # 輸出的 RGB 第 c 個通道 = 輸入 BGR 的第 2 - c 個通道
+            torch.mul(frames[..., 2 - c], 1.0 / 255.0, out=output[:, c])
+        return output
@@ -0,0 +1,35 @@
+import os
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import quantize_dynamic
+
+
+# ViViT int8 動態量化：Attention 的 Q/K/V/out 與 MLP 的 nn.Linear 權重轉成 int8，activation 在執行時動態量化
+# TubeletEmbedding 的 conv3d 沒有動態量化的 kernel，維持 float32
+def quantized_model_path(checkpoint_path):
+    """models/best_mode_36l.pth -> models/best_mode_36l_int8.pth"""
+    base, ext = os.path.splitext(checkpoint_path)
+    return base + "_int8" + ext
+
+
+def quantize_vivit(model):
+    """model 需已載入 float32 權重；回傳量化後的模型（只能在 CPU 上執行）"""
+    model = model.cpu().eval()
+    # 使用 SDPA 但不合併 QKV，Q/K/V 才會保留成 nn.Linear 讓量化替換
+    model.optimize_for_inference(fuse_qkv=False)
+    return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def load_quantized_vivit(model, path, num_frames=None, img_size=None):
+    """
+    model 為尚未載入權重的 float32 模型，依相同結構量化後再載入 int8 checkpoint。
+    指定 checkpoint 的 num_frames / img_size 時，模型可使用不同的輸入大小（pos_embedding 插值）
+    """
+    quantized = quantize_vivit(model)
+    state_dict = torch.load(path, map_location="cpu")
+    if num_frames is None:
+        quantized.load_state_dict(state_dict)
+    else:
+        quantized.load_resized_state_dict(state_dict, num_frames, img_size)
+    return quantized
@@ -0,0 +1,124 @@
+#ViViT int8 動態量化：產生量化 checkpoint，並在保存的 clip 上比較各類別的準確率與延遲
+# 保存的 clip 依類別放在 --clips-dir/<類別名稱>/ 下（類別名稱與 models/class.txt 相同），
+# 可以是 (T, H, W, 3) BGR uint8 的 .npy（與 ClipRingBuffer 相同格式）或影片檔（取連續 NUM_FRAMES 幀）
+# 用法：python quantize_vivit.py --clips-dir data/clips
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+
+from clip_dataset import load_labeled_clips
+from model import ViViT_Factorized, ViViT_FactorizedEncoder
+from preprocess import ClipPreprocessor
+from quantization import load_quantized_vivit, quantize_vivit, quantized_model_path
+
+# 與 grpc_server.py 相同的 ViViT 設定
+NUM_FRAMES = 36
+IMG_SIZE = 224
+EMBED_DIM = 96
+MLP_DIM = 96 * 3
+NUM_HEADS = 4
+NUM_LAYERS_SPATIAL = 2
+NUM_LAYERS_TEMPORAL = 2
+PATCH_SIZE = 16
+TUBELET_SIZE = 2
+MODEL_PATH = "models/best_mode_36l.pth"
+CLASSES_FILE = "models/class.txt"
+VIVIT_VARIANTS = {"joint": ViViT_Factorized, "factorized": ViViT_FactorizedEncoder}
+
+
+def build_model(variant, num_classes):
+    return VIVIT_VARIANTS[variant](
+        in_channels=3, embed_dim=EMBED_DIM, patch_size=PATCH_SIZE, tubelet_size=TUBELET_SIZE,
+        num_heads=NUM_HEADS, mlp_dim=MLP_DIM, num_layers_spatial=NUM_LAYERS_SPATIAL, num_layers_temporal=NUM_LAYERS_TEMPORAL,
+        num_classes=num_classes, num_frames=NUM_FRAMES, img_size=IMG_SIZE, droplayer_p=0.1
+    )
+
+
+@torch.no_grad()
+def run(model, preprocessor, clips):
+    """逐一預測（batch 1，與即時串流相同），回傳預測類別與每個 clip 的平均延遲（ms）"""
+    predictions, elapsed = [], 0.0
+    for clip, _ in clips:
+        frames_tensor = preprocessor([clip])
+        start = time.perf_counter()
+        outputs = model(frames_tensor)
+        elapsed += time.perf_counter() - start
+        predictions.append(int(outputs.argmax(dim=1)))
+    return np.array(predictions), elapsed / len(clips) * 1000
+
+
+def report(class_names, labels, fp32_pred, int8_pred, has_labels):
+    print(f"\n{'class':>10} {'clips':>6} {'fp32 acc':>9} {'int8 acc':>9} {'agree':>7}")
+    rows = [(name, labels == i) for i, name in enumerate(class_names)] + [("all", np.ones_like(labels, dtype=bool))]
+    for name, mask in rows:
+        n = int(mask.sum())
+        if n == 0:
+            continue
+        agree = (fp32_pred[mask] == int8_pred[mask]).mean()
+        if has_labels:
+            fp32_acc = (fp32_pred[mask] == labels[mask]).mean()
+            int8_acc = (int8_pred[mask] == labels[mask]).mean()
+            print(f"{name:>10} {n:>6} {fp32_acc:>9.1%} {int8_acc:>9.1%} {agree:>7.1%}")
+        else:
+            print(f"{name:>10} {n:>6} {'-':>9} {'-':>9} {agree:>7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoint", default=MODEL_PATH)
+    parser.add_argument("--output", default=None, help="預設為 checkpoint 旁的 *_int8.pth")
+    parser.add_argument("--variant", choices=list(VIVIT_VARIANTS), default="joint")
+    parser.add_argument("--clips-dir", default=None, help="未指定時以隨機 clip 只比較一致率與延遲")
+    parser.add_argument("--windows-per-video", type=int, default=4)
+    parser.add_argument("--random-clips", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    with open(CLASSES_FILE, 'r', encoding='utf-8') as f:
+        class_names = [line.strip() for line in f if line.strip()]
+    output = args.output or quantized_model_path(args.checkpoint)
+
+    fp32 = build_model(args.variant, len(class_names))
+    fp32.load_state_dict(torch.load(args.checkpoint, map_location="cpu"))
+    fp32.eval()
+    # quantize_dynamic 會替換掉模型中的 Linear，量化複本以免影響 float32 模型
+    fp32_copy = build_model(args.variant, len(class_names))
+    fp32_copy.load_state_dict(fp32.state_dict())
+    torch.save(quantize_vivit(fp32_copy).state_dict(), output)
+    # 重新載入存檔，確認 grpc_server.py 使用的載入路徑可用
+    int8 = load_quantized_vivit(build_model(args.variant, len(class_names)), output)
+    # float32 以部署時的設定比較（合併 QKV + SDPA）
+    fp32.optimize_for_inference(fuse_qkv=True)
+    print(f"quantized checkpoint saved to {output} "
+          f"({os.path.getsize(args.checkpoint) / 1e6:.2f} MB -> {os.path.getsize(output) / 1e6:.2f} MB)")
+
+    if args.clips_dir:
+        clips = load_labeled_clips(args.clips_dir, class_names, NUM_FRAMES, IMG_SIZE, args.windows_per_video)
+        if not clips:
+            raise SystemExit(f"no clips found under {args.clips_dir}/<class name>/")
+        has_labels = True
+    else:
+        rng = np.random.default_rng(0)
+        clips = [(rng.integers(0, 256, (NUM_FRAMES, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8), -1)
+                 for _ in range(args.random_clips)]
+        has_labels = False
+
+    preprocessor = ClipPreprocessor(NUM_FRAMES, (IMG_SIZE, IMG_SIZE), 1)
+    run(fp32, preprocessor, clips[:1])  # 暖機
+    run(int8, preprocessor, clips[:1])
+    fp32_pred, fp32_ms = run(fp32, preprocessor, clips)
+    int8_pred, int8_ms = run(int8, preprocessor, clips)
+    labels = np.array([label for _, label in clips])
+
+    report(class_names, labels, fp32_pred, int8_pred, has_labels)
+    print(f"\nlatency per clip (batch 1, {torch.get_num_threads()} threads): "
+          f"fp32 {fp32_ms:.1f} ms, int8 {int8_ms:.1f} ms ({fp32_ms / int8_ms:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#不重啟 server 替換 ViViT / YOLO 模型：server 在背景載入新的 checkpoint 並 warm-up 後才替換，track 狀態保留
+# 用法：python reload_model.py --model vivit --path models/best_mode_36l_v2.pth --version v2 --wait
+#       替換後可在 http://127.0.0.1:9100/metrics.json 的 model_versions 比較新舊版本的推論延遲
+import argparse
+import sys
+
+import grpc
+
+import image_stream_pb2
+import image_stream_pb2_grpc
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["vivit", "yolo"], default="vivit")
+    parser.add_argument("--path", required=True, help="models/ 底下的 checkpoint")
+    parser.add_argument("--classes-file", default="", help="ViViT 的類別檔，未指定時沿用目前的類別")
+    parser.add_argument("--version", default="", help="版本名稱，未指定時使用檔名")
+    parser.add_argument("--wait", action="store_true", help="等新版本載入並替換完成")
+    parser.add_argument("--target", default="127.0.0.1:50052", help="server 的本機管理 port（ADMIN_GRPC_ADDRESS）")
+    args = parser.parse_args()
+
+    with grpc.insecure_channel(args.target) as channel:
+        stub = image_stream_pb2_grpc.ImageStreamServiceStub(channel)
+        response = stub.ReloadModel(image_stream_pb2.ReloadRequest(
+            model=args.model, path=args.path, classes_file=args.classes_file, version=args.version, wait=args.wait))
+    if not response.accepted:
+        print(f"reload rejected: {response.error}")
+        sys.exit(1)
+    status = response.status
+    if status.error:
+        print(f"{status.name}: {status.error} (still serving {status.version})")
+        sys.exit(1)
+    if status.reloading:
+        print(f"{status.name}: loading {status.reloading} in the background, serving {status.version}")
+    else:
+        print(f"{status.name}: now serving {status.version} "
+              f"(load {status.load_seconds:.1f}s, warm-up {status.warmup_seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
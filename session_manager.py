@@ -0,0 +1,110 @@
+import threading
+import time
+import uuid
+
+
+# 每個串流（gRPC call / user-id）獨立的 pipeline 狀態：tracker、預測結果
+# clip 緩衝區由 ClipStore 以 (session.key, track_id) 統一管理
+class PipelineSession:
+    def __init__(self, key, user_id, tracker, shard):
+        self.key = key
+        self.user_id = user_id
+        self.tracker = tracker
+        self.shard = shard  # 由哪一組 tracker / vivit worker 處理，保證同一串流的 frame 依序處理
+        self.track_labels = {}
+        self.active_calls = 0
+        self.last_active = time.monotonic()
+        self.closed = False  # 關閉後佇列中剩下的 frame 不再累積 clip
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def close(self):
+        self.closed = True
+        self.tracker.delete_all_tracks()
+        self.track_labels.clear()
+
+
+# 管理所有串流的 session，並定期回收閒置的 session
+class SessionManager:
+    def __init__(self, tracker_factory, num_shards=1, idle_timeout=60, reap_interval=10, on_open=None, on_close=None):
+        self.tracker_factory = tracker_factory
+        self.on_open = on_open  # 建立 session 時的回呼（同一個 key 可能在關閉後重新開啟）
+        self.on_close = on_close  # session 關閉時的回呼，用來釋放該 session 的其他資源
+        self.num_shards = num_shards
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._reaper_thread = None
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def new_key():
+        return uuid.uuid4().hex
+
+    def acquire(self, key, user_id):
+        """取得（必要時建立）session，呼叫端結束時需呼叫 release"""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = PipelineSession(key, user_id, self.tracker_factory(), self._least_loaded_shard())
+                self._sessions[key] = session
+                if self.on_open is not None:
+                    self.on_open(session)
+                print(f"Session {key} opened for user {user_id} on shard {session.shard}")
+            session.active_calls += 1
+            session.touch()
+            return session
+
+    def release(self, session, close=False):
+        with self._lock:
+            session.active_calls -= 1
+            session.touch()
+            if close and session.active_calls <= 0:
+                self._close_locked(session.key)
+
+    def _least_loaded_shard(self):
+        load = [0] * self.num_shards
+        for session in self._sessions.values():
+            load[session.shard] += 1
+        return load.index(min(load))
+
+    def _close_locked(self, key):
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            session.close()
+            if self.on_close is not None:
+                self.on_close(session)
+            print(f"Session {key} closed")
+
+    def close(self, key):
+        with self._lock:
+            self._close_locked(key)
+
+    def reap_idle(self):
+        """關閉沒有進行中的 call 且閒置超過 idle_timeout 的 session"""
+        now = time.monotonic()
+        with self._lock:
+            idle_keys = [key for key, s in self._sessions.items()
+                         if s.active_calls <= 0 and now - s.last_active > self.idle_timeout]
+            for key in idle_keys:
+                self._close_locked(key)
+        return len(idle_keys)
+
+    def start_reaper(self):
+        def reaper():
+            while not self._stop_event.wait(self.reap_interval):
+                self.reap_idle()
+
+        self._reaper_thread = threading.Thread(target=reaper, daemon=True)
+        self._reaper_thread.start()
+
+    def stop_reaper(self):
+        self._stop_event.set()
+        if self._reaper_thread is not None:
+            self._reaper_thread.join()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
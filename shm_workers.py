@@ -0,0 +1,225 @@
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+
+def fork_available():
+    return "fork" in mp.get_all_start_methods()
+
+
+# 固定大小的共享記憶體區塊，切成 num_slots 個 slot，用來在 process 之間傳遞 frame / clip
+class SharedSlots:
+    """
+    主 process 以 acquire() 取得空的 slot、write() 寫入影像後只把 (slot, shape) 傳給 worker，
+    worker 以 view() 直接讀取同一塊記憶體，不需 pickle 整張影像。
+    worker process 由 fork 建立並繼承同一個 mapping；slot 的分配只在主 process 進行。
+    """
+
+    def __init__(self, num_slots, slot_bytes):
+        self.num_slots = num_slots
+        self.slot_bytes = slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=num_slots * slot_bytes)
+        self._free = queue.Queue()
+        for slot in range(num_slots):
+            self._free.put(slot)
+
+    def acquire(self, timeout=None):
+        """取得空的 slot，全部使用中時阻塞（自然形成背壓）"""
+        return self._free.get(timeout=timeout)
+
+    def release(self, slot):
+        self._free.put(slot)
+
+    def view(self, slot, shape, dtype=np.uint8):
+        return np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, slot, array):
+        if array.nbytes > self.slot_bytes:
+            raise ValueError(f"array of {array.nbytes} bytes does not fit in a {self.slot_bytes}-byte slot")
+        np.copyto(self.view(slot, array.shape, array.dtype), array)
+        return array.shape
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+# 在獨立 process 中執行 CPU 密集的推論，避免與主 process 的執行緒搶 GIL
+class ProcessWorkerPool:
+    """
+    - 建立時立即 fork num_processes 個 worker，每個 worker 呼叫 init_fn() 載入自己的模型，並設定 torch 執行緒數
+    - submit(index, task, callback) 把小型的 task（通常是 slot 編號與 metadata）送到第 index 個 worker，
+      同一個 worker 依序處理，所以同一個串流固定送到同一個 worker 即可保持順序
+    - worker 完成後由主 process 的 collector 執行緒呼叫 callback(ok, result)
+    - worker process 異常結束（OOM、torch / onnx segfault）時，collector 每 watch_interval 秒檢查一次，
+      以 callback(False, ...) 結束它尚未完成的 task（呼叫端才能釋放 slot），之後送給它的 task 也立即失敗
+    - status() / wait_ready() 回報 worker 是否都已載入模型、有沒有 worker 已結束，供 health check 使用
+    必須在載入模型（尤其是 CUDA）與啟動任何執行緒之前建立，fork 出的 process 才是乾淨的。
+    """
+
+    def __init__(self, name, init_fn, handle_fn, num_processes=1, torch_threads=1, watch_interval=1.0):
+        ctx = mp.get_context("fork")
+        self.name = name
+        self.num_processes = num_processes
+        self.watch_interval = watch_interval
+        self._task_queues = [ctx.Queue() for _ in range(num_processes)]
+        self._result_queue = ctx.Queue()
+        self._callbacks = {}  # task_id -> (worker index, callback)
+        self._reported = [False] * num_processes  # 已回報載入結果的 worker
+        self._dead = [False] * num_processes
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._started_at = time.monotonic()
+        self._loaded = 0
+        self._errors = []
+        self._all_loaded = threading.Event()
+        self.load_seconds = 0.0  # 從 fork 到所有 worker 回報載入結果的秒數
+        self._processes = [
+            ctx.Process(target=_worker_main, name=f"{name}-{i}",
+                        args=(name, i, init_fn, handle_fn, torch_threads, self._task_queues[i], self._result_queue),
+                        daemon=True)
+            for i in range(num_processes)
+        ]
+        for process in self._processes:
+            process.start()
+        self._collector = None
+
+    def start(self):
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(self, index, task, callback):
+        index %= self.num_processes
+        task_id = next(self._task_ids)
+        with self._lock:
+            dead = self._dead[index]
+            if not dead:
+                self._callbacks[task_id] = (index, callback)
+        if dead:
+            self._run_callback(callback, False, f"{self.name} worker {index} is not running")
+            return
+        self._task_queues[index].put((task_id, task))
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                item = self._result_queue.get(timeout=self.watch_interval)
+            except queue.Empty:
+                item = ()
+            if time.monotonic() - last_check >= self.watch_interval:
+                last_check = time.monotonic()
+                self._check_workers()
+            if item is None:
+                break
+            if not item:
+                continue
+            task_id, ok, result = item
+            if task_id is None:
+                # worker 狀態訊息（載入完成或載入失敗）
+                index, message = result
+                print(f"[{self.name}] {message}")
+                self._worker_loaded(index, ok, message)
+                continue
+            with self._lock:
+                _, callback = self._callbacks.pop(task_id, (None, None))
+            if callback is not None:
+                self._run_callback(callback, ok, result)
+
+    def _run_callback(self, callback, ok, result):
+        try:
+            callback(ok, result)
+        except Exception as e:
+            print(f"[{self.name}] callback error: {e}")
+
+    def _check_workers(self):
+        # 已結束的 worker 不會再回傳結果，它的 callback 全部以失敗結束
+        for index, process in enumerate(self._processes):
+            if self._stopping or self._dead[index] or process.is_alive():
+                continue
+            message = f"worker {index} exited with code {process.exitcode}"
+            print(f"[{self.name}] {message}")
+            with self._lock:
+                self._dead[index] = True
+                pending = [(task_id, callback) for task_id, (worker, callback) in self._callbacks.items()
+                           if worker == index]
+                for task_id, _ in pending:
+                    del self._callbacks[task_id]
+            if not self._reported[index]:
+                self._worker_loaded(index, False, message)
+            else:
+                with self._lock:
+                    self._errors.append(message)
+            for _, callback in pending:
+                self._run_callback(callback, False, f"{self.name} {message}")
+
+    def _worker_loaded(self, index, ok, message):
+        with self._lock:
+            if self._reported[index]:
+                return
+            self._reported[index] = True
+            self._loaded += 1
+            if not ok:
+                self._errors.append(message)
+            if self._loaded == self.num_processes:
+                self.load_seconds = time.monotonic() - self._started_at
+                self._all_loaded.set()
+
+    def wait_ready(self, timeout=None):
+        """等待所有 worker 回報載入結果（需已呼叫 start()），逾時回傳 False"""
+        return self._all_loaded.wait(timeout)
+
+    def status(self):
+        """與 ModelRegistry.status() 相同格式的一筆狀態"""
+        with self._lock:
+            loaded, errors = self._loaded, list(self._errors)
+        if errors:
+            state = "failed"
+        else:
+            state = "ready" if loaded == self.num_processes else "loading"
+        return {"name": f"{self.name} workers", "state": state, "load_seconds": self.load_seconds,
+                "warmup_seconds": 0.0, "error": "; ".join(errors), "version": "", "reloading": ""}
+
+    def pending(self):
+        with self._lock:
+            return len(self._callbacks)
+
+    def stop(self, timeout=10):
+        self._stopping = True
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._result_queue.put(None)
+        if self._collector is not None:
+            self._collector.join()
+
+
+def _worker_main(name, index, init_fn, handle_fn, torch_threads, task_queue, result_queue):
+    torch.set_num_threads(torch_threads)
+    start = time.perf_counter()
+    try:
+        state = init_fn()
+    except Exception as e:
+        result_queue.put((None, False, (index, f"worker {index} failed to load: {e}")))
+        return
+    result_queue.put((None, True, (index, f"worker {index} ready in {time.perf_counter() - start:.1f}s "
+                                          f"({torch_threads} torch threads)")))
+    while True:
+        item = task_queue.get()
+        if item is None:
+            break
+        task_id, task = item
+        try:
+            result_queue.put((task_id, True, handle_fn(state, task)))
+        except Exception as e:
+            result_queue.put((task_id, False, f"{type(e).__name__}: {e}"))
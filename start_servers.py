@@ -6,6 +6,41 @@ import subprocess
 import sys
 import os
 
+GRPC_TARGET = "localhost:50051"
+ADMIN_GRPC_TARGET = "127.0.0.1:50052"  # GetHealth / ReloadModel 只在本機的管理 port 提供
+GRPC_READY_TIMEOUT = 300  # 等待 gRPC server 載入模型並完成 warm-up 的秒數
+
+def wait_for_grpc_ready(target=ADMIN_GRPC_TARGET, timeout=GRPC_READY_TIMEOUT, interval=0.5):
+    """輪詢 GetHealth 直到所有模型都 ready，逾時或有模型載入失敗時回傳 False"""
+    import grpc
+    import image_stream_pb2
+    import image_stream_pb2_grpc
+
+    deadline = time.monotonic() + timeout
+    last_states = None
+    with grpc.insecure_channel(target) as channel:
+        stub = image_stream_pb2_grpc.ImageStreamServiceStub(channel)
+        while time.monotonic() < deadline:
+            try:
+                health = stub.GetHealth(image_stream_pb2.HealthRequest(), timeout=2)
+            except grpc.RpcError:
+                # server 還沒開始監聽
+                time.sleep(interval)
+                continue
+            if health.ready:
+                print(f"gRPC Server ready (startup {health.startup_seconds:.1f}s)")
+                return True
+            states = {m.name: m.state for m in health.models}
+            if states != last_states:
+                print(f"waiting for models: {states}")
+                last_states = states
+            failed = [m for m in health.models if m.state == "failed"]
+            if failed:
+                print(f"gRPC Server failed to load {failed[0].name}: {failed[0].error}")
+                return False
+            time.sleep(interval)
+    return False
+
 def start_grpc_server():
     print("start gRPC Server...")
     try:
@@ -29,7 +64,9 @@ def main():
     
     # 啟動服務
     grpc_thread.start()
-    time.sleep(2)  
+    # 等模型載入並 warm-up 完成才啟動 HTTP API，不再固定 sleep
+    if not wait_for_grpc_ready():
+        print("gRPC Server is not ready, starting HTTP API anyway")
     http_thread.start()
     
     
@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+
+# 用戶統計資料的儲存引擎：append-only 事件 log + 定期 snapshot
+class StatsStore:
+    """
+    - 每次更新只在 log 檔尾端附加一行精簡的 JSON 事件，並套用到記憶體中的統計資料
+    - 背景執行緒每 snapshot_interval 秒，或 log 超過 snapshot_log_bytes 時，
+      把記憶體中的資料寫成 snapshot（先寫暫存檔再 os.replace），並捨棄已寫入 snapshot 的 log
+    - 每個事件都有遞增序號，snapshot 記錄最後一個序號；啟動時載入 snapshot 後，
+      重播 log 中序號較大的事件（crash recovery）
+    fsync=False 時只保證 process 當掉不遺失事件，fsync=True 連斷電也不遺失但每次寫入較慢。
+    """
+
+    def __init__(self, snapshot_path, categories, log_path=None, snapshot_interval=30,
+                 snapshot_log_bytes=1024 * 1024, fsync=False):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or os.path.splitext(snapshot_path)[0] + ".log"
+        self.rotated_log_path = self.log_path + ".1"
+        self.categories = list(categories)
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_log_bytes = snapshot_log_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._log_damaged = False
+
+        self.users, self.seq = self._load_snapshot()
+        replayed = self._replay(self.rotated_log_path) + self._replay(self.log_path)
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+        self._log_bytes = self._log.tell()
+        if replayed or self._log_damaged or os.path.exists(self.rotated_log_path):
+            print(f"Recovered {replayed} events from {self.log_path}")
+            self.snapshot()
+
+    # ---------- 讀取 / 復原 ----------
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return {}, 0
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}, 0
+        # 新格式 {"last_seq": n, "users": {...}}，舊格式直接是 {user_id: stats}
+        if isinstance(data, dict) and set(data) == {"last_seq", "users"}:
+            return data["users"], data["last_seq"]
+        return data, 0
+
+    def _replay(self, path):
+        if not os.path.exists(path):
+            return 0
+        replayed = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # 寫到一半就當掉的最後一行，復原後立即 snapshot 並換新的 log
+                    self._log_damaged = True
+                    break
+                if event["s"] <= self.seq:
+                    continue
+                self._apply(event)
+                self.seq = event["s"]
+                replayed += 1
+        return replayed
+
+    # ---------- 寫入 ----------
+
+    def _new_user(self, now):
+        return {
+            "total_count": 0,
+            "categories": {category: 0 for category in self.categories},
+            "last_update": now
+        }
+
+    def _apply(self, event):
+        user_id = event["u"]
+        if event["op"] == "add":
+            stats = self.users.setdefault(user_id, self._new_user(event["t"]))
+            stats["categories"][event["c"]] = stats["categories"].get(event["c"], 0) + event["n"]
+            stats["total_count"] += event["n"]
+            stats["last_update"] = event["t"]
+        elif event["op"] == "reset":
+            self.users[user_id] = self._new_user(event["t"])
+
+    def _append_locked(self, events):
+        lines = []
+        for event in events:
+            self.seq += 1
+            event["s"] = self.seq
+            self._apply(event)
+            lines.append(json.dumps(event, ensure_ascii=False, separators=(',', ':')))
+        data = "\n".join(lines) + "\n"
+        self._log.write(data)
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._log_bytes += len(data.encode('utf-8'))
+        if self._log_bytes >= self.snapshot_log_bytes:
+            self._wake.set()
+
+    def add(self, user_id, category, count=1):
+        return self.add_many([(user_id, category, count)])[user_id]
+
+    def add_many(self, events):
+        """events: [(user_id, category, count)]，回傳更新後各用戶統計資料的複本"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._append_locked([{"op": "add", "u": user_id, "c": category, "n": count, "t": now}
+                                 for user_id, category, count in events])
+            return {user_id: self._copy(self.users[user_id]) for user_id, _, _ in events}
+
+    def reset(self, user_id):
+        """回傳 (重置前是否存在, 重置後的統計資料)"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            existed = user_id in self.users
+            self._append_locked([{"op": "reset", "u": user_id, "t": now}])
+            return existed, self._copy(self.users[user_id])
+
+    def get(self, user_id):
+        with self._lock:
+            stats = self.users.get(user_id)
+            if stats is None:
+                # 只查詢不寫 log，跟原本一樣在下次寫入（snapshot）時才落盤
+                stats = self.users[user_id] = self._new_user(datetime.now().isoformat())
+            return self._copy(stats)
+
+    def all(self):
+        with self._lock:
+            return {user_id: self._copy(stats) for user_id, stats in self.users.items()}
+
+    @staticmethod
+    def _copy(stats):
+        return {
+            "total_count": stats["total_count"],
+            "categories": dict(stats["categories"]),
+            "last_update": stats["last_update"]
+        }
+
+    # ---------- snapshot ----------
+
+    def snapshot(self):
+        with self._snapshot_lock:
+            with self._lock:
+                users = {user_id: self._copy(stats) for user_id, stats in self.users.items()}
+                last_seq = self.seq
+                # 切換到新的 log，之後的事件不受 snapshot 影響
+                self._log.close()
+                if os.path.exists(self.rotated_log_path):
+                    # 上一次 snapshot 沒有完成，舊 log 還不能丟，把目前的 log 接在它後面
+                    with open(self.log_path, 'rb') as src, open(self.rotated_log_path, 'ab') as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.remove(self.log_path)
+                elif os.path.exists(self.log_path):
+                    os.replace(self.log_path, self.rotated_log_path)
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+                self._log_bytes = 0
+
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"last_seq": last_seq, "users": users}, f, ensure_ascii=False, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # snapshot 已完整寫入後，舊 log 才可以刪除
+            if os.path.exists(self.rotated_log_path):
+                os.remove(self.rotated_log_path)
+
+    def start(self):
+        def snapshot_loop():
+            while not self._stop_event.is_set():
+                self._wake.wait(self.snapshot_interval)
+                self._wake.clear()
+                if self._log_bytes > 0:
+                    try:
+                        self.snapshot()
+                    except OSError as e:
+                        print(f"Error saving stats snapshot: {e}")
+
+        self._thread = threading.Thread(target=snapshot_loop, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._log_bytes > 0:
+            self.snapshot()
+        self._log.close()
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+import torch
+
+
+# 增量推論：快取每個 track 已計算過的 tubelet embedding
+class TubeletEmbeddingCache:
+    """
+    以 ClipRingBuffer.uid 為 key，記錄每個 tubelet（從邏輯序號 start 開始的 tubelet_size 幀）的 embedding。
+    新的 snapshot 只對尚未計算過的 tubelet 執行 conv3d，其餘直接從快取組回完整的 token 序列。
+    stride 為 tubelet_size 的倍數時，前後兩個 snapshot 的 tubelet 邊界一致，只需計算 stride / tubelet_size 個新 tubelet。
+    只能給單一執行緒（predict_worker）使用。
+    """
+
+    def __init__(self, tubelet_embedding, max_tracks=32):
+        self.tubelet_embedding = tubelet_embedding
+        self.tubelet_size = tubelet_embedding.conv3d.kernel_size[0]
+        self.max_tracks = max_tracks
+        self._cache = OrderedDict()  # uid -> {tubelet 起始序號: (P, embed_dim)}
+        self.computed = 0
+        self.reused = 0
+
+    @torch.no_grad()
+    def embed(self, keys, frames_tensor):
+        """
+        keys: 與 frames_tensor 同順序的 (ClipRingBuffer.uid, snapshot.start)
+        frames_tensor: 前處理後的 (B, C, T, H, W)
+        回傳與 tubelet_embedding(frames_tensor) 相同的 (B, T'*P, embed_dim)
+        """
+        num_tubelets = frames_tensor.shape[2] // self.tubelet_size
+        missing = {}  # (uid, 起始序號) -> (batch index, tubelet index)
+        for b, (uid, start) in enumerate(keys):
+            entries = self._entries(uid)
+            for k in range(num_tubelets):
+                seq = start + k * self.tubelet_size
+                if seq not in entries and (uid, seq) not in missing:
+                    missing[(uid, seq)] = (b, k)
+
+        if missing:
+            # 所有 track 缺少的 tubelet 合併成一次 conv3d
+            pieces = [frames_tensor[b, :, k * self.tubelet_size:(k + 1) * self.tubelet_size]
+                      for b, k in missing.values()]
+            embeddings = self.tubelet_embedding(torch.stack(pieces))  # (M, P, embed_dim)
+            for (uid, seq), embedding in zip(missing, embeddings):
+                self._cache[uid][seq] = embedding
+            self.computed += len(missing)
+        self.reused += len(keys) * num_tubelets - len(missing)
+
+        tokens = []
+        for uid, start in keys:
+            entries = self._cache[uid]
+            seqs = [start + k * self.tubelet_size for k in range(num_tubelets)]
+            tokens.append(torch.cat([entries[seq] for seq in seqs]))  # (T'*P, embed_dim)
+            # 移除已滑出視窗的 tubelet
+            for seq in [seq for seq in entries if seq < start]:
+                del entries[seq]
+        return torch.stack(tokens)
+
+    def _entries(self, uid):
+        entries = self._cache.get(uid)
+        if entries is None:
+            entries = {}
+            self._cache[uid] = entries
+            # 超過上限時移除最久沒使用的 track（通常已被 ClipStore 回收）
+            while len(self._cache) > self.max_tracks:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(uid)
+        return entries
+
+    def discard(self, uid):
+        self._cache.pop(uid, None)
+
+    def stats(self):
+        total = self.computed + self.reused
+        return {
+            "tracks": len(self._cache),
+            "computed_tubelets": self.computed,
+            "reused_tubelets": self.reused,
+            "reuse_ratio": self.reused / total if total else 0.0,
+        }